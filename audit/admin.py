@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import Event
+
+
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('timestamp', 'action', 'model', 'object_id', 'actor')
+    list_select_related = ('actor',)
+    readonly_fields = ('action', 'model', 'object_id', 'actor', 'timestamp')
+
+
+admin.site.register(Event, EventAdmin)
@@ -0,0 +1,14 @@
+import atexit
+
+from django.apps import AppConfig
+from django.core.signals import request_finished
+
+
+class AuditConfig(AppConfig):
+    name = 'audit'
+
+    def ready(self):
+        from .buffer import event_log
+
+        request_finished.connect(event_log.flush_if_stale, dispatch_uid='audit_flush_if_stale')
+        atexit.register(event_log.flush)
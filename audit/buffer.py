@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    """
+    Collects audit events in memory and writes them with one `bulk_create`
+    once `AUDIT_BATCH_SIZE` events are pending, when a request finishes with
+    events older than `AUDIT_FLUSH_INTERVAL` seconds, or at interpreter exit.
+    """
+
+    def __init__(self):
+        self._events = []
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._events)
+
+    def record(self, action, model, object_ids, actor=None):
+        timestamp = timezone.now()
+        actor_id = getattr(actor, 'pk', None)
+        events = [
+            Event(
+                action=action,
+                model=model._meta.label,
+                object_id=object_id,
+                actor_id=actor_id,
+                timestamp=timestamp
+            )
+            for object_id
+            in object_ids
+        ]
+
+        with self._lock:
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.extend(events)
+
+            if len(self._events) < settings.AUDIT_BATCH_SIZE:
+                return
+            pending = self._take()
+
+        self._write(pending)
+
+    def flush(self):
+        with self._lock:
+            pending = self._take()
+
+        self._write(pending)
+
+    def clear(self):
+        with self._lock:
+            self._take()
+
+    def flush_if_stale(self, **kwargs):
+        oldest = self._oldest
+        if oldest is not None and time.monotonic() - oldest >= settings.AUDIT_FLUSH_INTERVAL:
+            self.flush()
+
+    def _take(self):
+        pending, self._events, self._oldest = self._events, [], None
+        return pending
+
+    def _write(self, pending):
+        if not pending:
+            return
+
+        try:
+            Event.objects.bulk_create(pending)
+        except Exception:
+            logger.exception('Could not write %d audit events, keeping them for the next flush.', len(pending))
+
+            with self._lock:
+                self._events[:0] = pending
+                self._oldest = self._oldest or time.monotonic()
+
+
+event_log = EventBuffer()
+
+
+def record(action, instance, actor=None):
+    event_log.record(action, type(instance), [instance.pk], actor)
+
+
+def record_many(action, model, object_ids, actor=None):
+    event_log.record(action, model, object_ids, actor)
@@ -0,0 +1,18 @@
+from .buffer import record
+from .models import Event
+
+
+class AuditMixin:
+    """Records create, update and delete events for the view's objects."""
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        record(Event.CREATE, serializer.instance, self.request.user)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        record(Event.UPDATE, serializer.instance, self.request.user)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        record(Event.DELETE, instance, self.request.user)
@@ -0,0 +1,31 @@
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class Event(models.Model):
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    ACTION_CHOICES = (
+        (CREATE, 'Create'),
+        (UPDATE, 'Update'),
+        (DELETE, 'Delete'),
+    )
+
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    model = models.CharField(max_length=50)
+    object_id = models.PositiveIntegerField()
+    actor = models.ForeignKey(User, null=True, on_delete=models.SET_NULL, related_name='+')
+    timestamp = models.DateTimeField(db_index=True)
+
+
+    class Meta:
+        ordering = ('timestamp', 'id')
+
+    def __str__(self):
+        return '{model} #{object_id} {action}d at {timestamp}'.format(
+            model=self.model,
+            object_id=self.object_id,
+            action=self.action,
+            timestamp=self.timestamp
+        )
@@ -0,0 +1,12 @@
+from rest_framework import serializers
+
+from .models import Event
+
+
+class EventSerializer(serializers.ModelSerializer):
+    actor = serializers.SlugRelatedField(slug_field='username', read_only=True)
+
+
+    class Meta:
+        model = Event
+        fields = ('id', 'action', 'model', 'object_id', 'actor', 'timestamp')
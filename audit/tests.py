@@ -0,0 +1,131 @@
+from django.contrib.auth.models import User
+from django.shortcuts import reverse
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from resources.models import Resource
+from .buffer import event_log
+from .models import Event
+
+
+class AuditTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+        # Start from an empty buffer whatever earlier tests left behind.
+        event_log.clear()
+
+        self.user = User.objects.create_user(
+            username='test_user',
+            password='passtestword123'
+        )
+        self.admin_user = User.objects.create_superuser(
+            username='admin_user',
+            email='admin@gmail.com',
+            password='you1can2not3guess4my5password6'
+        )
+
+
+class EventRecordingTestCase(AuditTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.client.force_authenticate(self.user)
+
+    def test_resource_lifecycle_is_recorded(self):
+        response = self.client.post(
+            reverse('resources:resources-list'),
+            data={'title': 'Sample title', 'resource_url': 'http://www.diveintopython3.net/'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        resource = Resource.objects.get(title='Sample title')
+        detail_url = reverse('resources:resources-detail', kwargs={'pk': resource.id})
+
+        self.client.put(detail_url, data={'title': 'skydive'})
+        self.client.delete(detail_url)
+
+        self.assertFalse(Event.objects.exists())
+
+        event_log.flush()
+
+        self.assertEqual(
+            list(Event.objects.values_list('action', 'model', 'object_id', 'actor')),
+            [
+                (Event.CREATE, 'resources.Resource', resource.id, self.user.id),
+                (Event.UPDATE, 'resources.Resource', resource.id, self.user.id),
+                (Event.DELETE, 'resources.Resource', resource.id, self.user.id),
+            ]
+        )
+
+    @override_settings(AUDIT_BATCH_SIZE=2)
+    def test_buffer_flushes_when_full(self):
+        resource = Resource.objects.create(
+            title='Test resource',
+            resource_url='http://www.django-rest-framework.org/api-guide/testing/',
+            owner=self.user
+        )
+        url = reverse('resources:resource-comments-list', kwargs={'resource_pk': resource.id})
+
+        self.client.post(url, data={'content': 'first'})
+        self.assertEqual(len(event_log), 1)
+
+        self.client.post(url, data={'content': 'second'})
+        self.assertEqual(len(event_log), 0)
+        self.assertEqual(Event.objects.filter(model='resources.Comment').count(), 2)
+
+
+class EventListViewTestCase(AuditTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.url = reverse('audit:event-list')
+
+        now = timezone.now()
+        self.old_event = Event.objects.create(
+            action=Event.CREATE,
+            model='resources.Resource',
+            object_id=1,
+            actor=self.user,
+            timestamp=now - timezone.timedelta(days=2)
+        )
+        self.new_event = Event.objects.create(
+            action=Event.UPDATE,
+            model='resources.Resource',
+            object_id=1,
+            actor=self.user,
+            timestamp=now
+        )
+
+    def test_event_list_with_normal_user(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_event_list_with_admin_user(self):
+        self.client.force_authenticate(self.admin_user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['id'] for event in response.data['results']], [self.old_event.id, self.new_event.id])
+        self.assertEqual(response.data['results'][0]['actor'], self.user.username)
+
+    def test_event_list_with_time_range(self):
+        self.client.force_authenticate(self.admin_user)
+
+        response = self.client.get(self.url, data={'since': (timezone.now() - timezone.timedelta(days=1)).isoformat()})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['id'] for event in response.data['results']], [self.new_event.id])
+
+    def test_event_list_with_invalid_time_range(self):
+        self.client.force_authenticate(self.admin_user)
+
+        response = self.client.get(self.url, data={'until': 'yesterday'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,10 @@
+from django.conf.urls import url
+
+from .views import EventListView
+
+
+app_name = 'audit'
+
+urlpatterns = [
+    url(r'^events/$', EventListView.as_view(), name='event-list')
+]
@@ -0,0 +1,49 @@
+from django.utils.dateparse import parse_datetime
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.authentication import TokenAuthentication
+
+from .buffer import event_log
+from .models import Event
+from .serializers import EventSerializer
+
+
+class EventPagination(CursorPagination):
+    ordering = 'timestamp'
+    page_size = 100
+
+
+class EventListView(generics.ListAPIView):
+    serializer_class = EventSerializer
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated, IsAdminUser)
+    pagination_class = EventPagination
+
+    def get_timestamp_param(self, name):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+
+        timestamp = parse_datetime(value)
+        if timestamp is None:
+            raise ValidationError({name: 'Expected an ISO 8601 date and time.'})
+
+        return timestamp
+
+    def get_queryset(self):
+        # Make events still sitting in this process' buffer visible.
+        event_log.flush()
+
+        queryset = Event.objects.select_related('actor')
+
+        since = self.get_timestamp_param('since')
+        if since is not None:
+            queryset = queryset.filter(timestamp__gte=since)
+
+        until = self.get_timestamp_param('until')
+        if until is not None:
+            queryset = queryset.filter(timestamp__lt=until)
+
+        return queryset
@@ -0,0 +1,172 @@
+"""
+Soak test for comment streams: holds many idle server-sent event
+connections open against one threaded gunicorn worker and samples its
+memory and CPU, then posts a comment and times the fan-out to every stream.
+
+    python -m benchmarks.comment_stream [--connections 1000 2000] [--idle 30]
+"""
+import argparse
+import os
+import resource
+import selectors
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.workers import free_port, seed, start_server
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+
+def process_tree(pid):
+    """Returns `pid` and the ids of its child processes."""
+    pids = [pid]
+
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open('/proc/{pid}/stat'.format(pid=entry)) as stat:
+                    fields = stat.read().rsplit(')', 1)[1].split()
+            except OSError:
+                continue
+            if int(fields[1]) == pid:
+                pids.append(int(entry))
+
+    return pids
+
+
+def usage(pids):
+    """Returns (resident bytes, CPU seconds) summed over `pids`."""
+    rss = cpu = 0
+
+    for pid in pids:
+        with open('/proc/{pid}/stat'.format(pid=pid)) as stat:
+            fields = stat.read().rsplit(')', 1)[1].split()
+        cpu += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        rss += int(fields[21]) * PAGE_SIZE
+
+    return rss, cpu
+
+
+def open_stream(port, path, token):
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall((
+        'GET {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: Token {token}\r\n'
+        'Accept: text/event-stream\r\n\r\n'
+    ).format(path=path, token=token).encode())
+    sock.setblocking(False)
+
+    return sock
+
+
+def wait_for(streams, marker, timeout):
+    """Reads every stream until it delivered `marker`. Returns how many did."""
+    selector = selectors.DefaultSelector()
+    received = {sock: b'' for sock in streams}
+    for sock in streams:
+        selector.register(sock, selectors.EVENT_READ)
+
+    done, deadline = 0, time.perf_counter() + timeout
+    while done < len(streams) and time.perf_counter() < deadline:
+        for key, _ in selector.select(timeout=0.1):
+            received[key.fileobj] += key.fileobj.recv(65536)
+            if marker in received[key.fileobj]:
+                selector.unregister(key.fileobj)
+                done += 1
+
+    selector.close()
+
+    return done
+
+
+def run(env, token, resource_id, connections, idle):
+    port = free_port()
+    server = start_server(dict(env, FREESOURCE_THREADS=str(connections + 8)), 1, port)
+    stream_path = '/api/resources/{id}/comments/stream/'.format(id=resource_id)
+    streams = []
+
+    try:
+        pids = process_tree(server.pid)
+        baseline_rss, _ = usage(pids)
+
+        for _ in range(connections):
+            streams.append(open_stream(port, stream_path, token))
+        connected = wait_for(streams, b'retry:', 60)
+
+        time.sleep(1)
+        rss, cpu = usage(pids)
+        start = time.perf_counter()
+        time.sleep(idle)
+        idle_rss, idle_cpu = usage(pids)
+        cpu_share = (idle_cpu - cpu) / (time.perf_counter() - start)
+
+        request = urllib.request.Request(
+            'http://127.0.0.1:{port}/api/resources/{id}/comments/'.format(port=port, id=resource_id),
+            data=b'{"content": "Soak test"}',
+            headers={'Authorization': 'Token {token}'.format(token=token), 'Content-Type': 'application/json'}
+        )
+        start = time.perf_counter()
+        urllib.request.urlopen(request).read()
+        delivered = wait_for(streams, b'Soak test', 30)
+        fan_out = time.perf_counter() - start
+
+        return {
+            'connected': connected,
+            'rss_per_stream': (rss - baseline_rss) / max(connected, 1),
+            'idle_rss_growth': idle_rss - rss,
+            'idle_cpu': cpu_share,
+            'delivered': delivered,
+            'fan_out': fan_out,
+        }
+    finally:
+        for sock in streams:
+            sock.close()
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--connections', type=int, nargs='+', default=[1000, 2000])
+    parser.add_argument('--idle', type=float, default=30.0, help='Seconds to hold the streams idle.')
+    args = parser.parse_args()
+
+    # Every stream is a socket on both ends.
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    if hard < max(args.connections) * 2 + 100:
+        sys.exit('Open file limit {hard} is too low for {count} connections.'.format(
+            hard=hard, count=max(args.connections)
+        ))
+
+    scratch = tempfile.mkdtemp(prefix='freesource-streams-')
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='freesource.settings',
+        FREESOURCE_DB_PATH=os.path.join(scratch, 'db.sqlite3'),
+        FREESOURCE_CACHE_DIR=os.path.join(scratch, 'cache'),
+    )
+
+    try:
+        token, paths = seed(env, 10)
+        resource_id = paths[2].split('/')[3]
+
+        print('{:<13}{:>11}{:>16}{:>18}{:>11}{:>11}{:>12}'.format(
+            'connections', 'connected', 'KiB per stream', 'idle growth KiB', 'idle CPU', 'delivered', 'fan-out ms'
+        ))
+        for connections in args.connections:
+            result = run(env, token, resource_id, connections, args.idle)
+            print('{:<13}{:>11}{:>16.1f}{:>18.1f}{:>10.1%}{:>11}{:>12.1f}'.format(
+                connections, result['connected'], result['rss_per_stream'] / 1024,
+                result['idle_rss_growth'] / 1024, result['idle_cpu'], result['delivered'], result['fan_out'] * 1000
+            ))
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main()
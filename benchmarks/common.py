@@ -0,0 +1,46 @@
+import os
+import statistics
+import time
+
+
+def setup_django(settings_module):
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+
+    import django
+    django.setup()
+
+
+def create_test_database():
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+
+
+def create_api_user(username='bench_user'):
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+
+    user = User.objects.create_user(username=username, password='benchpassword123')
+
+    return user, Token.objects.create(user=user)
+
+
+def measure(func, repeat):
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def summarize(timings):
+    return {
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'min': min(timings),
+    }
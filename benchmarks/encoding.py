@@ -0,0 +1,94 @@
+"""
+Compares response encodings by payload size: bytes on the wire, server CPU
+to render and compress, and client time to decompress and parse.
+
+Payloads are shaped like `ResourceSerializer` output (nested owner,
+categories and comments) and rendered by the actual DRF renderers.
+MessagePack and brotli rows are skipped unless those packages are installed.
+
+    python -m benchmarks.encoding [--sizes 1 10 100 1000] [--repeat 20]
+"""
+import argparse
+import gzip
+import json
+
+from benchmarks.common import setup_django, measure, summarize
+
+
+def resource_payload(count):
+    return [
+        {
+            'id': n,
+            'title': 'Resource number {n}'.format(n=n),
+            'categories': [{'id': c, 'name': 'Category {c}'.format(c=c)} for c in range(n % 4)],
+            'resource_url': 'https://example.com/resources/{n}'.format(n=n),
+            'owner': {'username': 'user_{owner}'.format(owner=n % 50)},
+            'comment_set': [
+                {
+                    'id': n * 10 + c,
+                    'content': 'Comment {c} on resource {n}, with some text to it.'.format(c=c, n=n),
+                    'author': {'username': 'user_{author}'.format(author=(n + c) % 50)},
+                    'posted_on': '2017-08-0{day}T12:00:00Z'.format(day=c % 9 + 1),
+                    'version': 1,
+                }
+                for c in range(n % 6)
+            ],
+            'version': 1,
+        }
+        for n in range(count)
+    ]
+
+
+def encodings():
+    from django.conf import settings
+    from rest_framework.renderers import JSONRenderer
+    from freesource.compression import brotli
+
+    yield 'json', JSONRenderer().render, lambda body: body, lambda body: json.loads(body.decode())
+    yield 'json+gzip', JSONRenderer().render, \
+        lambda body: gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL), \
+        lambda body: json.loads(gzip.decompress(body).decode())
+
+    if brotli is not None:
+        yield 'json+br', JSONRenderer().render, \
+            lambda body: brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY), \
+            lambda body: json.loads(brotli.decompress(body).decode())
+
+    if settings.OPTIONAL_RENDERER_CLASSES:
+        import msgpack
+        from freesource.renderers import MessagePackRenderer
+
+        yield 'msgpack', MessagePackRenderer().render, lambda body: body, \
+            lambda body: msgpack.unpackb(body, raw=False)
+        yield 'msgpack+gzip', MessagePackRenderer().render, \
+            lambda body: gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL), \
+            lambda body: msgpack.unpackb(gzip.decompress(body), raw=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django('freesource.settings')
+
+    print('{:<10}{:<14}{:>12}{:>14}{:>14}{:>14}'.format(
+        'resources', 'encoding', 'bytes', 'render us', 'compress us', 'parse us'
+    ))
+    for size in args.sizes:
+        data = resource_payload(size)
+
+        for name, render, compress, parse in encodings():
+            rendered = render(data)
+            body = compress(rendered)
+            timings = [
+                summarize(measure(func, args.repeat))['median'] * 1e6
+                for func in (lambda: render(data), lambda: compress(rendered), lambda: parse(body))
+            ]
+
+            print('{:<10}{:<14}{:>12}{:>14.1f}{:>14.1f}{:>14.1f}'.format(size, name, len(body), *timings))
+
+
+if __name__ == '__main__':
+    main()
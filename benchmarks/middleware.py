@@ -0,0 +1,107 @@
+"""
+Compares the full settings profile with the API-only one.
+
+Every profile runs in fresh subprocesses so start-up and import time are
+measured cold, then the same process replays authenticated `/api/` requests
+through the complete middleware stack.
+
+    python -m benchmarks.middleware [--requests 2000] [--runs 5]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+PROFILES = ('freesource.settings', 'freesource.settings_api')
+PATHS = ('/api/categories/', '/api/resources/')
+
+
+def run_profile(settings_module, requests):
+    start = time.perf_counter()
+
+    from benchmarks.common import setup_django
+    setup_django(settings_module)
+
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import get_resolver
+
+    get_wsgi_application()
+    get_resolver(settings.ROOT_URLCONF).url_patterns
+
+    startup = time.perf_counter() - start
+    modules = len(sys.modules)
+
+    from django.test import Client
+    from benchmarks.common import create_test_database, create_api_user, measure, summarize
+
+    create_test_database()
+    _, token = create_api_user()
+
+    client = Client(HTTP_AUTHORIZATION='Token {key}'.format(key=token.key))
+    per_request = {}
+
+    for path in PATHS:
+        client.get(path)
+        per_request[path] = summarize(measure(lambda: client.get(path), requests))['median']
+
+    return {'startup': startup, 'modules': modules, 'per_request': per_request}
+
+
+def spawn(settings_module, requests):
+    output = subprocess.check_output([
+        sys.executable, '-m', 'benchmarks.middleware',
+        '--child', settings_module, '--requests', str(requests)
+    ])
+
+    return json.loads(output.decode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child')
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_profile(args.child, args.requests)))
+        return
+
+    results = {}
+    for profile in PROFILES:
+        runs = [spawn(profile, args.requests) for _ in range(args.runs)]
+        results[profile] = {
+            'startup': min(run['startup'] for run in runs),
+            'modules': runs[0]['modules'],
+            'per_request': {
+                path: min(run['per_request'][path] for run in runs)
+                for path
+                in PATHS
+            },
+        }
+
+    full, api = (results[profile] for profile in PROFILES)
+
+    print('{:<28}{:>14}{:>14}{:>14}'.format('', 'full', 'api-only', 'saved'))
+    print('{:<28}{:>13.1f}ms{:>13.1f}ms{:>13.1f}%'.format(
+        'start-up + imports',
+        full['startup'] * 1e3,
+        api['startup'] * 1e3,
+        (1 - api['startup'] / full['startup']) * 100
+    ))
+    print('{:<28}{:>14}{:>14}{:>14}'.format(
+        'modules loaded', full['modules'], api['modules'], full['modules'] - api['modules']
+    ))
+    for path in PATHS:
+        print('{:<28}{:>13.1f}us{:>13.1f}us{:>13.1f}us'.format(
+            'GET ' + path,
+            full['per_request'][path] * 1e6,
+            api['per_request'][path] * 1e6,
+            (full['per_request'][path] - api['per_request'][path]) * 1e6
+        ))
+
+
+if __name__ == '__main__':
+    main()
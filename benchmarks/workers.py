@@ -0,0 +1,134 @@
+"""
+Measures how request throughput scales with the number of gunicorn workers
+started from `freesource/gunicorn_config.py`.
+
+A seeded catalogue is written to a scratch SQLite file, then every worker
+count serves the same mix of authenticated reads to a pool of client
+processes for a fixed time.
+
+    python -m benchmarks.workers [--workers 1 2 4] [--clients 8] [--duration 10]
+"""
+import argparse
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def seed(env, resources):
+    manage = [sys.executable, os.path.join(ROOT, 'manage.py')]
+
+    subprocess.check_call(manage + ['migrate', '-v', '0'], env=env)
+    subprocess.check_call(manage + ['seed_catalogue', '--resources', str(resources)], env=env)
+
+    with sqlite3.connect(env['FREESOURCE_DB_PATH']) as db:
+        token, user_id = db.execute('SELECT key, user_id FROM authtoken_token LIMIT 1').fetchone()
+        resource_id, = db.execute('SELECT id FROM resources_resource LIMIT 1').fetchone()
+
+    paths = (
+        '/api/categories/',
+        '/api/resources/trending/',
+        '/api/resources/{id}/related/'.format(id=resource_id),
+        '/api/users/{id}/'.format(id=user_id),
+    )
+
+    return token, paths
+
+
+def start_server(env, workers, port):
+    env = dict(env, FREESOURCE_WORKERS=str(workers), FREESOURCE_BIND='127.0.0.1:{port}'.format(port=port))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn.app.wsgiapp', '-c', os.path.join(ROOT, 'freesource', 'gunicorn_config.py'),
+         'freesource.wsgi'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+
+    server.kill()
+    raise RuntimeError('gunicorn did not start listening on port {port}'.format(port=port))
+
+
+def client(base_url, token, paths, duration):
+    headers = {'Authorization': 'Token {key}'.format(key=token)}
+    requests = 0
+    deadline = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        request = urllib.request.Request(base_url + paths[requests % len(paths)], headers=headers)
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        requests += 1
+
+    return requests
+
+
+def run(env, workers, token, paths, clients, duration):
+    port = free_port()
+    server = start_server(env, workers, port)
+    base_url = 'http://127.0.0.1:{port}'.format(port=port)
+
+    try:
+        # One pass over every path so each worker's lazy state is in place.
+        for _ in range(workers):
+            client(base_url, token, paths, 0.2)
+
+        with ProcessPoolExecutor(clients) as pool:
+            futures = [pool.submit(client, base_url, token, paths, duration) for _ in range(clients)]
+            return sum(future.result() for future in futures) / duration
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--resources', type=int, default=2000)
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='freesource-workers-')
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='freesource.settings',
+        FREESOURCE_DB_PATH=os.path.join(scratch, 'db.sqlite3'),
+        FREESOURCE_CACHE_DIR=os.path.join(scratch, 'cache'),
+    )
+
+    try:
+        token, paths = seed(env, args.resources)
+
+        print('{:<10}{:>14}{:>12}'.format('workers', 'requests/s', 'speed-up'))
+        baseline = None
+        for workers in args.workers:
+            throughput = run(env, workers, token, paths, args.clients, args.duration)
+            baseline = baseline or throughput
+            print('{:<10}{:>14.1f}{:>11.2f}x'.format(workers, throughput, throughput / baseline))
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,4 +3,5 @@ from django.conf.urls import url, include
 urlpatterns = [
     url('', include('users.urls')),
     url('', include('resources.urls')),
+    url('', include('audit.urls')),
 ]
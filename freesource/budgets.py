@@ -0,0 +1,270 @@
+"""
+Per-view query budgets.
+
+API views declare how many queries, how much SQL time and how much wall
+time a request may take, as `query_budget`, or per action (per method on
+plain views) as `query_budget_by_action`. Limits they leave out come from
+`QUERY_BUDGET_DEFAULT`. Every cursor is wrapped so each query is counted
+and timed against the budget of the request running on its thread; on
+SQLite a statement that runs past the remaining time is interrupted.
+
+With `QUERY_BUDGET_MODE = 'enforce'` the first violation aborts the request
+with a 503, and any later statement but a rollback is refused; with
+`'report'` (the default) it is only logged. Either way it is
+counted per view and limit; read the counts with `get_violation_counts()`.
+
+Work a request hands to another thread (the parallel batch pool, the
+comment writer) runs under the request's tracker through `carry()`.
+Background threads that serve no request, such as the comment stream
+poller, are not budgeted.
+"""
+import logging
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError
+from django.db.backends.base.base import BaseDatabaseWrapper
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_lock = threading.Lock()
+
+_violation_counts = Counter()
+
+QueryBudget = namedtuple('QueryBudget', ('queries', 'sql_time', 'wall_time'))
+QueryBudget.__new__.__defaults__ = (None, None, None)
+
+# SQLite VM instructions between checks of a running statement's deadline.
+PROGRESS_INSTRUCTIONS = 1000
+
+# Statements an aborted request may still run, to undo what it did.
+CLEANUP_STATEMENTS = ('ROLLBACK', 'RELEASE SAVEPOINT')
+
+
+class QueryBudgetExceeded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The request exceeded its query budget.'
+    default_code = 'query_budget_exceeded'
+
+
+class BudgetTracker:
+    def __init__(self, name, budget, mode):
+        default = settings.QUERY_BUDGET_DEFAULT
+        self.name = name
+        self.limits = {
+            limit: getattr(budget, limit) if getattr(budget, limit) is not None else default.get(limit)
+            for limit in QueryBudget._fields
+        }
+        self.enforce = mode == 'enforce'
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.violations = set()
+        self.message = None
+        # Threads carrying the tracker count their queries against it too.
+        self._lock = threading.Lock()
+
+    @property
+    def aborted(self):
+        """Whether an enforced limit was exceeded; from then on no new work may run."""
+        return self.enforce and self.message is not None
+
+    def wall_time(self):
+        return time.perf_counter() - self.started
+
+    def deadline(self):
+        """When a statement starting now has to be interrupted, or None."""
+        deadlines = []
+        if self.limits['wall_time'] is not None:
+            deadlines.append(self.started + self.limits['wall_time'])
+        if self.limits['sql_time'] is not None:
+            deadlines.append(time.perf_counter() + self.limits['sql_time'] - self.sql_time)
+
+        return min(deadlines) if deadlines else None
+
+    def check(self, limit, used):
+        allowed = self.limits[limit]
+        if allowed is None or used <= allowed or limit in self.violations:
+            return
+
+        self.violations.add(limit)
+        with _lock:
+            _violation_counts[self.name, limit] += 1
+
+        unit = '{:d}' if limit == 'queries' else '{:.4f}s'
+        message = '{name} exceeded its {limit} budget: {used} (allowed {allowed}).'.format(
+            name=self.name,
+            limit=limit.replace('_', ' '),
+            used=unit.format(used),
+            allowed=unit.format(allowed)
+        )
+        logger.warning(message)
+
+        if self.enforce:
+            self.message = message
+            raise QueryBudgetExceeded(message)
+
+    def before_query(self, sql):
+        with self._lock:
+            if self.aborted:
+                # Anything else, e.g. a later sub-request of a batch, is refused too.
+                if sql.lstrip().upper().startswith(CLEANUP_STATEMENTS):
+                    return
+                raise QueryBudgetExceeded(self.message)
+
+            self.queries += 1
+            self.check('queries', self.queries)
+            self.check('wall_time', self.wall_time())
+
+    def after_query(self, seconds):
+        with self._lock:
+            if self.aborted:
+                return
+
+            self.sql_time += seconds
+            self.check('sql_time', self.sql_time)
+            self.check('wall_time', self.wall_time())
+
+
+def get_violation_counts():
+    """Returns a copy of the violation counts, keyed by (view, limit)."""
+    with _lock:
+        return dict(_violation_counts)
+
+
+def reset_violation_counts():
+    with _lock:
+        _violation_counts.clear()
+
+
+def current_tracker():
+    """Returns the tracker holding this thread's queries, or None."""
+    return getattr(_local, 'tracker', None)
+
+
+@contextmanager
+def carry(tracker, interrupt=True):
+    """
+    Counts the queries run on this thread against `tracker` until the block
+    exits. Pass `interrupt=False` inside a transaction shared with other
+    work: SQLite rolls back the whole transaction of an interrupted write,
+    so there statements run to the end and are only checked afterwards.
+    """
+    previous = current_tracker(), getattr(_local, 'interrupt', True)
+
+    _local.tracker, _local.interrupt = tracker, interrupt
+    try:
+        yield tracker
+    finally:
+        _local.tracker, _local.interrupt = previous
+
+
+def track(name, budget, mode=None):
+    """Holds the queries run on this thread to `budget` until the block exits."""
+    return carry(BudgetTracker(name, budget, mode or settings.QUERY_BUDGET_MODE))
+
+
+class BudgetCursor:
+    """Counts and times every statement against the thread's budget."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def execute(self, sql, params=None):
+        return self._run(self.cursor.execute, sql, params)
+
+    def executemany(self, sql, param_list):
+        return self._run(self.cursor.executemany, sql, param_list)
+
+    def _run(self, method, sql, params):
+        tracker = current_tracker()
+        if tracker is None:
+            return method(sql, params)
+
+        tracker.before_query(sql)
+
+        deadline = tracker.deadline() if tracker.enforce and getattr(_local, 'interrupt', True) else None
+        interruptible = deadline is not None and self.cursor.db.vendor == 'sqlite'
+        if interruptible:
+            connection = self.cursor.db.connection
+            connection.set_progress_handler(lambda: time.perf_counter() > deadline, PROGRESS_INSTRUCTIONS)
+
+        start = time.perf_counter()
+        try:
+            result = method(sql, params)
+        except DatabaseError as error:
+            # An interrupted statement ran out of time; report it as such.
+            if interruptible and 'interrupted' in str(error):
+                tracker.after_query(time.perf_counter() - start)
+            raise
+        finally:
+            if interruptible:
+                connection.set_progress_handler(None, 0)
+
+        tracker.after_query(time.perf_counter() - start)
+
+        return result
+
+
+def install():
+    """Wraps the cursors of every database connection, once."""
+    if getattr(BaseDatabaseWrapper, '_query_budgets', False):
+        return
+
+    make_cursor, make_debug_cursor = BaseDatabaseWrapper.make_cursor, BaseDatabaseWrapper.make_debug_cursor
+    BaseDatabaseWrapper.make_cursor = lambda self, cursor: BudgetCursor(make_cursor(self, cursor))
+    BaseDatabaseWrapper.make_debug_cursor = lambda self, cursor: BudgetCursor(make_debug_cursor(self, cursor))
+    BaseDatabaseWrapper._query_budgets = True
+
+
+def view_budget(view_func, request):
+    """Returns (name, budget) for a DRF view, or None for other views."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return None
+
+    actions = getattr(view_func, 'actions', None)
+    action = actions.get(request.method.lower()) if actions else request.method.lower()
+    by_action = getattr(view_class, 'query_budget_by_action', {})
+    budget = by_action.get(action) or getattr(view_class, 'query_budget', None) or QueryBudget()
+
+    return '{view}.{action}'.format(view=view_class.__name__, action=action), budget
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        if settings.QUERY_BUDGET_MODE not in ('enforce', 'report'):
+            raise MiddlewareNotUsed
+
+        install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._query_budget = ExitStack()
+
+        with request._query_budget:
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        found = view_budget(view_func, request)
+        if found is not None:
+            request._query_budget.enter_context(track(*found))
@@ -0,0 +1,99 @@
+"""
+Negotiated response compression for `/api/`.
+
+Responses of at least `COMPRESSION_MIN_SIZE` bytes are compressed with the
+encoding the client ranks highest in `Accept-Encoding`. Brotli is offered
+when the optional `brotli` package is installed, gzip always.
+"""
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+PATH_PREFIX = '/api/'
+
+
+def compress_gzip(content):
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+
+
+def compress_brotli(content):
+    return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+
+
+# In order of preference when the client ranks several encodings equally.
+ENCODINGS = [('gzip', compress_gzip)]
+if brotli is not None:
+    ENCODINGS.insert(0, ('br', compress_brotli))
+
+
+def parse_accept_encoding(header):
+    """Returns {coding: quality} for an `Accept-Encoding` header."""
+    qualities = {}
+
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        if not coding:
+            continue
+
+        quality = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+
+        qualities[coding.strip().lower()] = quality
+
+    return qualities
+
+
+def choose_encoding(header):
+    qualities = parse_accept_encoding(header)
+    wildcard = qualities.get('*', 0.0)
+    best, best_quality = None, 0.0
+
+    for name, compress in ENCODINGS:
+        quality = qualities.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = (name, compress), quality
+
+    return best
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (not request.path.startswith(PATH_PREFIX) or response.streaming
+                or response.has_header('Content-Encoding')
+                or len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        name, compress = encoding
+        compressed = compress(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = name
+
+        # ETags name the row version, whatever the encoding, and stay strong:
+        # If-Match compares them strongly.
+        return response
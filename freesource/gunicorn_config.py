@@ -0,0 +1,35 @@
+"""
+Multi-process deployment profile:
+
+    gunicorn -c freesource/gunicorn_config.py freesource.wsgi
+
+`preload_app` imports `freesource.wsgi` (and so runs `warm_up`) once in the
+master; workers fork from it and share the loaded apps, URLconf and
+serializer field maps copy-on-write. Caches are shared through the file
+backend configured in `settings.CACHES`.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('FREESOURCE_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('FREESOURCE_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# More than one thread switches to the threaded worker, which comment streams
+# need: each open stream holds a thread, up to COMMENT_STREAM_MAX_STREAMS.
+threads = int(os.environ.get('FREESOURCE_THREADS', 16))
+preload_app = True
+max_requests = int(os.environ.get('FREESOURCE_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+
+def pre_fork(server, worker):
+    # Python 3.7+: move the preloaded objects out of the collector's reach,
+    # so collections in a worker don't write to (and copy) shared pages.
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Connections are per process; never inherit one opened during preload.
+    from django.db import connections
+    connections.close_all()
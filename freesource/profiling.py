@@ -0,0 +1,114 @@
+"""
+Opt-in per-field serializer profiling.
+
+Serializers that mix in `FieldProfilingMixin` record, while `profile_fields()`
+is active on the current thread, how often each field was rendered, the
+time spent on it and the queries it triggered. Times and queries of nested
+serializers are included in the field that holds them.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+_local = threading.local()
+
+
+class FieldProfile:
+    def __init__(self):
+        self.fields = {}
+
+    def add(self, key, seconds, queries):
+        calls, total_seconds, total_queries = self.fields.get(key, (0, 0.0, 0))
+        self.fields[key] = (calls + 1, total_seconds + seconds, total_queries + queries)
+
+    def as_dict(self):
+        ranked = sorted(self.fields.items(), key=lambda item: -item[1][1])
+
+        return OrderedDict(
+            (key, {'calls': calls, 'ms': round(seconds * 1e3, 3), 'queries': queries})
+            for key, (calls, seconds, queries)
+            in ranked
+        )
+
+
+@contextmanager
+def profile_fields():
+    profile = FieldProfile()
+    previous = getattr(_local, 'profile', None)
+    debug_cursor, queries_log = connection.force_debug_cursor, connection.queries_log
+
+    # An unbounded log, so query counts stay right past `queries_limit`.
+    _local.profile = profile
+    connection.force_debug_cursor, connection.queries_log = True, []
+    try:
+        yield profile
+    finally:
+        _local.profile = previous
+        connection.force_debug_cursor, connection.queries_log = debug_cursor, queries_log
+
+
+class FieldProfilingMixin:
+    def to_representation(self, instance):
+        profile = getattr(_local, 'profile', None)
+        if profile is None:
+            return super().to_representation(instance)
+
+        # Mirrors `Serializer.to_representation`, timing every field.
+        ret = OrderedDict()
+        name = type(self).__name__
+
+        for field in self._readable_fields:
+            start, queries = time.perf_counter(), len(connection.queries_log)
+
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            if check_for_none is None:
+                ret[field.field_name] = None
+            else:
+                ret[field.field_name] = field.to_representation(attribute)
+
+            profile.add(
+                '{name}.{field}'.format(name=name, field=field.field_name),
+                time.perf_counter() - start,
+                len(connection.queries_log) - queries
+            )
+
+        return ret
+
+
+class SerializerProfilingMiddleware:
+    """
+    With `SERIALIZER_PROFILING` on, requests that send `X-Profile-Serializers: 1`
+    get the field profile back as JSON in the `X-Serializer-Profile` header.
+    """
+    request_header = 'HTTP_X_PROFILE_SERIALIZERS'
+    response_header = 'X-Serializer-Profile'
+
+    def __init__(self, get_response):
+        if not settings.SERIALIZER_PROFILING:
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.META.get(self.request_header) != '1':
+            return self.get_response(request)
+
+        with profile_fields() as profile:
+            response = self.get_response(request)
+
+        response[self.response_header] = json.dumps(profile.as_dict(), separators=(',', ':'))
+
+        return response
@@ -0,0 +1,23 @@
+import msgpack
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Turns dates, decimals, UUIDs and lazy strings into the values the JSON renderer would emit.
+_encoder = JSONEncoder()
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Compact binary alternative to JSON, picked with `Accept: application/msgpack`.
+    Requires the optional `msgpack` package, see `settings.OPTIONAL_RENDERER_CLASSES`.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/1.11/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -31,7 +32,8 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # No autodiscovery at start-up: `freesource.urls_admin` runs it on first use.
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -43,16 +45,20 @@ INSTALLED_APPS = [
 
     'users',
     'resources',
+    'audit',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'freesource.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'freesource.profiling.SerializerProfilingMiddleware',
+    'freesource.budgets.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'freesource.urls'
@@ -75,6 +81,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'freesource.wsgi.application'
 
+TEST_RUNNER = 'freesource.test_runner.TestRunner'
+
 
 # Database
 # https://docs.djangoproject.com/en/1.11/ref/settings/#databases
@@ -82,7 +90,24 @@ WSGI_APPLICATION = 'freesource.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get('FREESOURCE_DB_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'OPTIONS': {
+            # Seconds a connection waits on SQLite's write lock before "database is locked".
+            'timeout': int(os.environ.get('FREESOURCE_DB_TIMEOUT', 20)),
+        },
+    }
+}
+
+
+# Cache
+# File based, so every worker process started by `freesource/gunicorn_config.py`
+# reads and invalidates the same entries.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('FREESOURCE_CACHE_DIR', os.path.join(BASE_DIR, '.cache')),
+        'TIMEOUT': 300,
     }
 }
 
@@ -124,3 +149,144 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/1.11/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Audit log
+# Events are buffered per process and written in batches.
+
+AUDIT_BATCH_SIZE = 100
+
+AUDIT_FLUSH_INTERVAL = 5
+
+
+# Related resources
+# How many neighbours are kept per resource in the precomputed index.
+
+RELATED_RESOURCES_LIMIT = 10
+
+
+# Trending resources
+# Comment activity loses half its weight every TRENDING_HALF_LIFE_HOURS.
+# Run `manage.py refresh_trending --rebuild` after changing it.
+
+TRENDING_HALF_LIFE_HOURS = 24
+
+
+# User activity
+# How many recent resources and comments a user profile lists.
+
+USER_ACTIVITY_RECENT_ITEMS = 10
+
+
+# Serializer profiling
+# Lets requests ask for per-field serializer timings, see `freesource/profiling.py`.
+
+SERIALIZER_PROFILING = DEBUG
+
+
+# Comment writes
+# Comments posted outside a transaction are committed by a single writer
+# thread in groups of up to COMMENT_WRITE_BATCH_SIZE, waiting at most
+# COMMENT_WRITE_MAX_DELAY seconds for a group to fill. A group that hits a
+# locked database is retried COMMENT_WRITE_RETRIES times, backing off from
+# COMMENT_WRITE_RETRY_DELAY seconds.
+
+COMMENT_WRITE_COALESCING = True
+COMMENT_WRITE_BATCH_SIZE = 50
+COMMENT_WRITE_MAX_DELAY = 0.005
+COMMENT_WRITE_RETRIES = 3
+COMMENT_WRITE_RETRY_DELAY = 0.1
+
+
+# Response encoding
+# `/api/` responses of at least COMPRESSION_MIN_SIZE bytes are compressed with
+# brotli (if installed) or gzip, see `freesource/compression.py`. MessagePack
+# is offered next to JSON when the optional `msgpack` package is installed.
+
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+
+OPTIONAL_RENDERER_CLASSES = (
+    ('freesource.renderers.MessagePackRenderer',) if find_spec('msgpack') else ()
+)
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ) + OPTIONAL_RENDERER_CLASSES,
+}
+
+
+# Batch requests
+# Sub-requests accepted by one `/api/batch/` call, and threads used for its GETs
+# when the batch asks for parallel execution.
+
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+
+
+# Comment archival
+# `manage.py archive_comments` moves comments older than this many days from
+# `Comment` to `ArchivedComment`. Thread pages reach the archive only once
+# they run past the hot comments.
+
+COMMENT_ARCHIVE_AFTER_DAYS = 180
+
+
+# Catalogue snapshot
+# `manage.py export_snapshot` writes the catalogue to SNAPSHOT_PATH for
+# read-only replicas (see `settings_replica.py`), which look for a replaced
+# file at most every SNAPSHOT_CHECK_INTERVAL seconds.
+
+SNAPSHOT_PATH = os.environ.get('FREESOURCE_SNAPSHOT_PATH', os.path.join(BASE_DIR, 'catalogue.snapshot'))
+SNAPSHOT_CHECK_INTERVAL = 1.0
+
+
+# Comment streams
+# `/api/resources/<pk>/comments/stream/` holds a connection open per client,
+# and the worker thread serving it, so serve it with threaded workers
+# (FREESOURCE_THREADS). A process answers 503 to new streams while
+# COMMENT_STREAM_MAX_STREAMS are open, which by default keeps
+# COMMENT_STREAM_SPARE_THREADS of its threads for other requests. Comments
+# from other processes are found by polling every COMMENT_STREAM_POLL_INTERVAL
+# seconds. A stream sends a keep-alive after COMMENT_STREAM_KEEPALIVE idle
+# seconds and closes after COMMENT_STREAM_MAX_AGE seconds, or once its client
+# is COMMENT_STREAM_BUFFER events behind. Reconnecting clients get up to
+# COMMENT_STREAM_REPLAY missed comments replayed.
+
+COMMENT_STREAM_SPARE_THREADS = 4
+COMMENT_STREAM_MAX_STREAMS = int(os.environ.get(
+    'FREESOURCE_MAX_STREAMS',
+    max(int(os.environ.get('FREESOURCE_THREADS', 16)) - COMMENT_STREAM_SPARE_THREADS, 0)
+))
+COMMENT_STREAM_POLL_INTERVAL = 2.0
+COMMENT_STREAM_KEEPALIVE = 15.0
+COMMENT_STREAM_MAX_AGE = 300.0
+COMMENT_STREAM_BUFFER = 100
+COMMENT_STREAM_REPLAY = 100
+
+
+# Query budgets
+# API views declare `query_budget` (or `query_budget_by_action`) limits on
+# queries, SQL seconds and wall seconds per request; limits they leave out
+# come from QUERY_BUDGET_DEFAULT. QUERY_BUDGET_MODE is 'report' (log only),
+# 'enforce' (abort with 503) or 'off'. The limits were sized on the test
+# fixtures, so watch the reported violations on real data before enforcing.
+# See `freesource/budgets.py`.
+
+QUERY_BUDGET_MODE = os.environ.get('FREESOURCE_QUERY_BUDGET_MODE', 'report')
+QUERY_BUDGET_DEFAULT = {
+    'queries': 50,
+    'sql_time': 1.0,
+    'wall_time': 5.0,
+}
+
+
+# Admin changelists
+# Resource and comment changelists count at most ADMIN_CHANGELIST_MAX_COUNT
+# matching rows, so their pagination stops there instead of counting the
+# whole table on every page.
+
+ADMIN_CHANGELIST_MAX_COUNT = 10000
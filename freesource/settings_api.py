@@ -0,0 +1,46 @@
+"""
+API-only Django settings for freesource project.
+
+The API authenticates purely with `TokenAuthentication`, so `/api/` requests
+don't need sessions, CSRF, messages, clickjacking protection, the admin or
+the template context processors. Select this profile with
+DJANGO_SETTINGS_MODULE=freesource.settings_api.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, TEMPLATES, OPTIONAL_RENDERER_CLASSES
+
+
+INSTALLED_APPS = [
+    app
+    for app
+    in INSTALLED_APPS
+    if app not in (
+        'django.contrib.admin.apps.SimpleAdminConfig',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+    )
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'freesource.compression.CompressionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'freesource.budgets.QueryBudgetMiddleware',
+]
+
+TEMPLATES = [
+    dict(template, OPTIONS=dict(template['OPTIONS'], context_processors=[]))
+    for template
+    in TEMPLATES
+]
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'rest_framework.authentication.TokenAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'rest_framework.renderers.JSONRenderer',
+    ) + OPTIONAL_RENDERER_CLASSES,
+}
@@ -0,0 +1,15 @@
+"""
+Read-only replica settings for freesource project.
+
+Replicas serve the category list, category listings and resource
+list/detail endpoints from the catalogue snapshot at SNAPSHOT_PATH
+(exported with `manage.py export_snapshot`) and have no database.
+Select this profile with DJANGO_SETTINGS_MODULE=freesource.settings_replica.
+"""
+
+from .settings_api import *  # noqa: F401,F403
+
+
+ROOT_URLCONF = 'freesource.urls_replica'
+
+DATABASES = {}
@@ -0,0 +1,132 @@
+"""
+Measures a cold worker start: per-module import times while loading
+`freesource.wsgi`, then the time it takes to answer the first request.
+
+Runs in its own process so nothing is imported beforehand:
+
+    python -m freesource.startup [path] [--token KEY]
+
+Prints a JSON report; `manage.py profile_startup` wraps it.
+"""
+import argparse
+import json
+import sys
+import time
+from importlib.abc import MetaPathFinder
+
+
+class _TimedLoader:
+    def __init__(self, loader, name, timings, stack):
+        self._loader = loader
+        self._name = name
+        self._timings = timings
+        self._stack = stack
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._stack.append(0.0)
+        start = time.perf_counter()
+
+        try:
+            self._loader.exec_module(module)
+        finally:
+            cumulative = time.perf_counter() - start
+            children = self._stack.pop()
+
+            if self._stack:
+                self._stack[-1] += cumulative
+
+            self._timings[self._name] = (cumulative - children, cumulative)
+
+
+class ImportTimer(MetaPathFinder):
+    """Records self and cumulative execution time of every module imported."""
+
+    def __init__(self):
+        self.timings = {}
+        self._stack = []
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+
+            if hasattr(spec.loader, 'exec_module'):
+                spec.loader = _TimedLoader(spec.loader, fullname, self.timings, self._stack)
+
+            return spec
+
+        return None
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        sys.meta_path.remove(self)
+
+
+def first_response(application, path, token=None):
+    from wsgiref.util import setup_testing_defaults
+    from django.conf import settings
+
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')]
+    environ = {'PATH_INFO': path, 'HTTP_HOST': hosts[0] if hosts else 'localhost'}
+    if token:
+        environ['HTTP_AUTHORIZATION'] = 'Token {key}'.format(key=token)
+    setup_testing_defaults(environ)
+
+    statuses = []
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b''.join(body)
+
+    if hasattr(body, 'close'):
+        body.close()
+
+    return statuses[0]
+
+
+def profile(path, token=None):
+    timer = ImportTimer()
+    timer.install()
+
+    start = time.perf_counter()
+    from freesource.wsgi import application
+    booted = time.perf_counter()
+
+    timer.uninstall()
+
+    status = first_response(application, path, token)
+    responded = time.perf_counter()
+
+    return {
+        'boot': booted - start,
+        'first_response': responded - booted,
+        'status': status,
+        'imports': sorted(
+            ([name, own, cumulative] for name, (own, cumulative) in timer.timings.items()),
+            key=lambda timing: timing[2],
+            reverse=True
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', nargs='?', default='/api/categories/')
+    parser.add_argument('--token')
+    args = parser.parse_args()
+
+    print(json.dumps(profile(args.path, args.token)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+
+        # Keep tests away from the shared file cache of the development server.
+        settings.CACHES = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        }
+        # Events left over from earlier tests would otherwise be flushed by
+        # whichever request finishes once they are old enough, and show up in
+        # that test's query counts.
+        settings.AUDIT_FLUSH_INTERVAL = float('inf')
+
+    def teardown_databases(self, old_config, **kwargs):
+        # Events buffered by the last tests belong to rolled back data; don't
+        # let the exit-time flush write them into the development database.
+        from audit.buffer import event_log
+        event_log.clear()
+
+        super().teardown_databases(old_config, **kwargs)
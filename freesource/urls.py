@@ -13,10 +13,15 @@ Including another URLconf
     1. Import the include() function: from django.conf.urls import url, include
     2. Add a URL to urlpatterns:  url(r'^blog/', include('blog.urls'))
 """
+from django.apps import apps
 from django.conf.urls import url, include
-from django.contrib import admin
+from django.urls import RegexURLResolver
 
 urlpatterns = [
-    url(r'^admin/', admin.site.urls),
     url(r'^api/', include('freesource.api'))
 ]
+
+# The API-only settings profile leaves the admin out entirely. Elsewhere it is
+# mounted by dotted path, which the resolver only imports on first use.
+if apps.is_installed('django.contrib.admin'):
+    urlpatterns.append(RegexURLResolver(r'^admin/', 'freesource.urls_admin', app_name='admin', namespace='admin'))
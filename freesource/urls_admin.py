@@ -0,0 +1,10 @@
+"""
+Admin URL configuration. `freesource.urls` mounts it by dotted path, so it is
+imported, and the admin modules of every app autodiscovered, only when a
+request first reaches `/admin/` or an admin URL is reversed.
+"""
+from django.contrib import admin
+
+admin.autodiscover()
+
+urlpatterns = admin.site.get_urls()
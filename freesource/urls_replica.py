@@ -0,0 +1,6 @@
+"""URL configuration of read-only replicas, see `settings_replica`."""
+from django.conf.urls import url, include
+
+urlpatterns = [
+    url(r'^api/', include('resources.urls_replica')),
+]
@@ -0,0 +1,43 @@
+from django.urls import get_resolver
+from rest_framework.settings import api_settings
+
+
+def _walk(resolver):
+    # Compiles every regex and fills the reverse lookup tables of included
+    # URLconfs up front. The root's tables are left alone: filling them would
+    # import the URLconfs mounted by dotted path, i.e. the admin, which stay
+    # lazy until the first request or URL reversal that needs them.
+    for pattern in resolver.url_patterns:
+        pattern.regex
+
+        if isinstance(getattr(pattern, 'urlconf_name', None), str):
+            continue
+
+        if hasattr(pattern, 'url_patterns'):
+            pattern.reverse_dict
+            yield from _walk(pattern)
+        else:
+            yield pattern.callback
+
+
+def warm_up():
+    """
+    Pre-resolves the URLconf and builds every routed serializer's field map,
+    so the first request served by a fresh worker doesn't pay for it.
+    No database connection is opened, which keeps it safe to run pre-fork.
+    """
+    for setting in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES',
+                    'DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES',
+                    'DEFAULT_CONTENT_NEGOTIATION_CLASS', 'DEFAULT_METADATA_CLASS'):
+        getattr(api_settings, setting)
+
+    serializer_classes = set()
+    for callback in _walk(get_resolver()):
+        view_class = getattr(callback, 'cls', None)
+        serializer_class = getattr(view_class, 'serializer_class', None)
+
+        if serializer_class is not None:
+            serializer_classes.add(serializer_class)
+
+    for serializer_class in serializer_classes:
+        serializer_class().fields
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "freesource.settings")
 
 application = get_wsgi_application()
+
+# Set FREESOURCE_WARM_UP=0 to resolve URLs and serializers lazily instead.
+if os.environ.get('FREESOURCE_WARM_UP', '1') != '0':
+    from freesource.warmup import warm_up
+
+    warm_up()
@@ -0,0 +1,186 @@
+"""
+Keeps `users.UserActivity` in step with the resource and comment write
+paths. Every function touches each affected user's row once.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+
+from audit.buffer import event_log
+from audit.models import Event
+from users.models import UserActivity
+
+from .models import Category, Resource, Comment, ArchivedComment
+from .utils import BATCH_SIZE, chunks
+
+ResourceCategory = Resource.categories.through
+
+
+def resource_created(resource):
+    UserActivity.objects.adjust(
+        resource.owner_id,
+        resources=1,
+        recent={'type': 'resource', 'id': resource.id, 'title': resource.title}
+    )
+
+
+def comment_created(comment):
+    UserActivity.objects.adjust(
+        comment.author_id,
+        comments=1,
+        recent={'type': 'comment', 'id': comment.id, 'resource': comment.resource_id}
+    )
+
+
+def resources_deleted(ids):
+    owners = dict(Resource.all_objects.filter(id__in=ids).values_list('id', 'owner_id'))
+    links = ResourceCategory.objects.filter(resource_id__in=ids) \
+        .values_list('resource_id', 'category_id', 'category__name')
+
+    categories = defaultdict(list)
+    for resource_id, category_id, name in links:
+        categories[owners[resource_id]].append((category_id, name, -1))
+
+    forget = defaultdict(list)
+    for resource_id, owner_id in owners.items():
+        forget[owner_id].append(('resource', resource_id))
+
+    for owner_id, resources in forget.items():
+        UserActivity.objects.adjust(
+            owner_id,
+            resources=-len(resources),
+            categories=categories[owner_id],
+            forget=resources
+        )
+
+
+def comments_deleted(ids, model=Comment):
+    """
+    Uncounts deleted comments, whatever thread or user they belong to, in a
+    few queries: one counter update per distinct number of comments a user
+    lost, and a write of the recent activity only where it shows one of them.
+    """
+    if not ids:
+        return
+
+    forget = defaultdict(set)
+    for comment_id, author_id in model._base_manager.filter(id__in=ids).values_list('id', 'author_id'):
+        forget[author_id].add(('comment', comment_id))
+
+    authors = defaultdict(list)
+    for author_id, comments in forget.items():
+        authors[len(comments)].append(author_id)
+
+    with transaction.atomic():
+        for count, author_ids in authors.items():
+            for chunk in chunks(author_ids):
+                UserActivity.objects.filter(user_id__in=chunk).update(comment_count=F('comment_count') - count)
+
+        for chunk in chunks(forget):
+            for activity in UserActivity.objects.select_for_update().filter(user_id__in=chunk).only('recent'):
+                recent_items = activity.recent_items
+                kept = [item for item in recent_items if (item['type'], item['id']) not in forget[activity.user_id]]
+                if len(kept) < len(recent_items):
+                    activity.recent_items = kept
+                    activity.save(update_fields=['recent'])
+
+
+def links_changed(pairs, delta):
+    """Counts added (`delta=1`) or removed (`delta=-1`) links of live resources."""
+    if not pairs:
+        return
+
+    owners = dict(
+        Resource.objects.filter(id__in={resource_id for resource_id, _ in pairs})
+        .values_list('id', 'owner_id')
+    )
+    names = dict(
+        Category.objects.filter(id__in={category_id for _, category_id in pairs})
+        .values_list('id', 'name')
+    )
+
+    categories = defaultdict(list)
+    for resource_id, category_id in pairs:
+        if resource_id in owners:
+            categories[owners[resource_id]].append((category_id, names.get(category_id, ''), delta))
+
+    for owner_id, owner_categories in categories.items():
+        UserActivity.objects.adjust(owner_id, categories=owner_categories)
+
+
+def recent_activity(user_id):
+    """
+    Replays a user's latest creations that are still live from the audit
+    log. Comments of deleted resources stay until `purge_deleted` forgets
+    them, as they do in the incremental summary.
+    """
+    titles = dict(Resource.objects.filter(owner_id=user_id).values_list('id', 'title'))
+    comments = dict(
+        Comment.all_objects.filter(author_id=user_id, is_deleted=False).values_list('id', 'resource_id')
+    )
+    comments.update(ArchivedComment.objects.filter(author_id=user_id).values_list('id', 'resource_id'))
+    events = Event.objects.filter(
+        actor_id=user_id,
+        action=Event.CREATE,
+        model__in=(Resource._meta.label, Comment._meta.label)
+    ).order_by('-timestamp', '-id').values_list('model', 'object_id', 'timestamp')
+
+    recent = []
+    for model, object_id, timestamp in events.iterator():
+        if model == Resource._meta.label and object_id in titles:
+            item = {'type': 'resource', 'id': object_id, 'title': titles[object_id]}
+        elif model == Comment._meta.label and object_id in comments:
+            item = {'type': 'comment', 'id': object_id, 'resource': comments[object_id]}
+        else:
+            continue
+
+        item['at'] = timestamp.isoformat()
+        recent.append(item)
+        if len(recent) == settings.USER_ACTIVITY_RECENT_ITEMS:
+            break
+
+    return recent
+
+
+def rebuild_user_activity():
+    """
+    Recomputes every summary row from the live rows, counting comments of
+    deleted resources until `purge_deleted` removes them. Returns the number
+    written.
+    """
+    event_log.flush()
+
+    resource_counts = dict(
+        Resource.objects.order_by().values_list('owner_id').annotate(count=Count('id'))
+    )
+    comment_counts = Counter(dict(
+        Comment.all_objects.filter(is_deleted=False).order_by().values_list('author_id').annotate(count=Count('id'))
+    ))
+    comment_counts.update(dict(
+        ArchivedComment.objects.order_by().values_list('author_id').annotate(count=Count('id'))
+    ))
+    category_counts = defaultdict(dict)
+    links = ResourceCategory.objects.filter(resource__is_deleted=False).order_by() \
+        .values_list('resource__owner_id', 'category_id', 'category__name') \
+        .annotate(count=Count('id'))
+    for owner_id, category_id, name, count in links:
+        category_counts[owner_id][str(category_id)] = {'name': name, 'count': count}
+
+    rows = []
+    for user_id in set(resource_counts) | set(comment_counts):
+        activity = UserActivity(
+            user_id=user_id,
+            resource_count=resource_counts.get(user_id, 0),
+            comment_count=comment_counts.get(user_id, 0)
+        )
+        activity.category_counts = category_counts[user_id]
+        activity.recent_items = recent_activity(user_id)
+        rows.append(activity)
+
+    with transaction.atomic():
+        UserActivity.objects.all().delete()
+        UserActivity.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+    return len(rows)
@@ -1,11 +1,107 @@
+import string
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import CharField, Q
+from django.db.models.functions import Lower
+from django.utils.functional import cached_property
+
+from .models import Category, Resource, Comment
+
+CharField.register_lookup(Lower)
+
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def fold_case(term):
+    """Lower-cases `term` the way SQLite's `lower()` does: ASCII letters only."""
+    return term.translate(ASCII_LOWER)
+
+
+def search_condition(model, search_field, term):
+    """
+    `^field` as a range and `=field` as an exact match on `lower(field)`,
+    both of which the `lower()` indexes from migration 0014 answer. A field
+    across a foreign key becomes a subquery on the key's own index, so an OR
+    of several fields can use one index each.
+    """
+    field_name = search_field.lstrip('^=')
+    relation, _, field_name = field_name.rpartition('__')
+    term = fold_case(term)
+
+    if search_field.startswith('^'):
+        condition = Q(**{
+            field_name + '__lower__gte': term,
+            field_name + '__lower__lt': term[:-1] + chr(ord(term[-1]) + 1)
+        })
+    else:
+        condition = Q(**{field_name + '__lower': term})
+
+    if not relation:
+        return condition
+
+    related_model = model._meta.get_field(relation).related_model
+    return Q(**{relation + '__in': related_model._base_manager.filter(condition).values('pk')})
 
-from .models import Category, Resource
 
+class CappedCountPaginator(Paginator):
+    """
+    Counts at most `ADMIN_CHANGELIST_MAX_COUNT` rows, so a changelist never
+    counts the whole table. Past the cap the changelist reports the cap and
+    its page links stop there; search or filter to reach older rows.
+    """
 
-class ResourceAdmin(admin.ModelAdmin):
+    @cached_property
+    def count(self):
+        return self.object_list.order_by()[:settings.ADMIN_CHANGELIST_MAX_COUNT].count()
+
+
+class IndexedSearchMixin:
+    """
+    Only supports `^` (prefix) and `=` (exact) search fields, both
+    case-insensitive. The admin's own lookups are LIKEs, which SQLite can't
+    answer from the indexes.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        for term in search_term.split():
+            conditions = Q()
+            for search_field in self.search_fields:
+                conditions |= search_condition(self.model, search_field, term)
+            queryset = queryset.filter(conditions)
+
+        return queryset, False
+
+
+class ResourceAdmin(IndexedSearchMixin, admin.ModelAdmin):
     fields = ('title', 'categories', 'resource_url', 'owner')
+    list_display = ('id', 'title', 'owner', 'version', 'is_deleted')
+    list_filter = ('is_deleted',)
+    list_select_related = ('owner',)
+    raw_id_fields = ('owner', 'categories')
+    search_fields = ('^title', '=owner__username')
+    show_full_result_count = False
+    paginator = CappedCountPaginator
+
+    def get_queryset(self, request):
+        return Resource.all_objects.select_related('owner')
+
+
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    fields = ('resource', 'content', 'author')
+    list_display = ('id', 'resource', 'author', 'posted_on', 'is_deleted')
+    list_filter = ('is_deleted',)
+    list_select_related = ('resource__owner', 'author')
+    raw_id_fields = ('resource', 'author')
+    search_fields = ('=resource__title', '=author__username')
+    show_full_result_count = False
+    paginator = CappedCountPaginator
+
+    def get_queryset(self, request):
+        return Comment.all_objects.select_related('resource__owner', 'author')
 
 
 admin.site.register(Category)
 admin.site.register(Resource, ResourceAdmin)
+admin.site.register(Comment, CommentAdmin)
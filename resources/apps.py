@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ResourcesConfig(AppConfig):
     name = 'resources'
+
+    def ready(self):
+        from . import signals
+
+        signals.connect()
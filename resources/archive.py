@@ -0,0 +1,60 @@
+"""
+Hot/cold split of comment threads.
+
+`Comment` only keeps the recent, hot part of every thread; older comments
+are moved to `ArchivedComment` in batches by `manage.py archive_comments`.
+Comment ids follow posting order, so archived rows are always older than the
+hot ones and a thread read newest first only reaches the archive once it
+has paged past the hot rows.
+"""
+from django.db import transaction
+
+from .models import Comment, ArchivedComment
+
+ARCHIVED_FIELDS = ('id', 'resource_id', 'content', 'author_id', 'posted_on', 'version')
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Moves up to `batch_size` live comments posted before `cutoff` to the
+    archive in one transaction. Returns the number of comments moved.
+    Soft-deleted comments stay behind for `purge_deleted`.
+    """
+    with transaction.atomic():
+        rows = list(
+            Comment.objects
+            .select_for_update()
+            .filter(posted_on__lt=cutoff)
+            .order_by('id')
+            .values(*ARCHIVED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+
+        ArchivedComment.objects.bulk_create([ArchivedComment(**row) for row in rows])
+        Comment.all_objects.filter(id__in=[row['id'] for row in rows]).delete()
+
+    return len(rows)
+
+
+def thread_page(resource, limit, before=None):
+    """
+    Returns up to `limit` comments of `resource` older than the `before` id,
+    newest first, and whether there are more. The archive is only queried
+    when the hot rows run out.
+    """
+    hot = Comment.objects.filter(resource=resource).select_related('author').order_by('-id')
+    if before is not None:
+        hot = hot.filter(id__lt=before)
+
+    comments = list(hot[:limit + 1])
+    if len(comments) <= limit:
+        cold = ArchivedComment.objects.filter(resource=resource).select_related('author').order_by('-id')
+        if comments:
+            cold = cold.filter(id__lt=comments[-1].id)
+        elif before is not None:
+            cold = cold.filter(id__lt=before)
+
+        comments.extend(cold[:limit + 1 - len(comments)])
+
+    return comments[:limit], len(comments) > limit
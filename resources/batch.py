@@ -0,0 +1,158 @@
+"""
+Runs the sub-requests of a `/api/batch/` call against the resolver.
+
+Sub-requests go straight to the view: the middleware stack and the
+authentication already ran once for the enclosing batch request, whose
+user and token are handed to every sub-request.
+"""
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connection, transaction
+from django.urls import Resolver404, resolve
+from rest_framework import status
+
+from freesource.budgets import carry, current_tracker
+
+logger = logging.getLogger(__name__)
+
+# The only parts of the batch request a sub-request inherits. Headers such as
+# If-Match or Accept were meant for the batch call itself, not for every call
+# it contains.
+INHERITED_ENVIRON = (
+    'SERVER_NAME', 'SERVER_PORT', 'SERVER_PROTOCOL', 'SCRIPT_NAME', 'REMOTE_ADDR', 'HTTP_HOST', 'HTTP_AUTHORIZATION'
+)
+
+
+def build_request(request, method, path, body):
+    path, _, query_string = path.partition('?')
+    content = json.dumps(body).encode() if body is not None else b''
+
+    environ = {
+        key: value
+        for key, value
+        in request.META.items()
+        if key in INHERITED_ENVIRON or key.startswith('wsgi.')
+    }
+    environ.update(
+        REQUEST_METHOD=method,
+        PATH_INFO=path,
+        QUERY_STRING=query_string,
+        CONTENT_TYPE='application/json',
+        CONTENT_LENGTH=str(len(content))
+    )
+    environ['wsgi.input'] = io.BytesIO(content)
+
+    sub_request = WSGIRequest(environ)
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+
+    return sub_request
+
+
+def error(status_code, detail):
+    return {'status': status_code, 'headers': {}, 'body': {'detail': detail}}
+
+
+def not_found():
+    return error(status.HTTP_404_NOT_FOUND, 'Not found.')
+
+
+def call_view(match, sub_request):
+    # Inside a transaction a failed sub-request only rolls back its own savepoint.
+    if connection.in_atomic_block:
+        with transaction.atomic():
+            return match.func(sub_request, *match.args, **match.kwargs)
+
+    return match.func(sub_request, *match.args, **match.kwargs)
+
+
+def dispatch(request, item):
+    tracker = current_tracker()
+    if tracker is not None and tracker.aborted:
+        return error(status.HTTP_503_SERVICE_UNAVAILABLE, 'Not run: the batch exceeded its query budget.')
+
+    try:
+        match = resolve(item['path'].partition('?')[0])
+    except Resolver404:
+        return not_found()
+
+    # Only catalogue routes are batchable, and batches don't nest.
+    if match.app_names != ['resources'] or match.url_name == 'batch':
+        return not_found()
+
+    sub_request = build_request(request, item['method'], item['path'], item.get('body'))
+    try:
+        response = call_view(match, sub_request)
+    except Exception:
+        # One failing sub-request doesn't take the rest of the batch down.
+        logger.exception('Batched %s %s failed', item['method'], item['path'])
+        return error(status.HTTP_500_INTERNAL_SERVER_ERROR, 'A server error occurred.')
+
+    if response.streaming:
+        # Releases what the stream holds, e.g. a comment subscription.
+        # `response.close()` would also signal the end of the whole request.
+        for closable in response._closable_objects:
+            closable.close()
+        return error(status.HTTP_400_BAD_REQUEST, 'Streaming routes can\'t be batched.')
+
+    if hasattr(response, 'data'):
+        body = response.data
+    else:
+        body = response.content.decode() or None
+
+    headers = {
+        name: value
+        for name, value
+        in response.items()
+        if name not in ('Content-Type', 'Vary', 'Allow')
+    }
+
+    return {'status': response.status_code, 'headers': headers, 'body': body}
+
+
+def dispatch_in_thread(request, item, tracker):
+    try:
+        with carry(tracker):
+            return dispatch(request, item)
+    finally:
+        connection.close()
+
+
+def dispatch_all(request, items, parallel=False):
+    """
+    Runs `items` in order. With `parallel`, each run of consecutive GETs is
+    spread over a thread pool; writes still run one at a time in between.
+    Inside a transaction everything runs on this thread, because other
+    connections can't see its uncommitted rows. Either way every query
+    counts against the batch request's query budget.
+    """
+    parallel = parallel and not connection.in_atomic_block
+    tracker = current_tracker()
+    responses = [None] * len(items)
+    pending_gets = []
+
+    def run_pending_gets():
+        with ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS) as pool:
+            results = pool.map(lambda index: dispatch_in_thread(request, items[index], tracker), pending_gets)
+            for index, response in zip(pending_gets, results):
+                responses[index] = response
+        pending_gets.clear()
+
+    for index, item in enumerate(items):
+        if parallel and item['method'] == 'GET':
+            pending_gets.append(index)
+            continue
+
+        if pending_gets:
+            run_pending_gets()
+        responses[index] = dispatch(request, item)
+
+    if pending_gets:
+        run_pending_gets()
+
+    return responses
@@ -0,0 +1,261 @@
+"""
+Streaming bulk import of resources from CSV or JSONL files.
+
+Rows carry `title`, `resource_url`, `owner` (a username) and `categories`
+(a list in JSONL, `|`-separated in CSV). Owners and categories are resolved
+through in-memory maps that only ask the database about names they haven't
+seen yet, and missing ones are created. Every chunk is committed in one
+transaction, together with its change feed and user activity updates.
+"""
+import csv
+import json
+from collections import Counter, namedtuple
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+
+from users.models import UserActivity
+
+from .models import Category, Resource, Change
+from .normalization import normalize_url
+from .utils import BATCH_SIZE, chunks
+from . import activity
+
+ResourceCategory = Resource.categories.through
+
+validate_url = URLValidator()
+
+
+Row = namedtuple('Row', ('data', 'line', 'error', 'resume'))
+
+
+def read_rows(path, offset=0, line=0):
+    """
+    Yields the rows of a `.csv` or `.jsonl` file one at a time, as `Row`s
+    holding the parsed row and the line it starts on. `resume` is the byte
+    offset and line count just past the row: `read_rows(path, *row.resume)`
+    continues after it without reading what came before. A line that can't
+    be parsed comes back with `data` None and the reason in `error`.
+    """
+    with open(path, 'rb') as source:
+        if path.endswith('.csv'):
+            yield from read_csv(source, offset, line)
+        else:
+            yield from read_jsonl(source, offset, line)
+
+
+def type_error(data):
+    """Returns why a JSONL row's fields have the wrong types, or None."""
+    for field in ('title', 'resource_url', 'owner'):
+        if not isinstance(data.get(field) or '', str):
+            return '"{field}" must be a string.'.format(field=field)
+
+    categories = data.get('categories') or []
+    if not isinstance(categories, list) or not all(isinstance(name, str) for name in categories):
+        return '"categories" must be a list of strings.'
+
+    return None
+
+
+def read_jsonl(source, offset, line):
+    source.seek(offset)
+
+    for raw in iter(source.readline, b''):
+        line += 1
+        offset += len(raw)
+        if not raw.strip():
+            continue
+
+        try:
+            data = json.loads(raw.decode('utf-8'))
+        except ValueError as error:
+            yield Row(None, line, str(error), (offset, line))
+            continue
+
+        error = type_error(data) if isinstance(data, dict) else 'Expected a JSON object.'
+        if error is None:
+            yield Row(data, line, None, (offset, line))
+        else:
+            yield Row(None, line, error, (offset, line))
+
+
+def read_csv(source, offset, line):
+    # Where the lines handed to the csv reader so far end; records can span lines.
+    position = {'offset': 0, 'line': 0}
+    decode_errors = []
+
+    def lines(start):
+        source.seek(start)
+        position['offset'] = start
+        for raw in iter(source.readline, b''):
+            position['offset'] += len(raw)
+            position['line'] += 1
+            try:
+                yield raw.decode('utf-8')
+            except UnicodeDecodeError as error:
+                decode_errors.append(str(error))
+                yield '\n'
+
+    fields = next(csv.reader(lines(0)), None)
+    if fields is None:
+        return
+
+    if not offset:
+        offset, line = position['offset'], position['line']
+    position['line'] = line
+    reader = csv.reader(lines(offset))
+
+    while True:
+        first_line = position['line'] + 1
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as error:
+            yield Row(None, first_line, str(error), (position['offset'], position['line']))
+            continue
+
+        if decode_errors:
+            yield Row(None, first_line, decode_errors.pop(), (position['offset'], position['line']))
+            decode_errors.clear()
+        elif values:
+            data = dict(zip(fields, values))
+            data['categories'] = [name for name in (data.get('categories') or '').split('|') if name]
+            yield Row(data, first_line, None, (position['offset'], position['line']))
+
+
+class NameMap:
+    """Maps names to ids, loading and creating them on demand."""
+
+    def __init__(self, model, field, build):
+        self.model = model
+        self.field = field
+        self.build = build
+        self.ids = {}
+        self.created = []
+
+    def resolve(self, names):
+        missing = set(names) - set(self.ids)
+        if not missing:
+            return
+
+        self.ids.update(self.load(missing))
+
+        missing -= set(self.ids)
+        if missing:
+            self.model.objects.bulk_create([self.build(name) for name in missing], batch_size=BATCH_SIZE)
+            created = self.load(missing)
+            self.ids.update(created)
+            self.created.extend(created.values())
+
+    def load(self, names):
+        lookup = '{field}__in'.format(field=self.field)
+
+        return {
+            name: id
+            for chunk in chunks(names)
+            for name, id in self.model.objects.filter(**{lookup: chunk}).values_list(self.field, 'id')
+        }
+
+
+class ResourceImporter:
+    def __init__(self, default_owner=None):
+        self.default_owner = default_owner
+        # Imported owners can't log in until they set a password.
+        unusable_password = make_password(None)
+        self.owners = NameMap(
+            User, 'username',
+            lambda username: User(username=username, password=unusable_password)
+        )
+        self.categories = NameMap(Category, 'name', lambda name: Category(name=name))
+
+    def clean(self, row):
+        title = (row.get('title') or '').strip()
+        url = (row.get('resource_url') or '').strip()
+        owner = (row.get('owner') or self.default_owner or '').strip()
+
+        if not title or len(title) > 255 or not owner:
+            return None
+        try:
+            validate_url(url)
+        except ValidationError:
+            return None
+
+        categories = {name.strip().lower().title() for name in row.get('categories') or [] if name.strip()}
+
+        return {'title': title, 'resource_url': url, 'owner': owner, 'categories': categories}
+
+    def import_chunk(self, rows):
+        """
+        Inserts the valid rows that don't clash with an existing title or URL.
+        Returns the number of resources created.
+        """
+        rows = [row for row in map(self.clean, rows) if row is not None]
+        for row in rows:
+            row['resource_url_key'] = normalize_url(row['resource_url'])
+
+        with transaction.atomic():
+            taken_titles = set(
+                Resource.all_objects.filter(title__in=[row['title'] for row in rows])
+                .values_list('title', flat=True)
+            )
+            taken_keys = set(
+                Resource.objects.filter(resource_url_key__in=[row['resource_url_key'] for row in rows])
+                .values_list('resource_url_key', flat=True)
+            )
+
+            new_rows = []
+            for row in rows:
+                if row['title'] in taken_titles or row['resource_url_key'] in taken_keys:
+                    continue
+                taken_titles.add(row['title'])
+                taken_keys.add(row['resource_url_key'])
+                new_rows.append(row)
+
+            if not new_rows:
+                return 0
+
+            categories_before = len(self.categories.created)
+            self.owners.resolve(row['owner'] for row in new_rows)
+            self.categories.resolve(name for row in new_rows for name in row['categories'])
+
+            Resource.objects.bulk_create([
+                Resource(
+                    title=row['title'],
+                    resource_url=row['resource_url'],
+                    resource_url_key=row['resource_url_key'],
+                    owner_id=self.owners.ids[row['owner']]
+                )
+                for row in new_rows
+            ])
+            # SQLite doesn't return the ids of bulk inserted rows.
+            ids = dict(
+                Resource.objects.filter(title__in=[row['title'] for row in new_rows]).values_list('title', 'id')
+            )
+
+            pairs = [
+                (ids[row['title']], self.categories.ids[name])
+                for row in new_rows
+                for name in row['categories']
+            ]
+            ResourceCategory.objects.bulk_create([
+                ResourceCategory(resource_id=resource_id, category_id=category_id)
+                for resource_id, category_id in pairs
+            ])
+
+            Change.objects.record(Category, self.categories.created[categories_before:], Change.UPSERT)
+            Change.objects.record(Resource, ids.values(), Change.UPSERT)
+            Change.objects.record_links(pairs, Change.UPSERT)
+
+            for owner_id, count in Counter(self.owners.ids[row['owner']] for row in new_rows).items():
+                UserActivity.objects.adjust(owner_id, resources=count)
+            activity.links_changed(pairs, 1)
+
+        if len(self.categories.created) > categories_before:
+            cache.delete(Category.LIST_CACHE_KEY)
+
+        return len(new_rows)
@@ -0,0 +1,48 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from resources.archive import archive_batch
+from resources.utils import BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Moves comments older than COMMENT_ARCHIVE_AFTER_DAYS out of the hot table in bounded batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=settings.COMMENT_ARCHIVE_AFTER_DAYS,
+            help='Age in days after which comments are archived.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Comments per transaction, at most {max}.'.format(max=BATCH_SIZE)
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Seconds to sleep between batches to leave room for request traffic.'
+        )
+
+    def handle(self, *args, **options):
+        if not 0 < options['batch_size'] <= BATCH_SIZE:
+            raise CommandError('--batch-size must be between 1 and {max}.'.format(max=BATCH_SIZE))
+
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        start = time.perf_counter()
+        archived = 0
+
+        while True:
+            moved = archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+
+            archived += moved
+            time.sleep(options['pause'])
+
+        self.stdout.write('Archived {count} comments in {seconds:.2f}s.'.format(
+            count=archived,
+            seconds=time.perf_counter() - start
+        ))
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from resources.recommendations import build_related_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the related resources index from category co-occurrence.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Neighbours kept per resource.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rows = build_related_index(options['limit'])
+
+        self.stdout.write('Wrote {rows} related resources in {seconds:.2f}s.'.format(
+            rows=rows,
+            seconds=time.perf_counter() - start
+        ))
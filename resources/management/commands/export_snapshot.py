@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from resources.snapshot import export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Writes the catalogue snapshot served by read-only replicas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Snapshot file, defaults to SNAPSHOT_PATH.')
+
+    def handle(self, *args, **options):
+        path = options['output'] or settings.SNAPSHOT_PATH
+        start = time.perf_counter()
+        size = export_snapshot(path)
+
+        self.stdout.write('Wrote {size} bytes to {path} in {seconds:.2f}s.'.format(
+            size=size,
+            path=path,
+            seconds=time.perf_counter() - start
+        ))
@@ -0,0 +1,64 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from resources.models import Resource
+from resources.normalization import normalize_url
+
+
+class Command(BaseCommand):
+    help = 'Lists resources that share a normalized URL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild-keys', action='store_true',
+            help='Recompute every stored URL key first, e.g. after the normalization rules changed.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def rebuild_keys(self, batch_size):
+        resources = Resource.all_objects.only('id', 'resource_url', 'resource_url_key').order_by('id')
+        rebuilt, last_id = 0, 0
+
+        while True:
+            batch = list(resources.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return rebuilt
+
+            for resource in batch:
+                key = normalize_url(resource.resource_url)
+                if key != resource.resource_url_key:
+                    Resource.all_objects.filter(id=resource.id).update(resource_url_key=key)
+                    rebuilt += 1
+
+            last_id = batch[-1].id
+
+    def handle(self, *args, **options):
+        if options['rebuild_keys']:
+            rebuilt = self.rebuild_keys(options['batch_size'])
+            self.stdout.write('Rebuilt {count} URL keys.'.format(count=rebuilt))
+
+        duplicate_keys = (
+            Resource.objects
+            .values('resource_url_key')
+            .annotate(count=Count('id'))
+            .filter(count__gt=1)
+            .values_list('resource_url_key', flat=True)
+        )
+        resources = (
+            Resource.objects
+            .filter(resource_url_key__in=duplicate_keys)
+            .order_by('resource_url_key', 'id')
+            .values_list('resource_url_key', 'id', 'title', 'resource_url')
+        )
+
+        clusters = 0
+        for key, members in groupby(resources.iterator(), key=lambda resource: resource[0]):
+            clusters += 1
+            self.stdout.write(key)
+
+            for _, resource_id, title, resource_url in members:
+                self.stdout.write('    {id}\t{title}\t{url}'.format(id=resource_id, title=title, url=resource_url))
+
+        self.stdout.write('Found {count} duplicate clusters.'.format(count=clusters))
@@ -0,0 +1,108 @@
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resources.importing import ResourceImporter, read_rows
+from resources.recommendations import build_related_index
+from resources.utils import BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        'Streams resources from a CSV or JSONL file into the catalogue in chunks. '
+        'Progress is checkpointed after every chunk; running the same command again resumes from there.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='A .csv file with a header row, or a .jsonl file.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=BATCH_SIZE,
+            help='Rows per transaction, at most {max}.'.format(max=BATCH_SIZE)
+        )
+        parser.add_argument('--owner', help='Username for rows without an owner.')
+        parser.add_argument('--checkpoint', help='Checkpoint file, defaults to PATH.checkpoint.')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint.')
+
+    def read_checkpoint(self, checkpoint_path, source):
+        """Returns (rows, byte offset, line) to resume from."""
+        try:
+            with open(checkpoint_path) as checkpoint:
+                state = json.load(checkpoint)
+        except FileNotFoundError:
+            return 0, 0, 0
+
+        if state['size'] != source.st_size or state['mtime'] != source.st_mtime or 'offset' not in state:
+            self.stderr.write('The file changed since the checkpoint was written; starting over.')
+            return 0, 0, 0
+
+        return state['rows'], state['offset'], state['line']
+
+    def write_checkpoint(self, checkpoint_path, source, rows, row):
+        # Written aside and renamed, so an interruption never leaves half a checkpoint.
+        with open(checkpoint_path + '.tmp', 'w') as checkpoint:
+            json.dump({
+                'rows': rows,
+                'offset': row.resume[0],
+                'line': row.resume[1],
+                'size': source.st_size,
+                'mtime': source.st_mtime
+            }, checkpoint)
+        os.replace(checkpoint_path + '.tmp', checkpoint_path)
+
+    def handle(self, *args, **options):
+        if not 0 < options['chunk_size'] <= BATCH_SIZE:
+            raise CommandError('--chunk-size must be between 1 and {max}.'.format(max=BATCH_SIZE))
+
+        path = options['path']
+        checkpoint_path = options['checkpoint'] or path + '.checkpoint'
+        source = os.stat(path)
+
+        done, offset, line = (0, 0, 0) if options['restart'] else self.read_checkpoint(checkpoint_path, source)
+        if done:
+            self.stdout.write('Resuming after row {rows}.'.format(rows=done))
+
+        importer = ResourceImporter(default_owner=options['owner'])
+        # Seeks straight past the rows already imported.
+        rows = read_rows(path, offset, line)
+        start = time.perf_counter()
+        processed = imported = malformed = 0
+
+        while True:
+            chunk = list(islice(rows, options['chunk_size']))
+            if not chunk:
+                break
+
+            for row in chunk:
+                if row.error:
+                    malformed += 1
+                    self.stderr.write('Skipped line {line}: {error}'.format(line=row.line, error=row.error))
+
+            imported += importer.import_chunk([row.data for row in chunk if row.error is None])
+            processed += len(chunk)
+            self.write_checkpoint(checkpoint_path, source, done + processed, chunk[-1])
+
+            if options['verbosity'] > 1:
+                self.stdout.write('{rows} rows, {rate:.0f} rows/s'.format(
+                    rows=done + processed,
+                    rate=processed / (time.perf_counter() - start)
+                ))
+
+        if imported:
+            build_related_index()
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        seconds = time.perf_counter() - start
+        self.stdout.write(
+            'Imported {imported} of {processed} rows in {seconds:.2f}s ({rate:.0f} rows/s).'.format(
+                imported=imported,
+                processed=processed,
+                seconds=seconds,
+                rate=processed / seconds if seconds else 0
+            )
+        )
+        if malformed:
+            self.stdout.write('Skipped {count} malformed lines.'.format(count=malformed))
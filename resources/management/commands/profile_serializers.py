@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from freesource.profiling import profile_fields
+from resources.models import Resource
+
+
+class Command(BaseCommand):
+    help = (
+        'Requests an API path and reports time and queries per serializer field. '
+        'Use --seed against a scratch database (FREESOURCE_DB_PATH) to profile a synthetic catalogue.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='API path, "{resource}" is replaced with a resource id.')
+        parser.add_argument('--user', help='Username to authenticate as, defaults to the first user.')
+        parser.add_argument('--seed', type=int, metavar='RESOURCES', help='Seed this many resources first.')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            call_command('seed_catalogue', resources=options['seed'], prefix='profile', stdout=self.stdout)
+
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to authenticate as.')
+
+        token, _ = Token.objects.get_or_create(user=user)
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+        client = Client(SERVER_NAME=host, HTTP_AUTHORIZATION='Token {key}'.format(key=token.key))
+        path = options['path'].format(resource=Resource.objects.values_list('id', flat=True).first())
+
+        with profile_fields() as profile:
+            response = client.get(path)
+
+        self.stdout.write('GET {path} -> {status}'.format(path=path, status=response.status_code))
+        self.stdout.write('{:<40}{:>8}{:>12}{:>12}{:>10}'.format('field', 'calls', 'total ms', 'us/call', 'queries'))
+        for field, stats in profile.as_dict().items():
+            self.stdout.write('{:<40}{:>8}{:>12.2f}{:>12.1f}{:>10}'.format(
+                field,
+                stats['calls'],
+                stats['ms'],
+                stats['ms'] * 1e3 / stats['calls'],
+                stats['queries']
+            ))
@@ -0,0 +1,57 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Reports per-module import time and time-to-first-response of a cold worker.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='/api/categories/')
+        parser.add_argument('--token', help='API token sent with the first request.')
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=25)
+
+    def spawn(self, path, token, warm_up):
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE,
+            FREESOURCE_WARM_UP='1' if warm_up else '0'
+        )
+        command = [sys.executable, '-m', 'freesource.startup', path]
+        if token:
+            command += ['--token', token]
+
+        output = subprocess.check_output(command, env=env, cwd=settings.BASE_DIR)
+
+        return json.loads(output.decode())
+
+    def handle(self, *args, **options):
+        results = {}
+        for warm_up in (False, True):
+            runs = [
+                self.spawn(options['path'], options['token'], warm_up)
+                for _ in range(options['runs'])
+            ]
+            results[warm_up] = min(runs, key=lambda run: run['boot'] + run['first_response'])
+
+        self.stdout.write('{:>12} {:>12}  {}'.format('self [ms]', 'cumul [ms]', 'module'))
+        for name, own, cumulative in results[True]['imports'][:options['top']]:
+            self.stdout.write('{:>12.2f} {:>12.2f}  {}'.format(own * 1e3, cumulative * 1e3, name))
+
+        self.stdout.write('')
+        self.stdout.write('{:<12} {:>10} {:>16} {:>10}  {}'.format(
+            'warm-up', 'boot [ms]', 'first resp [ms]', 'total [ms]', 'status'
+        ))
+        for warm_up, run in sorted(results.items()):
+            self.stdout.write('{:<12} {:>10.1f} {:>16.1f} {:>10.1f}  {}'.format(
+                'on' if warm_up else 'off',
+                run['boot'] * 1e3,
+                run['first_response'] * 1e3,
+                (run['boot'] + run['first_response']) * 1e3,
+                run['status']
+            ))
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from resources.activity import comments_deleted
+from resources.models import Resource, Comment, ArchivedComment, Change
+
+
+class Command(BaseCommand):
+    help = 'Hard-deletes soft-deleted resources and comments in bounded batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Seconds to sleep between batches to leave room for request traffic.'
+        )
+
+    def purge(self, queryset, batch_size, pause, tombstone=False):
+        """
+        Deletes `queryset` in batches. With `tombstone`, the rows are comments
+        that went with their resource: their DELETE changes and their authors'
+        counts were left for this pass, so deleting a resource stays cheap.
+        """
+        model = queryset.model
+        purged = 0
+
+        while True:
+            ids = list(queryset.values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return purged
+
+            with transaction.atomic():
+                if tombstone:
+                    Change.objects.record(Comment, ids, Change.DELETE)
+                    comments_deleted(ids, model)
+                model._base_manager.filter(id__in=ids).delete()
+
+            purged += len(ids)
+            time.sleep(pause)
+
+    def handle(self, *args, **options):
+        batch_size, pause = options['batch_size'], options['pause']
+
+        comments = self.purge(Comment.all_objects.filter(is_deleted=True), batch_size, pause)
+        comments += self.purge(Comment.all_objects.filter(resource__is_deleted=True), batch_size, pause, True)
+        comments += self.purge(ArchivedComment.objects.filter(resource__is_deleted=True), batch_size, pause, True)
+        resources = self.purge(Resource.all_objects.filter(is_deleted=True), batch_size, pause)
+
+        self.stdout.write('Purged {resources} resources and {comments} comments.'.format(
+            resources=resources,
+            comments=comments
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from resources.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Folds comments posted since the last run into the trending scores.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Recompute every score from scratch, e.g. after changing TRENDING_HALF_LIFE_HOURS.'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        processed = refresh_trending(rebuild=options['rebuild'])
+
+        self.stdout.write('Processed {count} comments in {seconds:.2f}s.'.format(
+            count=processed,
+            seconds=time.perf_counter() - start
+        ))
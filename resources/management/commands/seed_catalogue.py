@@ -0,0 +1,100 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from resources.activity import rebuild_user_activity
+from resources.models import Category, Resource, Comment, Change
+from resources.normalization import normalize_url
+from resources.recommendations import build_related_index
+from resources.trending import refresh_trending
+from resources.utils import BATCH_SIZE, chunks
+
+
+class Command(BaseCommand):
+    help = 'Fills the database with a synthetic catalogue for benchmarks and local load tests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--resources', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=5, help='Comments per resource.')
+        parser.add_argument('--prefix', default='seed', help='Prefix of the generated names.')
+        parser.add_argument('--password', default='seedpassword123')
+        parser.add_argument('--random-seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rng = random.Random(options['random_seed'])
+        prefix = options['prefix']
+
+        with transaction.atomic():
+            password = make_password(options['password'])
+            User.objects.bulk_create([
+                User(username='{prefix}_user_{n}'.format(prefix=prefix, n=n), password=password)
+                for n in range(options['users'])
+            ], batch_size=BATCH_SIZE)
+            users = list(User.objects.filter(username__startswith=prefix + '_user_'))
+            tokens = [Token(user=user) for user in users]
+            for token in tokens:
+                token.key = token.generate_key()
+            Token.objects.bulk_create(tokens)
+
+            Category.objects.bulk_create([
+                Category(name='{prefix}{n}'.format(prefix=prefix, n=n).title())
+                for n in range(options['categories'])
+            ])
+            category_ids = list(
+                Category.objects.filter(name__startswith=prefix.title()).values_list('id', flat=True)
+            )
+
+            resources = []
+            for n in range(options['resources']):
+                url = 'https://{prefix}.example.com/resources/{n}'.format(prefix=prefix, n=n)
+                resources.append(Resource(
+                    title='{prefix} resource {n}'.format(prefix=prefix, n=n),
+                    resource_url=url,
+                    resource_url_key=normalize_url(url),
+                    owner=rng.choice(users)
+                ))
+            Resource.objects.bulk_create(resources, batch_size=BATCH_SIZE)
+            resources = list(
+                Resource.objects.filter(title__startswith=prefix + ' resource ').values_list('id', 'owner_id')
+            )
+
+            links = Resource.categories.through
+            links.objects.bulk_create([
+                links(resource_id=resource_id, category_id=category_id)
+                for resource_id, _ in resources
+                for category_id in rng.sample(category_ids, min(3, len(category_ids)))
+            ], batch_size=BATCH_SIZE)
+
+            Comment.objects.bulk_create([
+                Comment(resource_id=resource_id, author=rng.choice(users), content='Seeded comment')
+                for resource_id, _ in resources
+                for _ in range(options['comments'])
+            ], batch_size=BATCH_SIZE)
+
+            # Bulk inserts skip the signals, so the change feed is written here.
+            Change.objects.record(Category, category_ids, Change.UPSERT)
+            for batch in chunks([resource_id for resource_id, _ in resources], BATCH_SIZE):
+                Change.objects.record(Resource, batch, Change.UPSERT)
+                comment_ids = Comment.objects.filter(resource_id__in=batch).values_list('id', flat=True)
+                Change.objects.record(Comment, comment_ids, Change.UPSERT)
+
+        cache.delete(Category.LIST_CACHE_KEY)
+
+        build_related_index()
+        refresh_trending(rebuild=True)
+        rebuild_user_activity()
+
+        self.stdout.write('Seeded {users} users and {resources} resources in {seconds:.2f}s.'.format(
+            users=len(users),
+            resources=len(resources),
+            seconds=time.perf_counter() - start
+        ))
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from resources.normalization import normalize_url
+
+
+def fill_resource_url_keys(apps, schema_editor):
+    Resource = apps.get_model('resources', 'Resource')
+
+    for resource in Resource.objects.only('id', 'resource_url').iterator():
+        Resource.objects.filter(id=resource.id).update(
+            resource_url_key=normalize_url(resource.resource_url)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0009_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resource',
+            name='resource_url_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_resource_url_keys, migrations.RunPython.noop),
+    ]
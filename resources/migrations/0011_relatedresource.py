@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-19 06:36
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('resources', '0010_resource_url_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedResource',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='resources.Resource')),
+                ('resource', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='resources.Resource')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='relatedresource',
+            index=models.Index(fields=['resource', '-score'], name='related_resource_score_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='relatedresource',
+            unique_together=set([('resource', 'related')]),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Indexes `lower(title)` and `lower(username)`, which the admin's
+    case-insensitive title and username searches filter on.
+    """
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('resources', '0013_archivedcomment'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            ['CREATE INDEX resource_title_lower_idx ON resources_resource (lower(title))'],
+            ['DROP INDEX resource_title_lower_idx']
+        ),
+        migrations.RunSQL(
+            ['CREATE INDEX user_username_lower_idx ON auth_user (lower(username))'],
+            ['DROP INDEX user_username_lower_idx']
+        ),
+    ]
@@ -0,0 +1,52 @@
+from rest_framework.exceptions import ParseError
+
+from .exceptions import PreconditionFailed
+
+
+class VersionedUpdateMixin:
+    """
+    Lets clients send `If-Match: "<version>"` on updates. The write then
+    becomes a conditional UPDATE and a stale version is answered with 412.
+    """
+
+    def get_expected_version(self):
+        if_match = self.request.META.get('HTTP_IF_MATCH', '').strip()
+
+        if not if_match or if_match == '*':
+            return None
+
+        # If-Match compares strongly, so a weak tag never matches.
+        if if_match.startswith('W/'):
+            raise PreconditionFailed()
+
+        try:
+            return int(if_match.strip('"'))
+        except ValueError:
+            raise ParseError('Invalid If-Match header.')
+
+    def get_version_headers(self, instance):
+        return {'ETag': '"{version}"'.format(version=instance.version)}
+
+    def perform_update(self, serializer):
+        expected_version = self.get_expected_version()
+
+        if expected_version is None:
+            serializer.save()
+            return
+
+        instance = serializer.instance
+        for attr, value in serializer.validated_data.items():
+            setattr(instance, attr, value)
+
+        if not instance.save_if_version(expected_version, serializer.validated_data.keys()):
+            raise PreconditionFailed()
+
+
+class SoftDeleteMixin:
+    """
+    Flags the object as deleted instead of cascading inside the request;
+    `manage.py purge_deleted` removes the rows later.
+    """
+
+    def perform_destroy(self, instance):
+        instance.soft_delete()
@@ -1,8 +1,128 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 
+from .normalization import normalize_url
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    def soft_delete(self):
+        with transaction.atomic():
+            ids = list(self.filter(is_deleted=False).values_list('pk', flat=True))
+            if not ids:
+                return 0
+
+            deleted = self.model.all_objects.filter(pk__in=ids).update(is_deleted=True)
+            Change.objects.record(self.model, ids, Change.DELETE)
+            self.model.soft_deleted(ids)
+
+        return deleted
+
+
+class LiveManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class LiveCommentManager(LiveManager):
+    def get_queryset(self):
+        # A deleted resource's comments stay hidden until `purge_deleted` removes them.
+        return super().get_queryset().filter(resource__is_deleted=False)
+
+
+class SoftDeleteModel(models.Model):
+    is_deleted = models.BooleanField(default=False, db_index=True, editable=False)
+
+    objects = LiveManager()
+    all_objects = models.Manager.from_queryset(SoftDeleteQuerySet)()
+
+
+    class Meta:
+        abstract = True
+
+    def soft_delete(self):
+        type(self).all_objects.filter(pk=self.pk).soft_delete()
+        self.is_deleted = True
+
+    @classmethod
+    def soft_deleted(cls, ids):
+        """Hook run after the rows in `ids` were flagged as deleted."""
+
+
+class VersionedModel(models.Model):
+    version = models.PositiveIntegerField(default=1)
+
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'version' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['version']
+
+        version = self._expected_version = self.version
+        self.version = version + 1
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            self.version = version
+            raise
+        finally:
+            self.__dict__.pop('_expected_version', None)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """
+        Writes the next version only while the row is still at the one this
+        instance was read at, so the new version is known without a read.
+        If another write got there first, the stored version is bumped
+        instead and read back, so concurrent writes never share a version.
+        """
+        expected_version = self.__dict__.pop('_expected_version', None)
+        if expected_version is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+        filtered = base_qs.filter(version=expected_version)
+        if super()._do_update(filtered, using, pk_val, values, update_fields, forced_update):
+            return True
+
+        values = [
+            (field, model, F('version') + 1 if field.attname == 'version' else value)
+            for field, model, value in values
+        ]
+        if not super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update):
+            return False
+
+        self.version = base_qs.filter(pk=pk_val).values_list('version', flat=True).get()
+        return True
+
+    def save_if_version(self, expected_version, fields):
+        """
+        Writes `fields` with a single conditional UPDATE that only matches
+        the row while it is still at `expected_version`.
+        Returns False when another write got there first.
+        """
+        values = {field: getattr(self, field) for field in fields}
+        updated = type(self)._base_manager.filter(
+            pk=self.pk,
+            version=expected_version
+        ).update(version=F('version') + 1, **values)
+
+        if updated:
+            self.version = expected_version + 1
+            Change.objects.record(type(self), [self.pk], Change.UPSERT)
+
+        return bool(updated)
+
 
 class Category(models.Model):
+    # Cache entry for the serialized category list, dropped by `signals` on writes.
+    LIST_CACHE_KEY = 'resources:category-list'
+
     name = models.CharField(unique=True, max_length=50, blank=False)
 
 
@@ -17,25 +137,139 @@ class Category(models.Model):
         super().save(*args, **kwargs)
 
 
-class Resource(models.Model):
+class Resource(SoftDeleteModel, VersionedModel):
     title = models.CharField(unique=True, max_length=255, blank=False)
     categories = models.ManyToManyField(Category, related_name='categories')
     resource_url = models.URLField(blank=False)
+    resource_url_key = models.CharField(max_length=200, db_index=True, editable=False)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
 
     def __str__(self):
         return '\"{title}\" by {owner}'.format(title=self.title, owner=self.owner)
 
+    def save(self, *args, **kwargs):
+        self.resource_url_key = normalize_url(self.resource_url)
+        super().save(*args, **kwargs)
+
+    def save_if_version(self, expected_version, fields):
+        fields = list(fields)
+        if 'resource_url' in fields:
+            self.resource_url_key = normalize_url(self.resource_url)
+            fields.append('resource_url_key')
+
+        return super().save_if_version(expected_version, fields)
+
+    @classmethod
+    def soft_deleted(cls, ids):
+        from .activity import resources_deleted
+        resources_deleted(ids)
 
-class Comment(models.Model):
+
+class Comment(SoftDeleteModel, VersionedModel):
     resource = models.ForeignKey(Resource, on_delete=models.CASCADE)
     content = models.CharField(max_length=255, blank=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     posted_on = models.DateTimeField(auto_now_add=True)
 
+    objects = LiveCommentManager()
+
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resource', 'is_deleted'], name='comment_resource_live_idx'),
+        ]
+
     def __str__(self):
         return '{class_name} for {resource_title} by {author_name}'.format(
             class_name=self.__class__.__name__,
             resource_title=self.resource.title,
             author_name=self.author.username
         )
+
+    @classmethod
+    def soft_deleted(cls, ids):
+        from .activity import comments_deleted
+        comments_deleted(ids)
+
+
+class ArchivedComment(models.Model):
+    """
+    Cold storage for comments older than `COMMENT_ARCHIVE_AFTER_DAYS`, moved
+    out of `Comment` by `manage.py archive_comments`. Rows keep their comment
+    id and are read-only.
+    """
+    id = models.PositiveIntegerField(primary_key=True)
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='+')
+    content = models.CharField(max_length=255)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    posted_on = models.DateTimeField()
+    version = models.PositiveIntegerField(default=1)
+
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resource', 'id'], name='archived_comment_page_idx'),
+        ]
+
+
+class RelatedResource(models.Model):
+    """Precomputed category-overlap neighbours of a resource, see `recommendations`."""
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='+')
+    related = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+
+    class Meta:
+        unique_together = ('resource', 'related')
+        indexes = [
+            models.Index(fields=['resource', '-score'], name='related_resource_score_idx'),
+        ]
+
+
+class TrendingScore(models.Model):
+    """Time-decayed comment activity of a resource, see `trending`."""
+    resource = models.OneToOneField(Resource, primary_key=True, on_delete=models.CASCADE, related_name='+')
+    log_score = models.FloatField(db_index=True)
+
+
+class TrendingState(models.Model):
+    last_comment_id = models.PositiveIntegerField(default=0)
+    refreshed_on = models.DateTimeField(null=True)
+
+
+class ChangeManager(models.Manager):
+    def record(self, model, object_ids, operation):
+        return self.bulk_create([
+            Change(model=model._meta.model_name, object_id=object_id, operation=operation)
+            for object_id
+            in object_ids
+        ])
+
+    def record_links(self, pairs, operation):
+        model_name = Resource.categories.through._meta.model_name
+
+        return self.bulk_create([
+            Change(model=model_name, object_id=resource_id, related_id=category_id, operation=operation)
+            for resource_id, category_id
+            in pairs
+        ])
+
+
+class Change(models.Model):
+    """
+    Catalogue change feed. The auto-incremented id is the sequence number
+    mirrors sync from; deletions are kept as tombstones.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    OPERATION_CHOICES = (
+        (UPSERT, 'Upsert'),
+        (DELETE, 'Delete'),
+    )
+
+    model = models.CharField(max_length=30)
+    object_id = models.PositiveIntegerField()
+    related_id = models.PositiveIntegerField(null=True)
+    operation = models.CharField(max_length=6, choices=OPERATION_CHOICES)
+
+    objects = ChangeManager()
@@ -0,0 +1,38 @@
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+TRACKING_PARAMETERS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga'}
+TRACKING_PREFIXES = ('utm_',)
+
+
+def is_tracking_parameter(name):
+    name = name.lower()
+    return name in TRACKING_PARAMETERS or name.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url):
+    """
+    Reduces a URL to the key duplicates share: lower-case scheme and host,
+    no default port, trailing slash, fragment or tracking parameters, and the
+    remaining query parameters in a stable order. Never longer than `url`.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        host = '{host}:{port}'.format(host=host, port=port)
+
+    query = '&'.join(sorted(
+        parameter
+        for parameter
+        in parts.query.split('&')
+        if parameter and not is_tracking_parameter(parameter.split('=', 1)[0])
+    ))
+
+    return urlunsplit((scheme, host, parts.path.rstrip('/'), query, ''))
@@ -0,0 +1,165 @@
+"""
+Related resources by category overlap.
+
+Every resource's categories are kept as an integer bitset, with one bit per
+category loaded (numbered densely, not by category id), so the Jaccard
+similarity of two resources is popcount(a & b) / popcount(a | b) on a few
+machine words per pair. Only resources sharing at least one category are
+ever compared.
+"""
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Resource, RelatedResource
+from .utils import BATCH_SIZE, chunks
+
+ResourceCategory = Resource.categories.through
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+def live_links():
+    return ResourceCategory.objects.filter(resource__is_deleted=False)
+
+
+def load_masks(links):
+    """Returns the bitset of every linked resource and the members of every bit."""
+    masks, members, bits = defaultdict(int), defaultdict(set), {}
+
+    for resource_id, category_id in links.values_list('resource_id', 'category_id').iterator():
+        bit = bits.setdefault(category_id, len(bits))
+        masks[resource_id] |= 1 << bit
+        members[bit].add(resource_id)
+
+    return masks, members
+
+
+def bits_of(mask):
+    bit = 0
+    while mask:
+        if mask & 1:
+            yield bit
+        mask >>= 1
+        bit += 1
+
+
+def jaccard(mask, other_mask, size, other_size):
+    shared = popcount(mask & other_mask)
+    return shared / (size + other_size - shared)
+
+
+def top_related(resource_id, masks, members, sizes, limit):
+    mask, size = masks[resource_id], sizes[resource_id]
+    candidates = set().union(*(members[bit] for bit in bits_of(mask)))
+    candidates.discard(resource_id)
+
+    scores = {
+        candidate: jaccard(mask, masks[candidate], size, sizes[candidate])
+        for candidate
+        in candidates
+    }
+
+    return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+def build_related_index(limit=None):
+    """Recomputes the whole index; returns the number of rows written."""
+    limit = limit or settings.RELATED_RESOURCES_LIMIT
+    masks, members = load_masks(live_links())
+    sizes = {resource_id: popcount(mask) for resource_id, mask in masks.items()}
+
+    rows = [
+        RelatedResource(resource_id=resource_id, related_id=related_id, score=score)
+        for resource_id in masks
+        for related_id, score in top_related(resource_id, masks, members, sizes, limit)
+    ]
+
+    with transaction.atomic():
+        RelatedResource.objects.all().delete()
+        RelatedResource.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+    return len(rows)
+
+
+def refresh_related(resource_ids, limit=None):
+    """
+    Incremental update after the categories of `resource_ids` changed.
+
+    The changed resources get an exact neighbour list. Each of their old
+    and new neighbours only has the changed resource's entry rescored, so a
+    neighbour that lost it keeps one slot short until the next full
+    `build_related_index`. Only the rows that differ from the stored index
+    are deleted, rescored or inserted.
+    """
+    limit = limit or settings.RELATED_RESOURCES_LIMIT
+    resource_ids = set(resource_ids)
+    shared_categories = live_links().filter(resource_id__in=resource_ids).values('category_id')
+    neighbours = live_links().filter(category_id__in=shared_categories).values('resource_id')
+
+    masks, members = load_masks(live_links().filter(resource_id__in=neighbours))
+    sizes = {resource_id: popcount(mask) for resource_id, mask in masks.items()}
+
+    old_neighbours = RelatedResource.objects.filter(related_id__in=resource_ids).values('resource_id')
+    stored_rows = RelatedResource.objects.filter(
+        Q(resource_id__in=resource_ids) | Q(resource_id__in=neighbours) | Q(resource_id__in=old_neighbours)
+    )
+
+    stored, row_ids = defaultdict(dict), {}
+    for row_id, resource_id, related_id, score in (
+        stored_rows.values_list('id', 'resource_id', 'related_id', 'score').iterator()
+    ):
+        stored[resource_id][related_id] = score
+        row_ids[resource_id, related_id] = row_id
+
+    lists = {
+        resource_id: dict(top_related(resource_id, masks, members, sizes, limit)) if resource_id in masks else {}
+        for resource_id
+        in resource_ids
+    }
+
+    for neighbour_id in (set(masks) | set(stored)) - resource_ids:
+        entries = dict(stored[neighbour_id])
+
+        for resource_id in resource_ids:
+            entries.pop(resource_id, None)
+            if neighbour_id in masks and resource_id in masks and masks[neighbour_id] & masks[resource_id]:
+                entries[resource_id] = jaccard(
+                    masks[neighbour_id], masks[resource_id], sizes[neighbour_id], sizes[resource_id]
+                )
+
+        lists[neighbour_id] = dict(
+            heapq.nlargest(limit, entries.items(), key=lambda item: (item[1], -item[0]))
+        )
+
+    stale, rescored, added = [], defaultdict(list), []
+    for resource_id, entries in lists.items():
+        current = stored[resource_id]
+
+        for related_id, score in current.items():
+            if related_id not in entries:
+                stale.append(row_ids[resource_id, related_id])
+            elif entries[related_id] != score:
+                rescored[entries[related_id]].append(row_ids[resource_id, related_id])
+
+        added.extend(
+            RelatedResource(resource_id=resource_id, related_id=related_id, score=score)
+            for related_id, score in entries.items()
+            if related_id not in current
+        )
+
+    with transaction.atomic():
+        for chunk in chunks(stale):
+            RelatedResource.objects.filter(id__in=chunk).delete()
+
+        # Jaccard scores take few distinct values, so this is a handful of updates.
+        for score, rows in rescored.items():
+            for chunk in chunks(rows):
+                RelatedResource.objects.filter(id__in=chunk).update(score=score)
+
+        RelatedResource.objects.bulk_create(added, batch_size=BATCH_SIZE)
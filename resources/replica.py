@@ -0,0 +1,91 @@
+"""
+Read-only views answered from the catalogue snapshot instead of the
+database, see `snapshot`. They mirror the read side of `CategoryListView`,
+`ResourceCategoryList` and `ResourceViewSet`, and are routed by
+`freesource.urls_replica`.
+"""
+from django.http import Http404
+from rest_framework import exceptions, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .exceptions import SnapshotUnavailable
+from .snapshot import SnapshotError, snapshot_store
+
+
+def current_snapshot():
+    try:
+        return snapshot_store.get()
+    except SnapshotError as e:
+        raise SnapshotUnavailable(str(e))
+
+
+class SnapshotUser:
+    """Stands in for `User` on replicas, which have no user table."""
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, pk, username):
+        self.pk = self.id = pk
+        self.username = username
+
+    def __str__(self):
+        return self.username
+
+
+class SnapshotTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        found = current_snapshot().find_token(key)
+
+        if found is None:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+        return SnapshotUser(*found), key
+
+
+class SnapshotView(APIView):
+    authentication_classes = (SnapshotTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # One request is answered from one snapshot, even if a newer one lands meanwhile.
+        self.snapshot = current_snapshot()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if hasattr(self, 'snapshot'):
+            response['X-Catalogue-Seq'] = str(self.snapshot.seq)
+
+        return response
+
+
+class SnapshotCategoryListView(SnapshotView):
+    def get(self, request):
+        return Response(self.snapshot.categories(), status=status.HTTP_200_OK)
+
+
+class SnapshotResourceCategoryList(SnapshotView):
+    def get(self, request, category_name):
+        index = self.snapshot.find_category(category_name.title())
+        if index is None:
+            raise Http404
+
+        return Response(self.snapshot.resources(index), status=status.HTTP_200_OK)
+
+
+class SnapshotResourceList(SnapshotView):
+    def get(self, request):
+        return Response(self.snapshot.resources(), status=status.HTTP_200_OK)
+
+
+class SnapshotResourceDetail(SnapshotView):
+    def get(self, request, pk):
+        index = self.snapshot.find_resource(int(pk))
+        if index is None:
+            raise Http404
+
+        return Response(self.snapshot.resource(index), status=status.HTTP_200_OK)
@@ -1,33 +1,53 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
+from freesource.profiling import FieldProfilingMixin
 from users.serializers import UserReadSerializer
-from .models import Category, Resource, Comment
+from .models import Category, Resource, Comment, RelatedResource, TrendingScore
+from .activity import resource_created, comment_created
+from .normalization import normalize_url
+from .trending import current_score
+from .writes import comment_writer
+from .streams import comment_broker
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(FieldProfilingMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ('id', 'name')
         read_only_fields = ('id',)
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(FieldProfilingMixin, serializers.ModelSerializer):
     author = UserReadSerializer(read_only=True)
 
 
     class Meta:
         model = Comment
-        fields = ('id', 'content', 'author', 'posted_on')
-        read_only_fields = ('id',)
+        fields = ('id', 'content', 'author', 'posted_on', 'version')
+        read_only_fields = ('id', 'version')
 
     def create(self, validated_data):
         request = self.context['request']
         resource = self.context['resource']
 
-        return Comment.objects.create(resource=resource, author=request.user, **validated_data)
+        def write():
+            comment = Comment.objects.create(resource=resource, author=request.user, **validated_data)
+            comment_created(comment)
+            transaction.on_commit(lambda: comment_broker.publish(comment))
+
+            return comment
+
+        if settings.COMMENT_WRITE_COALESCING:
+            return comment_writer.submit(write)
+
+        with transaction.atomic():
+            return write()
 
 
-class ResourceSerializer(serializers.ModelSerializer):
+class ResourceSerializer(FieldProfilingMixin, serializers.ModelSerializer):
     categories = CategorySerializer(read_only=True, many=True)
     owner = UserReadSerializer(read_only=True)
     comment_set = CommentSerializer(read_only=True, many=True)
@@ -35,10 +55,140 @@ class ResourceSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Resource
-        fields = ('id', 'title', 'categories', 'resource_url', 'owner', 'comment_set')
-        read_only_fields = ('id',)
+        fields = ('id', 'title', 'categories', 'resource_url', 'owner', 'comment_set', 'version')
+        read_only_fields = ('id', 'version')
+        extra_kwargs = {
+            # Soft-deleted resources keep their title until they are purged.
+            'title': {
+                'validators': [
+                    UniqueValidator(
+                        queryset=Resource.all_objects.all(),
+                        message='A resource with this title already exists.'
+                    )
+                ]
+            }
+        }
+
+    def validate_resource_url(self, value):
+        duplicates = Resource.objects.filter(resource_url_key=normalize_url(value))
+        if self.instance is not None:
+            duplicates = duplicates.exclude(id=self.instance.id)
+
+        duplicate_id = duplicates.values_list('id', flat=True).first()
+        if duplicate_id is not None:
+            raise serializers.ValidationError(
+                'This URL is already in the catalogue as resource {id}.'.format(id=duplicate_id)
+            )
+
+        return value
 
     def create(self, validated_data):
         request = self.context['request']
 
-        return Resource.objects.create(owner=request.user, **validated_data)
+        with transaction.atomic():
+            resource = Resource.objects.create(owner=request.user, **validated_data)
+            resource_created(resource)
+
+        return resource
+
+
+class ResourceChangeSerializer(serializers.ModelSerializer):
+    owner = serializers.SlugRelatedField(slug_field='username', read_only=True)
+
+
+    class Meta:
+        model = Resource
+        fields = ('id', 'title', 'resource_url', 'owner', 'version')
+
+
+class CommentChangeSerializer(serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(slug_field='username', read_only=True)
+
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'resource', 'content', 'author', 'posted_on', 'version')
+
+
+class RelatedResourceSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='related.id')
+    title = serializers.CharField(source='related.title')
+    resource_url = serializers.URLField(source='related.resource_url')
+
+
+    class Meta:
+        model = RelatedResource
+        fields = ('id', 'title', 'resource_url', 'score')
+
+
+class TrendingResourceSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='resource.id')
+    title = serializers.CharField(source='resource.title')
+    resource_url = serializers.URLField(source='resource.resource_url')
+    score = serializers.SerializerMethodField()
+
+
+    class Meta:
+        model = TrendingScore
+        fields = ('id', 'title', 'resource_url', 'score')
+
+    def get_score(self, obj):
+        return current_score(obj.log_score, self.context.get('now'))
+
+
+class TrendingQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class ChangeQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, default=0)
+    limit = serializers.IntegerField(min_value=1, max_value=500, default=100)
+
+
+class CommentPageQuerySerializer(serializers.Serializer):
+    before = serializers.IntegerField(min_value=1, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=500, default=50)
+
+
+class ResourceBulkSerializer(serializers.Serializer):
+    # Keeps `id IN (...)` below SQLite's limit of 999 bound parameters.
+    max_resources = 500
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=max_resources
+    )
+
+
+class ResourceBulkCategorizeSerializer(ResourceBulkSerializer):
+    categories = serializers.ListField(child=serializers.IntegerField(), max_length=100)
+    mode = serializers.ChoiceField(choices=('replace', 'add'), default='replace')
+
+    def validate_categories(self, value):
+        category_ids = set(value)
+        existing_ids = set(
+            Category.objects.filter(id__in=category_ids).values_list('id', flat=True)
+        )
+
+        if category_ids - existing_ids:
+            raise serializers.ValidationError('Unknown categories: {ids}.'.format(
+                ids=', '.join(str(category_id) for category_id in sorted(category_ids - existing_ids))
+            ))
+
+        return existing_ids
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=('GET', 'POST', 'PUT', 'PATCH', 'DELETE'))
+    path = serializers.RegexField(r'^/api/', max_length=500)
+    body = serializers.JSONField(required=False)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = serializers.ListField(
+        child=BatchRequestSerializer(),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_REQUESTS
+    )
+    parallel = serializers.BooleanField(default=False)
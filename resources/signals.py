@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from .models import Category, Resource, Comment, Change
+from .recommendations import refresh_related
+from . import activity
+
+ResourceCategory = Resource.categories.through
+
+
+def record_upsert(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Change.objects.record(sender, [instance.pk], Change.UPSERT)
+
+
+def record_delete(sender, instance, **kwargs):
+    # A category tombstone implies its resource links are gone too.
+    Change.objects.record(sender, [instance.pk], Change.DELETE)
+
+
+def invalidate_categories(sender, **kwargs):
+    cache.delete(Category.LIST_CACHE_KEY)
+
+
+def links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            links = ResourceCategory.objects.filter(category_id=instance.pk)
+        else:
+            links = ResourceCategory.objects.filter(resource_id=instance.pk)
+        instance._cleared_links = list(links.values_list('resource_id', 'category_id'))
+        return
+
+    if action == 'post_clear':
+        pairs = instance.__dict__.pop('_cleared_links', [])
+        operation = Change.DELETE
+    elif action in ('post_add', 'post_remove'):
+        if reverse:
+            pairs = [(resource_id, instance.pk) for resource_id in pk_set]
+        else:
+            pairs = [(instance.pk, category_id) for category_id in pk_set]
+        operation = Change.UPSERT if action == 'post_add' else Change.DELETE
+    else:
+        return
+
+    Change.objects.record_links(pairs, operation)
+    activity.links_changed(pairs, 1 if operation == Change.UPSERT else -1)
+    refresh_related({resource_id for resource_id, _ in pairs})
+
+
+def connect():
+    # Resources and comments are only ever soft-deleted through the API;
+    # `soft_delete` writes their tombstones, so hard deletes from
+    # `purge_deleted` stay fast and don't repeat them.
+    for model in (Category, Resource, Comment):
+        post_save.connect(record_upsert, sender=model, dispatch_uid='change_upsert_' + model._meta.model_name)
+
+    post_delete.connect(record_delete, sender=Category, dispatch_uid='change_delete_category')
+    post_save.connect(invalidate_categories, sender=Category, dispatch_uid='invalidate_categories_save')
+    post_delete.connect(invalidate_categories, sender=Category, dispatch_uid='invalidate_categories_delete')
+    m2m_changed.connect(links_changed, sender=ResourceCategory, dispatch_uid='links_changed')
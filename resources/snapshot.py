@@ -0,0 +1,351 @@
+"""
+Read-only catalogue snapshots for edge replicas.
+
+`manage.py export_snapshot` writes categories, live resources with their
+owners and category links, and the active API tokens into one binary file.
+Replicas map the file and answer reads from it in place, so every worker
+process on a host shares the same pages.
+
+Layout, all integers little-endian:
+
+    header     MAGIC, FORMAT_VERSION, section count, export time, change seq
+    sections   (offset, count) for each entry of SECTIONS
+    categories (id, name offset, name length, refs start, refs count), by id
+    names      category record indexes, by name
+    resources  (id, version, title, url and owner as offset/length pairs,
+               links start, links count), by id
+    links      category record indexes of each resource
+    refs       resource record indexes of each category
+    tokens     (sha256 of the key, user id, username offset, username length),
+               by digest
+    strings    UTF-8 text the records point into
+
+Tokens are stored hashed, so a leaked snapshot doesn't leak credentials.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .models import Category, Resource, Change
+
+MAGIC = b'FSCS'
+FORMAT_VERSION = 1
+
+SECTIONS = ('categories', 'names', 'resources', 'links', 'refs', 'tokens', 'strings')
+
+HEADER = struct.Struct('<4sHHQQ' + 'QQ' * len(SECTIONS))
+CATEGORY = struct.Struct('<5I')
+RESOURCE = struct.Struct('<10I')
+INDEX = struct.Struct('<I')
+TOKEN = struct.Struct('<32s3I')
+
+# Bytes per counted item of each section.
+ITEM_SIZES = {
+    'categories': CATEGORY.size,
+    'names': INDEX.size,
+    'resources': RESOURCE.size,
+    'links': INDEX.size,
+    'refs': INDEX.size,
+    'tokens': TOKEN.size,
+    'strings': 1,
+}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def token_digest(key):
+    return hashlib.sha256(key.encode()).digest()
+
+
+class StringTable:
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = {}
+
+    def add(self, text):
+        encoded = text.encode()
+        if encoded not in self.offsets:
+            self.offsets[encoded] = len(self.data)
+            self.data += encoded
+
+        return self.offsets[encoded], len(encoded)
+
+
+def build_snapshot():
+    """Serializes the current catalogue. Returns the snapshot as bytes."""
+    with transaction.atomic():
+        seq = Change.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        categories = list(Category.objects.order_by('id').values_list('id', 'name'))
+        resources = list(
+            Resource.objects.order_by('id')
+            .values_list('id', 'version', 'title', 'resource_url', 'owner__username')
+        )
+        links = list(
+            Resource.categories.through.objects.filter(resource__is_deleted=False)
+            .order_by('resource_id', 'category_id')
+            .values_list('resource_id', 'category_id')
+        )
+        tokens = list(
+            Token.objects.filter(user__is_active=True).values_list('key', 'user_id', 'user__username')
+        )
+
+    strings = StringTable()
+    category_index = {category_id: index for index, (category_id, _) in enumerate(categories)}
+    resource_index = {resource[0]: index for index, resource in enumerate(resources)}
+
+    resource_links = [[] for _ in resources]
+    category_refs = [[] for _ in categories]
+    for resource_id, category_id in links:
+        resource_links[resource_index[resource_id]].append(category_index[category_id])
+        category_refs[category_index[category_id]].append(resource_index[resource_id])
+
+    sections = dict.fromkeys(SECTIONS, b'')
+    counts = dict.fromkeys(SECTIONS, 0)
+
+    refs, records = [], []
+    for index, (category_id, name) in enumerate(categories):
+        records.append(CATEGORY.pack(category_id, *strings.add(name), len(refs), len(category_refs[index])))
+        refs.extend(category_refs[index])
+    sections['categories'], counts['categories'] = b''.join(records), len(records)
+
+    by_name = sorted(range(len(categories)), key=lambda index: categories[index][1].encode())
+    sections['names'], counts['names'] = b''.join(INDEX.pack(index) for index in by_name), len(by_name)
+
+    flat_links, records = [], []
+    for index, (resource_id, version, title, url, owner) in enumerate(resources):
+        records.append(RESOURCE.pack(
+            resource_id, version,
+            *strings.add(title), *strings.add(url), *strings.add(owner),
+            len(flat_links), len(resource_links[index])
+        ))
+        flat_links.extend(resource_links[index])
+    sections['resources'], counts['resources'] = b''.join(records), len(records)
+
+    sections['links'], counts['links'] = b''.join(INDEX.pack(index) for index in flat_links), len(flat_links)
+    sections['refs'], counts['refs'] = b''.join(INDEX.pack(index) for index in refs), len(refs)
+
+    records = sorted(
+        TOKEN.pack(token_digest(key), user_id, *strings.add(username))
+        for key, user_id, username in tokens
+    )
+    sections['tokens'], counts['tokens'] = b''.join(records), len(records)
+
+    sections['strings'], counts['strings'] = bytes(strings.data), len(strings.data)
+
+    table, offset = [], HEADER.size
+    for name in SECTIONS:
+        table.extend((offset, counts[name]))
+        offset += len(sections[name])
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(SECTIONS), int(timezone.now().timestamp()), seq, *table
+    )
+
+    return header + b''.join(sections[name] for name in SECTIONS)
+
+
+def export_snapshot(path):
+    """
+    Writes a snapshot to `path` through a temporary file and a rename, so
+    readers see either the old file or the complete new one.
+    Returns the number of bytes written.
+    """
+    data = build_snapshot()
+    temporary = '{path}.{pid}.tmp'.format(path=path, pid=os.getpid())
+
+    with open(temporary, 'wb') as target:
+        target.write(data)
+        target.flush()
+        os.fsync(target.fileno())
+    os.replace(temporary, path)
+
+    return len(data)
+
+
+class Snapshot:
+    """
+    A mapped snapshot file. Records are unpacked straight from the mapping
+    on access; nothing is loaded up front.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as source:
+            try:
+                self.mapping = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # An empty file, e.g. one still being copied in, can't be mapped.
+                raise SnapshotError('{path} is empty.'.format(path=path))
+        self.view = memoryview(self.mapping)
+
+        if len(self.view) < HEADER.size:
+            raise SnapshotError('{path} is not a catalogue snapshot.'.format(path=path))
+
+        magic, version, section_count, created_at, seq, *table = HEADER.unpack_from(self.view)
+        if magic != MAGIC:
+            raise SnapshotError('{path} is not a catalogue snapshot.'.format(path=path))
+        if version != FORMAT_VERSION or section_count != len(SECTIONS):
+            raise SnapshotError('{path} has snapshot format {version}, expected {expected}.'.format(
+                path=path, version=version, expected=FORMAT_VERSION
+            ))
+
+        self.created_at = created_at
+        self.seq = seq
+        self.sections = {name: (table[2 * n], table[2 * n + 1]) for n, name in enumerate(SECTIONS)}
+
+        for name, (offset, count) in self.sections.items():
+            if offset < HEADER.size or offset + count * ITEM_SIZES[name] > len(self.view):
+                raise SnapshotError('{path} is truncated: its {name} section runs past the end.'.format(
+                    path=path, name=name
+                ))
+
+    def count(self, section):
+        return self.sections[section][1]
+
+    def record(self, section, layout, index):
+        return layout.unpack_from(self.view, self.sections[section][0] + index * layout.size)
+
+    def string(self, offset, length):
+        start = self.sections['strings'][0] + offset
+        return str(self.view[start:start + length], 'utf-8')
+
+    def category(self, index):
+        category_id, name_offset, name_length, _, _ = self.record('categories', CATEGORY, index)
+        return {'id': category_id, 'name': self.string(name_offset, name_length)}
+
+    def categories(self):
+        return [self.category(index) for index in range(self.count('categories'))]
+
+    def find_category(self, name):
+        """Returns the record index of the category called `name`, or None."""
+        encoded = name.encode()
+        names_offset = self.sections['strings'][0]
+        low, high = 0, self.count('names')
+
+        while low < high:
+            middle = (low + high) // 2
+            index, = self.record('names', INDEX, middle)
+            _, offset, length, _, _ = self.record('categories', CATEGORY, index)
+            candidate = self.view[names_offset + offset:names_offset + offset + length]
+
+            if candidate == encoded:
+                return index
+            if bytes(candidate) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+
+        return None
+
+    def resource(self, index):
+        (resource_id, version, title_offset, title_length, url_offset, url_length,
+         owner_offset, owner_length, links_start, links_count) = self.record('resources', RESOURCE, index)
+
+        categories = [
+            self.category(self.record('links', INDEX, position)[0])
+            for position in range(links_start, links_start + links_count)
+        ]
+
+        # Comments aren't part of the snapshot; replicas report none.
+        return {
+            'id': resource_id,
+            'title': self.string(title_offset, title_length),
+            'categories': categories,
+            'resource_url': self.string(url_offset, url_length),
+            'owner': {'username': self.string(owner_offset, owner_length)},
+            'comment_set': [],
+            'version': version,
+        }
+
+    def resources(self, category_index=None):
+        if category_index is None:
+            return [self.resource(index) for index in range(self.count('resources'))]
+
+        _, _, _, refs_start, refs_count = self.record('categories', CATEGORY, category_index)
+
+        return [
+            self.resource(self.record('refs', INDEX, position)[0])
+            for position in range(refs_start, refs_start + refs_count)
+        ]
+
+    def find_resource(self, resource_id):
+        """Returns the record index of the resource with `resource_id`, or None."""
+        ids = _RecordKeys(self, 'resources', RESOURCE)
+        index = bisect_left(ids, resource_id)
+
+        return index if index < len(ids) and ids[index] == resource_id else None
+
+    def find_token(self, key):
+        """Returns (user id, username) for an API token key, or None."""
+        digest = token_digest(key)
+        digests = _RecordKeys(self, 'tokens', TOKEN)
+        index = bisect_left(digests, digest)
+
+        if index == len(digests) or digests[index] != digest:
+            return None
+
+        _, user_id, offset, length = self.record('tokens', TOKEN, index)
+
+        return user_id, self.string(offset, length)
+
+
+class _RecordKeys:
+    """Sequence view of the first field of a sorted section, for `bisect`."""
+
+    def __init__(self, snapshot, section, layout):
+        self.snapshot = snapshot
+        self.section = section
+        self.layout = layout
+
+    def __len__(self):
+        return self.snapshot.count(self.section)
+
+    def __getitem__(self, index):
+        return self.snapshot.record(self.section, self.layout, index)[0]
+
+
+class SnapshotStore:
+    """
+    The snapshot at `settings.SNAPSHOT_PATH`, remapped when the file is
+    replaced. The path is checked at most every `SNAPSHOT_CHECK_INTERVAL`
+    seconds. Requests holding the previous snapshot keep it until they finish.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.identity = None
+        self.checked_at = None
+
+    def get(self):
+        now = time.monotonic()
+        if self.checked_at is not None and now - self.checked_at < settings.SNAPSHOT_CHECK_INTERVAL:
+            return self.snapshot
+
+        with self.lock:
+            path = settings.SNAPSHOT_PATH
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                raise SnapshotError('No catalogue snapshot at {path}.'.format(path=path))
+
+            identity = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if identity != self.identity:
+                self.snapshot = Snapshot(path)
+                self.identity = identity
+            self.checked_at = now
+
+        return self.snapshot
+
+
+snapshot_store = SnapshotStore()
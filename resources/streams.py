@@ -0,0 +1,261 @@
+"""
+Server-sent event streams of new comments, see `CommentViewSet.stream`.
+
+`CommentSerializer.create` publishes every committed comment to the
+process-wide `comment_broker`, which fans it out to the subscribers of its
+resource. Comments written by other processes are picked up by one poller
+thread per process that looks for new comment ids every
+`COMMENT_STREAM_POLL_INTERVAL` seconds while anyone is subscribed.
+An idle subscriber costs a queue and an event, and the poller runs one
+indexed query per interval however many subscribers there are.
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Max
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Comment
+from .utils import BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Comment ids recently published, so the poller doesn't repeat local comments.
+DELIVERED_IDS = 1024
+
+# Milliseconds browsers wait before reconnecting a closed stream.
+RECONNECT_DELAY = 3000
+
+KEEP_ALIVE = b': keep-alive\n\n'
+
+
+class TooManyStreams(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many comment streams are open, try again later.'
+    default_code = 'too_many_streams'
+
+
+def format_event(comment_id, data, event='comment'):
+    return 'id: {id}\nevent: {event}\ndata: {data}\n\n'.format(
+        id=comment_id,
+        event=event,
+        data=json.dumps(data, cls=JSONEncoder, separators=(',', ':'))
+    ).encode()
+
+
+def serialize(comment):
+    from .serializers import CommentSerializer
+
+    return CommentSerializer(comment).data
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets `Accept: text/event-stream` through negotiation; errors go out as an `error` event."""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return 'event: error\ndata: {data}\n\n'.format(
+            data=json.dumps(data, cls=JSONEncoder, separators=(',', ':'))
+        ).encode()
+
+
+class Subscription:
+    __slots__ = ('resource_id', 'after', 'events', 'ready', 'overflowed')
+
+    def __init__(self, resource_id, after=0):
+        self.resource_id = resource_id
+        # Comments up to this id were already sent, e.g. as a replay.
+        self.after = after
+        self.events = deque()
+        self.ready = threading.Event()
+        self.overflowed = False
+
+    def push(self, comment_id, event):
+        if comment_id <= self.after:
+            return
+
+        if len(self.events) < settings.COMMENT_STREAM_BUFFER:
+            self.events.append(event)
+        else:
+            self.overflowed = True
+        self.ready.set()
+
+    def wait(self, timeout):
+        """Returns the queued events, waiting up to `timeout` seconds for one."""
+        self.ready.wait(timeout)
+        self.ready.clear()
+
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+
+        return events
+
+
+class CommentBroker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+        self.count = 0
+        self.delivered = deque(maxlen=DELIVERED_IDS)
+        self.delivered_ids = set()
+        self.last_id = 0
+        self.poller = None
+        self.wake = threading.Event()
+
+    def subscribe(self, resource_id, limit=None):
+        """
+        Subscribes to new comments of `resource_id`. Call this before reading
+        the comments to replay, and set `after` on the subscription to the
+        last one sent, so nothing committed in between is lost. Raises
+        `TooManyStreams` if `limit` subscriptions are already open.
+        """
+        subscription = Subscription(resource_id)
+
+        with self.lock:
+            if limit is not None and self.count >= limit:
+                raise TooManyStreams()
+
+            if self.poller is None:
+                self.last_id = Comment.all_objects.aggregate(last_id=Max('id'))['last_id'] or 0
+                self.poller = threading.Thread(target=self.run, name='comment-stream-poller', daemon=True)
+                self.poller.start()
+
+            self.subscribers[resource_id].add(subscription)
+            self.count += 1
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.resource_id)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.remove(subscription)
+                self.count -= 1
+                if not subscribers:
+                    del self.subscribers[subscription.resource_id]
+
+            if not self.subscribers:
+                self.wake.set()
+
+    def subscriber_count(self):
+        with self.lock:
+            return self.count
+
+    def publish(self, comment):
+        with self.lock:
+            if comment.id in self.delivered_ids:
+                return
+            if len(self.delivered) == self.delivered.maxlen:
+                self.delivered_ids.discard(self.delivered[0])
+            self.delivered.append(comment.id)
+            self.delivered_ids.add(comment.id)
+
+            subscribers = list(self.subscribers.get(comment.resource_id, ()))
+
+        if not subscribers:
+            return
+
+        # Serialized and formatted once, however many subscribers there are.
+        event = format_event(comment.id, serialize(comment))
+        for subscription in subscribers:
+            subscription.push(comment.id, event)
+
+    def poll(self):
+        with self.lock:
+            resource_ids = set(self.subscribers)
+
+        while True:
+            rows = list(
+                Comment.objects
+                .filter(id__gt=self.last_id)
+                .order_by('id')
+                .values_list('id', 'resource_id')[:BATCH_SIZE]
+            )
+            if not rows:
+                return
+
+            self.last_id = rows[-1][0]
+            wanted = [comment_id for comment_id, resource_id in rows if resource_id in resource_ids]
+            if wanted:
+                comments = Comment.objects.select_related('author').in_bulk(wanted)
+                for comment_id in wanted:
+                    # Skips comments deleted since the first query.
+                    if comment_id in comments:
+                        self.publish(comments[comment_id])
+
+            if len(rows) < BATCH_SIZE:
+                return
+
+    def run(self):
+        try:
+            while True:
+                self.wake.wait(settings.COMMENT_STREAM_POLL_INTERVAL)
+                self.wake.clear()
+
+                with self.lock:
+                    if not self.subscribers:
+                        self.poller = None
+                        return
+
+                try:
+                    self.poll()
+                except DatabaseError:
+                    logger.exception('Polling for new comments failed')
+        finally:
+            connection.close()
+
+
+comment_broker = CommentBroker()
+
+
+class EventStream:
+    """
+    Yields `initial`, then the subscription's events as they arrive, with a
+    keep-alive comment every `COMMENT_STREAM_KEEPALIVE` seconds of silence.
+    Ends after `COMMENT_STREAM_MAX_AGE` seconds, or once the client fell
+    `COMMENT_STREAM_BUFFER` events behind; clients reconnect with
+    `Last-Event-ID` and get the rest replayed. Closing it ends the
+    subscription, even if the stream was never iterated.
+    """
+
+    def __init__(self, subscription, initial=()):
+        self.subscription = subscription
+        self.initial = initial
+
+    def __iter__(self):
+        try:
+            # The request is over as far as the database is concerned.
+            if not connection.in_atomic_block:
+                connection.close()
+
+            yield 'retry: {delay}\n\n'.format(delay=RECONNECT_DELAY).encode()
+            yield from self.initial
+
+            deadline = time.monotonic() + settings.COMMENT_STREAM_MAX_AGE
+            while not self.subscription.overflowed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+
+                events = self.subscription.wait(min(settings.COMMENT_STREAM_KEEPALIVE, remaining))
+                yield b''.join(events) if events else KEEP_ALIVE
+        finally:
+            self.close()
+
+    def close(self):
+        comment_broker.unsubscribe(self.subscription)
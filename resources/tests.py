@@ -1,9 +1,54 @@
+import gzip
+import json
+import os
+import shutil
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.core.servers.basehttp import WSGIServer
+from django.db import OperationalError, connection
 from django.shortcuts import reverse
+from django.test import LiveServerTestCase, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.testcases import LiveServerThread, QuietWSGIRequestHandler
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
-
-from .models import Category, Resource, Comment
+from rest_framework.authtoken.models import Token
+
+from audit.buffer import event_log
+from freesource.budgets import (
+    QueryBudget, QueryBudgetExceeded, get_violation_counts, install, reset_violation_counts, track
+)
+from freesource.compression import brotli
+from users.models import UserActivity
+
+from .importing import ResourceImporter, read_rows
+from .models import Category, Resource, Comment, ArchivedComment, Change, RelatedResource
+from .normalization import normalize_url
+from .recommendations import live_links, load_masks
+from .snapshot import Snapshot, SnapshotError, export_snapshot
+from .streams import comment_broker
+from .views import BatchView, ResourceViewSet
+from .writes import PendingWrite, comment_writer
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 
 class AbstractTestCase(APITestCase):
@@ -50,6 +95,19 @@ class CategoryListViewTestCase(AbstractTestCase):
         self.assertEqual(response.data[0]['id'], self.category.id)
         self.assertEqual(response.data[0]['name'], self.category.name)
 
+    def test_category_list_is_cached_until_a_category_changes(self):
+        self.client.force_authenticate(self.user)
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 1)
+
+        Category.objects.create(name='Music')
+
+        response = self.client.get(self.url)
+        self.assertEqual([category['name'] for category in response.data], ['Test', 'Music'])
+
     def test_category_creation_with_non_authenticated_user(self):
         response = self.client.post(self.url, data=self.post_data)
 
@@ -279,6 +337,548 @@ class ResourceViewSetTestCase(ResourceAbstractTestCase):
         )
 
         self.assertFalse(Resource.objects.all())
+        self.assertTrue(Resource.all_objects.get(id=self.resource.id).is_deleted)
+
+    def test_resource_creation_with_deleted_resource_title(self):
+        self.client.force_authenticate(self.user)
+        self.resource.soft_delete()
+
+        response = self.client.post(
+            reverse(self.list_url_name),
+            data=dict(self.post_data, title=self.resource.title)
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_resource_update_with_current_version(self):
+        self.client.force_authenticate(self.resource.owner)
+
+        response = self.client.put(
+            reverse(
+                self.detail_url_name,
+                kwargs={'pk': self.resource.id}
+            ),
+            data=self.put_data,
+            HTTP_IF_MATCH='"{}"'.format(self.resource.version)
+        )
+
+        self.resource.refresh_from_db()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], '"2"')
+        self.assertEqual(self.resource.title, self.put_data['title'])
+        self.assertEqual(self.resource.version, 2)
+
+    def test_concurrent_saves_get_distinct_versions(self):
+        first, second = Resource.objects.get(id=self.resource.id), Resource.objects.get(id=self.resource.id)
+
+        first.title, second.title = 'First', 'Second'
+        first.save()
+        second.save()
+
+        self.assertEqual((first.version, second.version), (2, 3))
+        self.assertEqual(Resource.objects.get(id=self.resource.id).version, 3)
+
+    def test_save_writes_the_next_version_without_reading(self):
+        resource = Resource.objects.get(id=self.resource.id)
+        resource.soft_delete()
+        resource.title = 'Renamed'
+
+        # The UPDATE and its change feed entry.
+        with self.assertNumQueries(2):
+            resource.save()
+
+        self.assertEqual(resource.version, 2)
+        self.assertEqual(Resource.all_objects.get(id=self.resource.id).version, 2)
+
+    def test_resource_update_with_stale_version(self):
+        self.client.force_authenticate(self.resource.owner)
+        Resource.objects.filter(id=self.resource.id).update(version=2)
+
+        response = self.client.put(
+            reverse(
+                self.detail_url_name,
+                kwargs={'pk': self.resource.id}
+            ),
+            data=self.put_data,
+            HTTP_IF_MATCH='"1"'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Resource.objects.get(id=self.resource.id).title, self.resource.title)
+
+    def test_resource_update_with_weak_version(self):
+        self.client.force_authenticate(self.resource.owner)
+
+        response = self.client.put(
+            reverse(
+                self.detail_url_name,
+                kwargs={'pk': self.resource.id}
+            ),
+            data=self.put_data,
+            HTTP_IF_MATCH='W/"1"'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Resource.objects.get(id=self.resource.id).title, self.resource.title)
+
+    def test_resource_update_with_invalid_version(self):
+        self.client.force_authenticate(self.resource.owner)
+
+        response = self.client.put(
+            reverse(
+                self.detail_url_name,
+                kwargs={'pk': self.resource.id}
+            ),
+            data=self.put_data,
+            HTTP_IF_MATCH='not-a-version'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class WarmUpTestCase(SimpleTestCase):
+    def test_admin_stays_lazy(self):
+        # A fresh interpreter, as this one may have loaded the admin already.
+        code = (
+            'import sys, django; django.setup(); '
+            'from freesource.warmup import warm_up; warm_up(); '
+            'print("freesource.urls_admin" in sys.modules, "resources.admin" in sys.modules)'
+        )
+        output = subprocess.check_output(
+            [sys.executable, '-c', code],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE='freesource.settings')
+        )
+
+        self.assertEqual(output.decode().strip(), 'False False')
+
+
+class NormalizeUrlTestCase(SimpleTestCase):
+    def test_case_folding_and_default_port(self):
+        self.assertEqual(
+            normalize_url('HTTP://WWW.Example.COM:80/Docs/'),
+            normalize_url('http://www.example.com/Docs')
+        )
+
+    def test_tracking_parameters_and_fragment(self):
+        self.assertEqual(
+            normalize_url('https://example.com/page/?utm_source=news&b=2&fbclid=x&a=1#intro'),
+            'https://example.com/page?a=1&b=2'
+        )
+
+    def test_distinct_urls(self):
+        self.assertNotEqual(normalize_url('https://example.com:8443/'), normalize_url('https://example.com/'))
+        self.assertNotEqual(normalize_url('https://example.com/a?x=1'), normalize_url('https://example.com/a?x=2'))
+
+
+class DuplicateResourceUrlTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.client.force_authenticate(self.user)
+
+    def test_resource_creation_with_duplicate_url(self):
+        response = self.client.post(
+            reverse('resources:resources-list'),
+            data={
+                'title': 'Same link',
+                'resource_url': 'HTTP://www.Django-Rest-Framework.org/api-guide/testing?utm_medium=email'
+            }
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data['resource_url'][0],
+            'This URL is already in the catalogue as resource {id}.'.format(id=self.resource.id)
+        )
+
+    def test_resource_update_keeps_own_url(self):
+        response = self.client.put(
+            reverse('resources:resources-detail', kwargs={'pk': self.resource.id}),
+            data={'resource_url': self.resource.resource_url + '#top'},
+            HTTP_IF_MATCH='"1"'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_find_duplicate_urls(self):
+        duplicate = Resource.objects.create(
+            title='Duplicate resource',
+            resource_url='http://www.django-rest-framework.org/api-guide/testing',
+            owner=self.user
+        )
+        Resource.objects.create(title='Unique resource', resource_url='https://docs.djangoproject.com/', owner=self.user)
+        output = StringIO()
+
+        call_command('find_duplicate_urls', rebuild_keys=True, stdout=output)
+
+        self.assertIn('    {id}\t'.format(id=self.resource.id), output.getvalue())
+        self.assertIn('    {id}\t'.format(id=duplicate.id), output.getvalue())
+        self.assertIn('Found 1 duplicate clusters.', output.getvalue())
+
+
+class RelatedResourcesTestCase(AbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.python, self.web, self.music = (
+            Category.objects.create(name=name) for name in ('Python', 'Web', 'Music')
+        )
+        self.resources = [
+            Resource.objects.create(
+                title='Resource {}'.format(index),
+                resource_url='https://example.com/{}'.format(index),
+                owner=self.user
+            )
+            for index
+            in range(4)
+        ]
+        self.resources[0].categories.add(self.python, self.web)
+        self.resources[1].categories.add(self.python, self.web)
+        self.resources[2].categories.add(self.python)
+        self.resources[3].categories.add(self.music)
+
+        self.client.force_authenticate(self.user)
+
+    def get_related(self, resource):
+        response = self.client.get(reverse('resources:resources-related', kwargs={'pk': resource.id}))
+
+        return [(related['id'], related['score']) for related in response.data]
+
+    def test_related_resources(self):
+        first, second, third, fourth = self.resources
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('resources:resources-related', kwargs={'pk': first.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_related(first), [(second.id, 1.0), (third.id, 0.5)])
+        self.assertEqual(self.get_related(third), [(first.id, 0.5), (second.id, 0.5)])
+        self.assertEqual(self.get_related(fourth), [])
+
+    def test_related_resources_after_category_change(self):
+        first, second, third, _ = self.resources
+
+        second.categories.remove(self.web)
+
+        self.assertEqual(self.get_related(first), [(second.id, 0.5), (third.id, 0.5)])
+        self.assertEqual(self.get_related(second), [(third.id, 1.0), (first.id, 0.5)])
+
+    def test_related_resources_hides_deleted(self):
+        first, second, third, _ = self.resources
+
+        second.soft_delete()
+
+        self.assertEqual(self.get_related(first), [(third.id, 0.5)])
+
+    def test_related_refresh_rewrites_only_changed_rows(self):
+        first, second, third, fourth = self.resources
+        unchanged = RelatedResource.objects.get(resource=first, related=second).id
+
+        fourth.categories.add(self.python)
+
+        self.assertEqual(RelatedResource.objects.get(resource=first, related=second).id, unchanged)
+        self.assertEqual(
+            self.get_related(fourth),
+            [(third.id, 0.5), (first.id, 1 / 3), (second.id, 1 / 3)]
+        )
+
+    def test_related_masks_use_dense_bits(self):
+        sparse = Category.objects.create(id=10 ** 6, name='Sparse')
+        self.resources[0].categories.add(sparse)
+
+        masks, _ = load_masks(live_links())
+
+        self.assertLessEqual(max(masks.values()).bit_length(), Category.objects.count())
+
+    def test_build_related_index_matches_incremental_updates(self):
+        first, second, third, fourth = self.resources
+        third.categories.add(self.music)
+        incremental = [self.get_related(resource) for resource in self.resources]
+
+        call_command('build_related_index', stdout=StringIO())
+
+        self.assertEqual([self.get_related(resource) for resource in self.resources], incremental)
+        self.assertEqual(self.get_related(fourth), [(third.id, 0.5)])
+
+
+class TrendingResourcesTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.url = reverse('resources:resources-trending')
+        self.older_resource = Resource.objects.create(
+            title='Older resource',
+            resource_url='http://www.diveintopython3.net/',
+            owner=self.user
+        )
+
+        self.comment(self.resource, 2)
+        self.comment(self.older_resource, 4, age=timezone.timedelta(days=2))
+
+        self.client.force_authenticate(self.user)
+
+    def comment(self, resource, count, age=timezone.timedelta()):
+        for _ in range(count):
+            comment = Comment.objects.create(resource=resource, content='comment', author=self.user)
+            Comment.objects.filter(id=comment.id).update(posted_on=timezone.now() - age)
+
+    def refresh(self):
+        output = StringIO()
+        call_command('refresh_trending', stdout=output)
+
+        return output.getvalue()
+
+    def get_trending(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return [(trending['id'], round(trending['score'], 2)) for trending in response.data]
+
+    def test_trending_before_refresh(self):
+        self.assertEqual(self.get_trending(), [])
+
+    def test_trending_decays_older_activity(self):
+        self.refresh()
+
+        self.assertEqual(self.get_trending(), [(self.resource.id, 2.0), (self.older_resource.id, 1.0)])
+
+    def test_trending_refresh_is_incremental(self):
+        self.refresh()
+        self.comment(self.older_resource, 2)
+
+        self.assertIn('Processed 2 comments', self.refresh())
+        self.assertEqual(self.get_trending(), [(self.older_resource.id, 3.0), (self.resource.id, 2.0)])
+
+    def test_trending_hides_deleted_resources(self):
+        self.refresh()
+        self.resource.soft_delete()
+
+        self.assertEqual(self.get_trending(), [(self.older_resource.id, 1.0)])
+
+
+class ResourceBulkActionsTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.other_resource = Resource.objects.create(
+            title='Other resource',
+            resource_url='http://www.diveintopython3.net/',
+            owner=self.user
+        )
+        self.foreign_resource = Resource.objects.create(
+            title='Foreign resource',
+            resource_url='https://docs.djangoproject.com/',
+            owner=User.objects.create_user(username='foreign', password='foreignpass123')
+        )
+        Comment.objects.create(resource=self.resource, content='first', author=self.user)
+        Comment.objects.create(resource=self.resource, content='second', author=self.user)
+
+        self.new_category = Category.objects.create(name='Python')
+
+        self.delete_url = reverse('resources:resources-bulk-delete')
+        self.categorize_url = reverse('resources:resources-bulk-categorize')
+
+        self.forbidden_message = 'You are not the resource owner.'
+
+    def test_bulk_delete_with_non_authenticated_user(self):
+        response = self.client.post(self.delete_url, data={'ids': [self.resource.id]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_delete_with_resource_owner(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            self.delete_url,
+            data={'ids': [self.resource.id, self.other_resource.id]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'resources': 2})
+        self.assertEqual(list(Resource.objects.all()), [self.foreign_resource])
+        self.assertEqual(Resource.all_objects.filter(is_deleted=True).count(), 2)
+
+    def test_bulk_delete_with_foreign_resource(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            self.delete_url,
+            data={'ids': [self.resource.id, self.foreign_resource.id]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['detail'], self.forbidden_message)
+        self.assertEqual(Resource.objects.count(), 3)
+
+    def test_bulk_categorize_replace(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            self.categorize_url,
+            data={'ids': [self.resource.id, self.other_resource.id], 'categories': [self.new_category.id]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'resources': 2, 'links_added': 2, 'links_removed': 1})
+        self.assertEqual(list(self.resource.categories.all()), [self.new_category])
+        self.assertEqual(list(self.other_resource.categories.all()), [self.new_category])
+
+    def test_bulk_categorize_add(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            self.categorize_url,
+            data={'ids': [self.resource.id], 'categories': [self.new_category.id], 'mode': 'add'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.resource.categories.count(), 2)
+
+    def test_bulk_categorize_with_unknown_category(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.client.post(
+            self.categorize_url,
+            data={'ids': [self.resource.id], 'categories': [0]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PurgeDeletedCommandTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.live_resource = Resource.objects.create(
+            title='Live resource',
+            resource_url='http://www.diveintopython3.net/',
+            owner=self.user
+        )
+        for content in ('first', 'second', 'third'):
+            Comment.objects.create(resource=self.resource, content=content, author=self.user)
+
+        self.live_comment = Comment.objects.create(resource=self.live_resource, content='kept', author=self.user)
+        self.deleted_comment = Comment.objects.create(resource=self.live_resource, content='gone', author=self.user)
+
+        self.resource.soft_delete()
+        self.deleted_comment.soft_delete()
+
+    def test_purge_deleted(self):
+        output = StringIO()
+
+        call_command('purge_deleted', batch_size=2, stdout=output)
+
+        self.assertEqual(list(Resource.all_objects.all()), [self.live_resource])
+        self.assertEqual(list(Comment.all_objects.all()), [self.live_comment])
+        self.assertIn('Purged 1 resources and 4 comments.', output.getvalue())
+
+
+class ChangeListViewTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.url = reverse('resources:change-list')
+        self.since = Change.objects.last().id
+
+        self.client.force_authenticate(self.user)
+
+    def get_changes(self, **params):
+        return self.client.get(self.url, data=dict({'since': self.since}, **params))
+
+    def test_change_list_with_non_authenticated_user(self):
+        self.client.force_authenticate(None)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_change_list_from_start(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(change['model'], change['op'], change['id']) for change in response.data['changes']],
+            [
+                ('category', Change.UPSERT, self.category.id),
+                ('resource', Change.UPSERT, self.resource.id),
+                ('resource_categories', Change.UPSERT, self.resource.id),
+            ]
+        )
+        self.assertEqual(response.data['changes'][1]['data']['owner'], self.user.username)
+        self.assertEqual(response.data['changes'][2]['related_id'], self.category.id)
+        self.assertFalse(response.data['more'])
+
+    def test_change_list_collapses_updates(self):
+        self.client.put(
+            reverse('resources:resources-detail', kwargs={'pk': self.resource.id}),
+            data={'title': 'First'},
+            HTTP_IF_MATCH='"1"'
+        )
+        self.client.put(
+            reverse('resources:resources-detail', kwargs={'pk': self.resource.id}),
+            data={'title': 'Second'}
+        )
+
+        response = self.get_changes()
+
+        self.assertEqual(len(response.data['changes']), 1)
+        self.assertEqual(response.data['changes'][0]['data']['title'], 'Second')
+        self.assertEqual(response.data['changes'][0]['data']['version'], 3)
+
+    def test_change_list_with_deleted_resource(self):
+        comment = Comment.objects.create(resource=self.resource, content='first', author=self.user)
+        self.client.delete(reverse('resources:resources-detail', kwargs={'pk': self.resource.id}))
+
+        response = self.get_changes()
+
+        self.assertEqual(
+            [(change['model'], change['op'], change['id']) for change in response.data['changes']],
+            [
+                ('comment', Change.UPSERT, comment.id),
+                ('resource', Change.DELETE, self.resource.id),
+            ]
+        )
+
+    def test_change_list_with_category_links(self):
+        other_category = Category.objects.create(name='Python')
+        since = Change.objects.last().id
+
+        self.client.post(
+            reverse('resources:resources-bulk-categorize'),
+            data={'ids': [self.resource.id], 'categories': [other_category.id]},
+            format='json'
+        )
+
+        response = self.get_changes(since=since)
+
+        self.assertEqual(
+            [(change['op'], change['id'], change['related_id']) for change in response.data['changes']],
+            [
+                (Change.DELETE, self.resource.id, self.category.id),
+                (Change.UPSERT, self.resource.id, other_category.id),
+            ]
+        )
+
+    def test_change_list_pagination(self):
+        for content in ('first', 'second', 'third'):
+            Comment.objects.create(resource=self.resource, content=content, author=self.user)
+
+        first_page = self.get_changes(limit=2)
+        second_page = self.get_changes(since=first_page.data['next'], limit=2)
+
+        self.assertTrue(first_page.data['more'])
+        self.assertEqual(len(first_page.data['changes']), 2)
+        self.assertFalse(second_page.data['more'])
+        self.assertEqual(second_page.data['changes'][0]['data']['content'], 'third')
+        self.assertEqual(second_page.data['next'], Change.objects.last().id)
 
 
 class CommentViewSetTestCase(ResourceAbstractTestCase):
@@ -476,3 +1076,1295 @@ class CommentViewSetTestCase(ResourceAbstractTestCase):
         )
 
         self.assertFalse(Comment.objects.all())
+
+    def test_comment_update_with_stale_version(self):
+        self.client.force_authenticate(self.comment.author)
+        Comment.objects.filter(id=self.comment.id).update(version=2)
+
+        response = self.client.patch(
+            reverse(
+                self.detail_url_name,
+                kwargs={
+                    'resource_pk': self.resource.id,
+                    'pk': self.comment.id
+                }
+            ),
+            data=self.post_data,
+            HTTP_IF_MATCH='"1"'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Comment.objects.get(id=self.comment.id).content, self.comment.content)
+
+    def test_comment_update_with_current_version(self):
+        self.client.force_authenticate(self.comment.author)
+
+        response = self.client.patch(
+            reverse(
+                self.detail_url_name,
+                kwargs={
+                    'resource_pk': self.resource.id,
+                    'pk': self.comment.id
+                }
+            ),
+            data=self.post_data,
+            HTTP_IF_MATCH='"1"'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 2)
+        self.assertEqual(response['ETag'], '"2"')
+        self.assertEqual(Comment.objects.get(id=self.comment.id).content, self.post_data['content'])
+
+
+class SerializerProfilingTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        Comment.objects.create(resource=self.resource, content='First', author=self.user)
+        Comment.objects.create(resource=self.resource, content='Second', author=self.user)
+
+        self.client.force_authenticate(self.user)
+
+    @override_settings(SERIALIZER_PROFILING=True)
+    def test_profile_header(self):
+        response = self.client.get(reverse('resources:resources-list'), HTTP_X_PROFILE_SERIALIZERS='1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        profile = json.loads(response['X-Serializer-Profile'])
+        self.assertEqual(profile['ResourceSerializer.comment_set']['calls'], 1)
+        # Comments and their authors are prefetched by the view.
+        self.assertEqual(profile['ResourceSerializer.comment_set']['queries'], 0)
+        self.assertEqual(profile['CommentSerializer.author']['calls'], 2)
+        self.assertEqual(profile['CommentSerializer.author']['queries'], 0)
+        self.assertEqual(profile['UserReadSerializer.username']['calls'], 3)
+
+    @override_settings(SERIALIZER_PROFILING=True)
+    def test_profile_header_is_opt_in(self):
+        response = self.client.get(reverse('resources:resources-list'))
+
+        self.assertNotIn('X-Serializer-Profile', response)
+
+    def test_profile_serializers_command(self):
+        output = StringIO()
+        call_command('profile_serializers', '/api/resources/{resource}/', stdout=output)
+
+        self.assertIn('GET /api/resources/{id}/ -> 200'.format(id=self.resource.id), output.getvalue())
+        self.assertIn('ResourceSerializer.comment_set', output.getvalue())
+
+
+@override_settings(AUDIT_BATCH_SIZE=10000)
+class CommentWriteCoalescingTestCase(TransactionTestCase):
+    threads = 16
+    comments_per_thread = 10
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', password='passtestword123')
+        self.resource = Resource.objects.create(
+            title='Test resource',
+            resource_url='http://www.django-rest-framework.org/api-guide/testing/',
+            owner=self.user
+        )
+        self.url = reverse('resources:resource-comments-list', kwargs={'resource_pk': self.resource.id})
+
+    def tearDown(self):
+        comment_writer.stop()
+        event_log.clear()
+
+    def post_comments(self, thread_number, responses):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        try:
+            for n in range(self.comments_per_thread):
+                content = 'Comment {thread}-{n}'.format(thread=thread_number, n=n)
+                responses.append(client.post(self.url, data={'content': content}))
+        finally:
+            connection.close()
+
+    def test_concurrent_comment_posts(self):
+        responses = []
+        threads = [
+            threading.Thread(target=self.post_comments, args=(n, responses))
+            for n in range(self.threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        total = self.threads * self.comments_per_thread
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_201_CREATED] * total)
+
+        comments = dict(Comment.objects.values_list('id', 'content'))
+        self.assertEqual(len(comments), total)
+        for response in responses:
+            self.assertEqual(comments[response.data['id']], response.data['content'])
+
+        self.assertEqual(UserActivity.objects.get(user=self.user).comment_count, total)
+        self.assertEqual(Change.objects.filter(model='comment').count(), total)
+
+    def test_locked_batches_are_retried(self):
+        attempts = []
+
+        def write():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OperationalError('database is locked')
+
+            return Comment.objects.create(resource=self.resource, content='Retried', author=self.user)
+
+        with self.assertLogs('resources.writes', 'WARNING'):
+            comment = comment_writer.submit(write)
+
+        self.assertEqual(len(attempts), 2)
+        self.assertTrue(Comment.objects.filter(id=comment.id, content='Retried').exists())
+
+    def test_failing_write_does_not_affect_its_batch(self):
+        def write(content):
+            return Comment.objects.create(resource_id=self.resource.id, content=content, author=self.user)
+
+        def failing_write():
+            raise ValueError('Invalid comment')
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(comment_writer.submit(lambda: write('Kept')))),
+            threading.Thread(target=lambda: self.assertRaises(ValueError, comment_writer.submit, failing_write)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(list(Comment.objects.values_list('content', flat=True)), ['Kept'])
+
+    def test_slow_write_does_not_affect_its_batch(self):
+        def slow_write():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'UPDATE resources_comment SET content = content WHERE id IN ('
+                    'WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers LIMIT 1000000) '
+                    'SELECT -n FROM numbers)'
+                )
+
+        install()
+        kept = PendingWrite(lambda: Comment.objects.create(resource=self.resource, content='Kept', author=self.user))
+        with track('test', QueryBudget(sql_time=0.01), mode='enforce'):
+            slow = PendingWrite(slow_write)
+
+        with self.assertLogs('freesource.budgets', 'WARNING'):
+            comment_writer._commit([kept, slow])
+
+        self.assertIsInstance(slow.error, QueryBudgetExceeded)
+        self.assertIsNone(kept.error)
+        self.assertEqual(list(Comment.objects.values_list('content', flat=True)), ['Kept'])
+
+    def test_writes_count_against_the_submitting_request(self):
+        def write():
+            return Comment.objects.create(resource_id=self.resource.id, content='Over budget', author=self.user)
+
+        install()
+        with self.assertRaises(QueryBudgetExceeded), self.assertLogs('freesource.budgets', 'WARNING'):
+            with track('test', QueryBudget(queries=1), mode='enforce'):
+                comment_writer.submit(write)
+
+        self.assertFalse(Comment.objects.exists())
+
+
+class AdminTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.admin_user = User.objects.create_superuser(
+            username='admin_user',
+            email='admin@gmail.com',
+            password='you1can2not3guess4my5password6'
+        )
+        self.client.force_login(self.admin_user)
+
+        self.comment = Comment.objects.create(resource=self.resource, content='First', author=self.user)
+
+        # The change views look up content types for the admin log; count that lookup every time.
+        ContentType.objects.clear_cache()
+
+    def add_rows(self, count):
+        for n in range(count):
+            owner = User.objects.create_user(username='owner_{n}'.format(n=n), password='passtestword123')
+            resource = Resource.objects.create(
+                title='Resource {n}'.format(n=n),
+                resource_url='https://example.com/{n}'.format(n=n),
+                owner=owner
+            )
+            Comment.objects.create(resource=resource, content='Comment', author=owner)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        urls = [reverse('admin:resources_resource_changelist'), reverse('admin:resources_comment_changelist')]
+        queries = [self.count_queries(url) for url in urls]
+
+        self.add_rows(10)
+
+        self.assertEqual([self.count_queries(url) for url in urls], queries)
+
+    def test_changelist_queries(self):
+        self.add_rows(10)
+
+        # Session, user, count and one joined page query.
+        with self.assertNumQueries(4):
+            self.client.get(reverse('admin:resources_resource_changelist'))
+        with self.assertNumQueries(4):
+            self.client.get(reverse('admin:resources_comment_changelist'))
+
+    def test_search_uses_indexes(self):
+        self.add_rows(10)
+
+        for url_name, term, expected in (
+            ('admin:resources_resource_changelist', 'Resource', 10),
+            ('admin:resources_resource_changelist', 'rESOURCE', 10),
+            ('admin:resources_resource_changelist', 'owner_3', 1),
+            ('admin:resources_resource_changelist', 'Owner_3', 1),
+            ('admin:resources_comment_changelist', 'OWNER_3', 1),
+        ):
+            response = self.client.get(reverse(url_name), {'q': term})
+            queryset = response.context['cl'].queryset
+            self.assertEqual(queryset.count(), expected)
+
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            self.assertFalse([step for step in plan if step.startswith('SCAN')], plan)
+
+    @override_settings(ADMIN_CHANGELIST_MAX_COUNT=5)
+    def test_changelist_count_is_capped(self):
+        self.add_rows(10)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:resources_resource_changelist'))
+
+        self.assertEqual(response.context['cl'].result_count, 5)
+        counts = [query['sql'] for query in queries.captured_queries if 'COUNT(' in query['sql']]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('LIMIT 5', counts[0])
+
+    def test_change_view_does_not_load_every_user(self):
+        self.add_rows(10)
+
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse('admin:resources_resource_change', args=[self.resource.id]))
+        self.assertNotContains(response, 'owner_9')
+
+        with self.assertNumQueries(9):
+            response = self.client.get(reverse('admin:resources_comment_change', args=[self.comment.id]))
+        self.assertNotContains(response, 'owner_9')
+
+
+class ResponseEncodingTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        for n in range(20):
+            Resource.objects.create(
+                title='Resource {n}'.format(n=n),
+                resource_url='https://example.com/{n}'.format(n=n),
+                owner=self.user
+            )
+
+        self.url = reverse('resources:resources-list')
+        self.client.force_authenticate(self.user)
+
+    def test_gzip(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip;q=1.0, br;q=0.5')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(json.loads(gzip.decompress(response.content).decode())), 21)
+
+    @skipUnless(brotli, 'brotli is not installed')
+    def test_brotli(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(brotli.decompress(response.content).decode())), 21)
+
+    def test_no_accepted_encoding(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='identity, gzip;q=0')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get(
+            reverse('resources:resources-detail', kwargs={'pk': self.resource.id}),
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    @override_settings(COMPRESSION_MIN_SIZE=0)
+    def test_compressed_responses_keep_strong_etags(self):
+        response = self.client.put(
+            reverse('resources:resources-detail', kwargs={'pk': self.resource.id}),
+            data={'title': 'Renamed ' * 20},
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], '"2"')
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack(self):
+        json_response = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content, raw=False), json.loads(json_response.content.decode()))
+
+
+class BatchViewTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.url = reverse('resources:batch')
+        self.comment = Comment.objects.create(resource=self.resource, content='First', author=self.user)
+        self.token = Token.objects.create(user=self.user)
+
+    def batch(self, requests, **kwargs):
+        return self.client.post(self.url, data=dict(kwargs, requests=requests), format='json')
+
+    def resource_page(self):
+        return [
+            {'method': 'GET', 'path': '/api/resources/{id}/'.format(id=self.resource.id)},
+            {'method': 'GET', 'path': '/api/resources/{id}/comments/'.format(id=self.resource.id)},
+            {'method': 'GET', 'path': '/api/categories/'},
+        ]
+
+    def test_batch_with_non_authenticated_user(self):
+        response = self.batch(self.resource_page())
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_batch_of_reads(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.batch(self.resource_page())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        resource, comments, categories = response.data['responses']
+        self.assertEqual(
+            [resource['status'], comments['status'], categories['status']],
+            [status.HTTP_200_OK] * 3
+        )
+        self.assertEqual(resource['body']['title'], self.resource.title)
+        self.assertEqual([comment['id'] for comment in comments['body']], [self.comment.id])
+        self.assertEqual([category['name'] for category in categories['body']], ['Test'])
+
+        token_lookups = [query for query in queries.captured_queries if 'authtoken_token' in query['sql']]
+        self.assertEqual(len(token_lookups), 1)
+
+    def test_batch_with_writes(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.batch([
+            {
+                'method': 'POST',
+                'path': '/api/resources/{id}/comments/'.format(id=self.resource.id),
+                'body': {'content': 'Second'},
+            },
+            {'method': 'GET', 'path': '/api/resources/{id}/comments/'.format(id=self.resource.id)},
+            {'method': 'DELETE', 'path': '/api/resources/{id}/'.format(id=self.resource.id)},
+        ], parallel=True)
+
+        created, comments, deleted = response.data['responses']
+        self.assertEqual(created['status'], status.HTTP_201_CREATED)
+        self.assertEqual(created['body']['content'], 'Second')
+        self.assertEqual(len(comments['body']), 2)
+        self.assertEqual(deleted['status'], status.HTTP_204_NO_CONTENT)
+        self.assertTrue(Resource.all_objects.get(id=self.resource.id).is_deleted)
+
+    def test_sub_requests_keep_their_permissions(self):
+        other_user = User.objects.create_user(username='other_user', password='passtestword123')
+        self.client.force_authenticate(other_user)
+
+        response = self.batch([{'method': 'DELETE', 'path': '/api/resources/{id}/'.format(id=self.resource.id)}])
+
+        self.assertEqual(response.data['responses'][0]['status'], status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Resource.all_objects.get(id=self.resource.id).is_deleted)
+
+    def test_batch_headers_stay_on_the_batch(self):
+        self.client.force_authenticate(self.user)
+        Resource.objects.filter(id=self.resource.id).update(version=2)
+
+        response = self.client.post(
+            self.url,
+            data={'requests': [{
+                'method': 'PATCH',
+                'path': '/api/resources/{id}/'.format(id=self.resource.id),
+                'body': {'title': 'Renamed'},
+            }]},
+            format='json',
+            HTTP_IF_MATCH='"1"'
+        )
+
+        self.assertEqual(response.data['responses'][0]['status'], status.HTTP_200_OK)
+        self.assertEqual(Resource.objects.get(id=self.resource.id).title, 'Renamed')
+
+    def test_only_catalogue_routes_are_batchable(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.batch([
+            {'method': 'GET', 'path': '/api/users/{id}/'.format(id=self.user.id)},
+            {'method': 'POST', 'path': '/api/batch/', 'body': {'requests': self.resource_page()}},
+            {'method': 'GET', 'path': '/api/missing/'},
+        ])
+
+        self.assertEqual(
+            [sub_response['status'] for sub_response in response.data['responses']],
+            [status.HTTP_404_NOT_FOUND] * 3
+        )
+
+    def test_batch_size_limit(self):
+        self.client.force_authenticate(self.user)
+
+        response = self.batch(self.resource_page() * 10)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ParallelBatchTestCase(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', password='passtestword123')
+        self.resources = [
+            Resource.objects.create(
+                title='Resource {n}'.format(n=n),
+                resource_url='https://example.com/{n}'.format(n=n),
+                owner=self.user
+            )
+            for n in range(8)
+        ]
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_parallel_reads_keep_their_order(self):
+        requests = [
+            {'method': 'GET', 'path': '/api/resources/{id}/'.format(id=resource.id)}
+            for resource in self.resources
+        ]
+
+        response = self.client.post(
+            reverse('resources:batch'),
+            data={'requests': requests, 'parallel': True},
+            format='json'
+        )
+
+        self.assertEqual(
+            [sub_response['body']['title'] for sub_response in response.data['responses']],
+            [resource.title for resource in self.resources]
+        )
+
+    def test_streaming_routes_are_rejected_and_released(self):
+        stream_path = '/api/resources/{id}/comments/stream/'.format(id=self.resources[0].id)
+
+        for parallel in (False, True):
+            response = self.client.post(
+                reverse('resources:batch'),
+                data={'requests': [
+                    {'method': 'GET', 'path': stream_path},
+                    {'method': 'GET', 'path': '/api/resources/{id}/'.format(id=self.resources[0].id)},
+                ], 'parallel': parallel},
+                format='json'
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                [sub_response['status'] for sub_response in response.data['responses']],
+                [status.HTTP_400_BAD_REQUEST, status.HTTP_200_OK]
+            )
+            self.assertEqual(comment_broker.subscriber_count(), 0)
+
+    def test_failing_sub_request_keeps_the_others(self):
+        requests = [
+            {'method': 'GET', 'path': '/api/resources/{id}/'.format(id=resource.id)}
+            for resource in self.resources[:2]
+        ]
+        requests.append({'method': 'GET', 'path': '/api/resources/{id}/related/'.format(id=self.resources[0].id)})
+
+        for parallel in (False, True):
+            with mock.patch.object(ResourceViewSet, 'related', side_effect=RuntimeError), \
+                    self.assertLogs('resources.batch', 'ERROR'):
+                response = self.client.post(
+                    reverse('resources:batch'),
+                    data={'requests': requests, 'parallel': parallel},
+                    format='json'
+                )
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                [sub_response['status'] for sub_response in response.data['responses']],
+                [status.HTTP_200_OK, status.HTTP_200_OK, status.HTTP_500_INTERNAL_SERVER_ERROR]
+            )
+
+    def test_exceeded_batch_budget_stops_the_batch(self):
+        requests = [
+            {'method': 'GET', 'path': '/api/resources/{id}/'.format(id=resource.id)}
+            for resource in self.resources[:6]
+        ]
+
+        for parallel in (False, True):
+            with override_settings(QUERY_BUDGET_MODE='enforce'), \
+                    mock.patch.object(BatchView, 'query_budget', QueryBudget(queries=8)), \
+                    self.assertLogs('freesource.budgets', 'WARNING'), \
+                    CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    reverse('resources:batch'),
+                    data={'requests': requests, 'parallel': parallel},
+                    format='json'
+                )
+
+            # A read takes three queries or more, so at most two fit in the budget.
+            statuses = [sub_response['status'] for sub_response in response.data['responses']]
+            self.assertLessEqual(statuses.count(status.HTTP_200_OK), 2)
+            self.assertEqual(
+                set(statuses) - {status.HTTP_200_OK},
+                {status.HTTP_503_SERVICE_UNAVAILABLE}
+            )
+            if not parallel:
+                self.assertLessEqual(len(queries), 8)
+                first_failure = statuses.index(status.HTTP_503_SERVICE_UNAVAILABLE)
+                self.assertEqual(statuses[first_failure:], [status.HTTP_503_SERVICE_UNAVAILABLE] * (6 - first_failure))
+                self.assertEqual(
+                    response.data['responses'][-1]['body']['detail'],
+                    'Not run: the batch exceeded its query budget.'
+                )
+
+    def test_parallel_reads_count_against_the_batch_budget(self):
+        requests = [
+            {'method': 'GET', 'path': '/api/resources/{id}/'.format(id=resource.id)}
+            for resource in self.resources
+        ]
+        reset_violation_counts()
+
+        with mock.patch.object(BatchView, 'query_budget', QueryBudget(queries=len(requests))), \
+                self.assertLogs('freesource.budgets', 'WARNING'):
+            response = self.client.post(
+                reverse('resources:batch'),
+                data={'requests': requests, 'parallel': True},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_violation_counts(), {('BatchView.post', 'queries'): 1})
+
+
+class ImportResourcesCommandTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as target:
+            target.write(content)
+
+        return path
+
+    def import_resources(self, path, *args):
+        output = StringIO()
+        call_command('import_resources', path, *args, stdout=output)
+
+        return output.getvalue()
+
+    def test_csv_import(self):
+        path = self.write('resources.csv', '\n'.join([
+            'title,resource_url,owner,categories',
+            'Django,https://www.djangoproject.com/,test_user,test|web',
+            'Flask,https://flask.pocoo.org/,new_user,Web',
+            'Duplicate URL,https://WWW.djangoproject.com/?utm_source=feed,new_user,',
+            'Test resource,https://example.com/taken-title,new_user,',
+            'Invalid URL,not a url,new_user,',
+        ]))
+
+        output = self.import_resources(path)
+
+        self.assertIn('Imported 2 of 5 rows', output)
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+        django = Resource.objects.get(title='Django')
+        flask = Resource.objects.get(title='Flask')
+        self.assertEqual(django.owner, self.user)
+        self.assertEqual(django.resource_url_key, normalize_url('https://www.djangoproject.com/'))
+        self.assertEqual(set(django.categories.values_list('name', flat=True)), {'Test', 'Web'})
+        self.assertEqual(flask.owner.username, 'new_user')
+        self.assertFalse(flask.owner.has_usable_password())
+        self.assertEqual(Category.objects.filter(name='Web').count(), 1)
+
+        self.assertTrue(Change.objects.filter(model='resource', object_id=flask.id).exists())
+        self.assertEqual(
+            Change.objects.filter(model='resource_categories', object_id__in=[django.id, flask.id]).count(),
+            3
+        )
+        self.assertEqual(UserActivity.objects.get(user=flask.owner).resource_count, 1)
+        self.assertEqual(UserActivity.objects.get(user=flask.owner).top_categories()[0]['name'], 'Web')
+        self.assertTrue(RelatedResource.objects.filter(resource=django, related=flask).exists())
+
+    def test_interrupted_jsonl_import_resumes(self):
+        path = self.write('resources.jsonl', ''.join(
+            json.dumps({
+                'title': 'Resource {n}'.format(n=n),
+                'resource_url': 'https://example.com/{n}'.format(n=n),
+                'categories': ['Test'],
+            }) + '\n'
+            for n in range(5)
+        ))
+
+        import_chunk = ResourceImporter.import_chunk
+        calls = []
+
+        def interrupted(importer, rows):
+            calls.append(rows)
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+            return import_chunk(importer, rows)
+
+        with mock.patch.object(ResourceImporter, 'import_chunk', interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                self.import_resources(path, '--chunk-size', '2', '--owner', 'test_user')
+
+        self.assertEqual(Resource.objects.filter(title__startswith='Resource ').count(), 4)
+
+        output = self.import_resources(path, '--chunk-size', '2', '--owner', 'test_user')
+
+        self.assertIn('Resuming after row 4.', output)
+        self.assertIn('Imported 1 of 1 rows', output)
+        self.assertEqual(Resource.objects.filter(title__startswith='Resource ').count(), 5)
+        self.assertEqual(UserActivity.objects.get(user=self.user).resource_count, 5)
+
+
+    def test_malformed_lines_are_skipped(self):
+        path = self.write('resources.jsonl', '\n'.join([
+            json.dumps({'title': 'First', 'resource_url': 'https://example.com/first'}),
+            '{"title": "Broken",',
+            '["not", "an", "object"]',
+            json.dumps({'title': 42, 'resource_url': 'https://example.com/number'}),
+            json.dumps({'title': 'Letters', 'resource_url': 'https://example.com/letters', 'categories': 'python'}),
+            json.dumps({'title': 'Last', 'resource_url': 'https://example.com/last'}),
+        ]))
+        errors = StringIO()
+
+        output = StringIO()
+        call_command('import_resources', path, '--owner', 'test_user', stdout=output, stderr=errors)
+
+        self.assertIn('Imported 2 of 6 rows', output.getvalue())
+        self.assertIn('Skipped 4 malformed lines.', output.getvalue())
+        self.assertIn('Skipped line 2: ', errors.getvalue())
+        self.assertIn('Skipped line 3: Expected a JSON object.', errors.getvalue())
+        self.assertIn('Skipped line 4: "title" must be a string.', errors.getvalue())
+        self.assertIn('Skipped line 5: "categories" must be a list of strings.', errors.getvalue())
+        self.assertFalse(Category.objects.filter(name='P').exists())
+        self.assertEqual(set(Resource.objects.values_list('title', flat=True)), {'Test resource', 'First', 'Last'})
+
+    def test_read_rows_resumes_from_offset(self):
+        csv_path = self.write('resources.csv', '\n'.join([
+            'title,resource_url,categories',
+            'First,https://example.com/first,Web',
+            '"Second,\nover two lines",https://example.com/second,',
+            'Third,https://example.com/third,Web|Python',
+        ]))
+        jsonl_path = self.write('resources.jsonl', '\n'.join(
+            json.dumps({'title': title}) for title in ('First', 'Second', 'Third')
+        ))
+
+        for path in (csv_path, jsonl_path):
+            rows = list(read_rows(path))
+            resumed = list(read_rows(path, *rows[1].resume))
+
+            self.assertEqual(resumed, rows[2:])
+            self.assertEqual(resumed[0].data['title'], 'Third')
+
+        self.assertEqual([row.line for row in read_rows(csv_path)], [2, 3, 5])
+        self.assertEqual(list(read_rows(csv_path))[1].data['title'], 'Second,\nover two lines')
+
+class CommentArchivalTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.comments = [
+            Comment.objects.create(resource=self.resource, content='comment {n}'.format(n=n), author=self.user)
+            for n in range(5)
+        ]
+        old = [comment.id for comment in self.comments[:3]]
+        Comment.objects.filter(id__in=old).update(posted_on=timezone.now() - timedelta(days=365))
+
+        self.client.force_authenticate(self.user)
+        self.list_url = reverse('resources:resource-comments-list', kwargs={'resource_pk': self.resource.id})
+
+    def archive(self, *args):
+        output = StringIO()
+        call_command('archive_comments', *args, stdout=output)
+
+        return output.getvalue()
+
+    def ids(self, comments):
+        return [comment['id'] for comment in comments]
+
+    def test_archive_comments(self):
+        deleted = Comment.objects.create(resource=self.resource, content='deleted', author=self.user)
+        Comment.all_objects.filter(id=deleted.id).update(posted_on=timezone.now() - timedelta(days=365))
+        deleted.soft_delete()
+
+        output = self.archive('--batch-size', '2')
+
+        self.assertIn('Archived 3 comments', output)
+        self.assertEqual(
+            list(Comment.all_objects.order_by('id').values_list('id', flat=True)),
+            [self.comments[3].id, self.comments[4].id, deleted.id]
+        )
+        archived = ArchivedComment.objects.get(id=self.comments[0].id)
+        self.assertEqual((archived.resource, archived.author, archived.content), (self.resource, self.user, 'comment 0'))
+
+    def test_unpaged_list_returns_hot_comments(self):
+        self.archive()
+
+        response = self.client.get(self.list_url)
+
+        self.assertEqual(self.ids(response.data), [self.comments[3].id, self.comments[4].id])
+
+    def test_pages_reach_archive_past_hot_window(self):
+        self.archive()
+
+        # A page inside the hot window doesn't touch the archive.
+        with self.assertNumQueries(2):
+            self.client.get(self.list_url, {'limit': 1})
+
+        response = self.client.get(self.list_url, {'limit': 2})
+        self.assertEqual(self.ids(response.data['comments']), [self.comments[4].id, self.comments[3].id])
+        self.assertTrue(response.data['more'])
+
+        response = self.client.get(self.list_url, {'limit': 2, 'before': response.data['next']})
+        self.assertEqual(self.ids(response.data['comments']), [self.comments[2].id, self.comments[1].id])
+        self.assertEqual(response.data['comments'][0]['author']['username'], self.user.username)
+        self.assertTrue(response.data['more'])
+
+        response = self.client.get(self.list_url, {'limit': 2, 'before': response.data['next']})
+        self.assertEqual(self.ids(response.data['comments']), [self.comments[0].id])
+        self.assertFalse(response.data['more'])
+        self.assertIsNone(response.data['next'])
+
+    def test_page_straddling_hot_and_archived_comments(self):
+        self.archive()
+
+        response = self.client.get(self.list_url, {'limit': 3})
+
+        self.assertEqual(
+            self.ids(response.data['comments']),
+            [self.comments[4].id, self.comments[3].id, self.comments[2].id]
+        )
+        self.assertTrue(response.data['more'])
+
+    def test_invalid_page_query(self):
+        response = self.client.get(self.list_url, {'limit': 0})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deleted_resource_takes_its_comments(self):
+        self.archive()
+        commenter = User.objects.create_user(username='commenter', password='passtestword123')
+        Comment.objects.create(resource=self.resource, content='by commenter', author=commenter)
+        call_command('rebuild_user_activity', stdout=StringIO())
+        since = Change.objects.last().id
+        comment_ids = set(Comment.all_objects.values_list('id', flat=True))
+        comment_ids.update(ArchivedComment.objects.values_list('id', flat=True))
+
+        with self.assertNumQueries(13):
+            response = self.client.delete(reverse('resources:resources-detail', kwargs={'pk': self.resource.id}))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Comment.objects.filter(resource=self.resource).exists())
+        self.assertIn('Archived 0 comments', self.archive())
+
+        def changes():
+            response = self.client.get(reverse('resources:change-list'), {'since': since})
+            return {(change['model'], change['op'], change['id']) for change in response.data['changes']}
+
+        def comment_counts():
+            return dict(UserActivity.objects.values_list('user_id', 'comment_count'))
+
+        # The comments' tombstones and counts are left to the purge.
+        self.assertEqual(changes(), {('resource', Change.DELETE, self.resource.id)})
+        self.assertEqual(comment_counts(), {self.user.id: 5, commenter.id: 1})
+        call_command('rebuild_user_activity', stdout=StringIO())
+        self.assertEqual(comment_counts(), {self.user.id: 5, commenter.id: 1})
+
+        call_command('purge_deleted', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            changes(),
+            {('resource', Change.DELETE, self.resource.id)} | {
+                ('comment', Change.DELETE, comment_id) for comment_id in comment_ids
+            }
+        )
+        self.assertEqual(comment_counts(), {self.user.id: 0, commenter.id: 0})
+        call_command('rebuild_user_activity', stdout=StringIO())
+        self.assertFalse(UserActivity.objects.exists())
+
+    def test_change_feed_keeps_archived_comments(self):
+        self.archive()
+
+        response = self.client.get(reverse('resources:change-list'))
+
+        archived = [
+            change
+            for change in response.data['changes']
+            if change['model'] == 'comment' and change['id'] == self.comments[0].id
+        ]
+        self.assertEqual(archived[0]['op'], Change.UPSERT)
+        self.assertEqual(archived[0]['data']['content'], 'comment 0')
+
+
+class CatalogueSnapshotTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.other_user = User.objects.create_user(username='other_user', password='passtestword123')
+        self.python = Category.objects.create(name='Python')
+        self.other_resource = Resource.objects.create(
+            title='Dive into Python 3',
+            resource_url='http://www.diveintopython3.net/',
+            owner=self.other_user
+        )
+        self.other_resource.categories.add(self.category, self.python)
+        deleted = Resource.objects.create(title='Deleted', resource_url='https://example.com/', owner=self.user)
+        deleted.categories.add(self.python)
+        deleted.soft_delete()
+
+        self.token = Token.objects.create(user=self.user)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'catalogue.snapshot')
+        export_snapshot(self.path)
+
+    def replica(self):
+        return override_settings(
+            ROOT_URLCONF='freesource.urls_replica',
+            SNAPSHOT_PATH=self.path,
+            SNAPSHOT_CHECK_INTERVAL=0
+        )
+
+    def primary_and_replica(self, url_name, **kwargs):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        primary = self.client.get(reverse(url_name, kwargs=kwargs))
+
+        with self.replica(), self.assertNumQueries(0):
+            replica = self.client.get(reverse(url_name, kwargs=kwargs))
+
+        return primary, replica
+
+    def assertServedLikePrimary(self, url_name, **kwargs):
+        primary, replica = self.primary_and_replica(url_name, **kwargs)
+
+        self.assertEqual(replica.status_code, primary.status_code)
+        self.assertEqual(json.loads(replica.content.decode()), json.loads(primary.content.decode()))
+
+    def test_category_list(self):
+        self.assertServedLikePrimary('resources:category-list')
+
+    def test_resource_list(self):
+        self.assertServedLikePrimary('resources:resources-list')
+
+    def test_resource_detail(self):
+        self.assertServedLikePrimary('resources:resources-detail', pk=self.other_resource.id)
+
+    def test_resource_category_list(self):
+        self.assertServedLikePrimary('resources:resource-category-list', category_name='python')
+
+    def test_missing_objects(self):
+        for url_name, kwargs in (('resources:resources-detail', {'pk': 999}),
+                                 ('resources:resource-category-list', {'category_name': 'missing'})):
+            _, replica = self.primary_and_replica(url_name, **kwargs)
+            self.assertEqual(replica.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unknown_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + '0' * 40)
+
+        with self.replica():
+            response = self.client.get(reverse('resources:category-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_new_snapshot_is_swapped_in(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+        with self.replica():
+            before = self.client.get(reverse('resources:category-list'))
+
+            Category.objects.create(name='Rust')
+            export_snapshot(self.path)
+            after = self.client.get(reverse('resources:category-list'))
+
+        self.assertNotIn('Rust', [category['name'] for category in before.data])
+        self.assertIn('Rust', [category['name'] for category in after.data])
+        self.assertGreater(int(after['X-Catalogue-Seq']), int(before['X-Catalogue-Seq']))
+
+    def test_unsupported_format_version(self):
+        with open(self.path, 'r+b') as target:
+            target.seek(4)
+            target.write(b'\xff\xff')
+
+        with self.assertRaises(SnapshotError):
+            Snapshot(self.path)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        with self.replica():
+            response = self.client.get(reverse('resources:category-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+    def test_empty_or_truncated_file(self):
+        with open(self.path, 'rb') as source:
+            data = source.read()
+
+        for content in (b'', data[:-1]):
+            with open(self.path, 'wb') as target:
+                target.write(content)
+
+            with self.assertRaises(SnapshotError):
+                Snapshot(self.path)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        with self.replica():
+            response = self.client.get(reverse('resources:category-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+@override_settings(COMMENT_STREAM_POLL_INTERVAL=0.02, COMMENT_STREAM_KEEPALIVE=0.02)
+class CommentStreamTestCase(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', password='passtestword123')
+        self.resource = Resource.objects.create(
+            title='Test resource',
+            resource_url='http://www.django-rest-framework.org/api-guide/testing/',
+            owner=self.user
+        )
+        self.url = reverse('resources:resource-comments-stream', kwargs={'resource_pk': self.resource.id})
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        comment_writer.stop()
+        event_log.clear()
+
+    def open_stream(self, **headers):
+        response = self.client.get(self.url, HTTP_ACCEPT='text/event-stream', **headers)
+        self.addCleanup(response.close)
+
+        return response
+
+    def read_comments(self, response, count, chunks=200):
+        """Reads `comment` events off the stream until `count` arrived."""
+        comments = []
+        content = iter(response.streaming_content)
+
+        for _ in range(chunks):
+            for block in next(content).decode().split('\n\n'):
+                fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+                if fields.get('event') == 'comment':
+                    comments.append(json.loads(fields['data']))
+            if len(comments) >= count:
+                break
+
+        return comments
+
+    def test_stream_with_non_authenticated_user(self):
+        self.client.force_authenticate(None)
+
+        response = self.client.get(self.url, HTTP_ACCEPT='text/event-stream')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_posted_comment_is_pushed(self):
+        response = self.open_stream()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        posted = self.client.post(
+            reverse('resources:resource-comments-list', kwargs={'resource_pk': self.resource.id}),
+            data={'content': 'Pushed'}
+        )
+
+        comments = self.read_comments(response, 1)
+        self.assertEqual([comment['id'] for comment in comments], [posted.data['id']])
+        self.assertEqual(comments[0]['content'], 'Pushed')
+
+    def test_comment_from_another_process_is_polled(self):
+        response = self.open_stream()
+
+        # Written straight to the database, as another process would.
+        comment = Comment.objects.create(resource=self.resource, content='Polled', author=self.user)
+
+        comments = self.read_comments(response, 1)
+        self.assertEqual([(c['id'], c['content']) for c in comments], [(comment.id, 'Polled')])
+
+    def test_reconnect_replays_missed_comments(self):
+        first, second = [
+            Comment.objects.create(resource=self.resource, content=content, author=self.user)
+            for content in ('first', 'second')
+        ]
+
+        response = self.open_stream(HTTP_LAST_EVENT_ID=str(first.id))
+
+        self.assertEqual([comment['id'] for comment in self.read_comments(response, 1)], [second.id])
+
+    def test_idle_subscribers_stay_bounded(self):
+        subscribers = 5000
+        resources = [self.resource] + [
+            Resource.objects.create(
+                title='Resource {n}'.format(n=n),
+                resource_url='https://example.com/{n}'.format(n=n),
+                owner=self.user
+            )
+            for n in range(9)
+        ]
+
+        # Keeps the poller running, so starting it isn't counted against the subscribers.
+        warm_up = comment_broker.subscribe(self.resource.id)
+        self.addCleanup(comment_broker.unsubscribe, warm_up)
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        subscriptions = [comment_broker.subscribe(resources[n % len(resources)].id) for n in range(subscribers)]
+        allocated = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, 'filename'))
+        tracemalloc.stop()
+        self.addCleanup(lambda: [comment_broker.unsubscribe(subscription) for subscription in subscriptions])
+
+        self.assertLess(allocated / subscribers, 2048)
+
+        # Idle, the process only pays for the poller's query per interval.
+        cpu, wall = time.process_time(), time.perf_counter()
+        time.sleep(0.5)
+        self.assertLess((time.process_time() - cpu) / (time.perf_counter() - wall), 0.25)
+
+        comment = Comment.objects.create(resource=self.resource, content='Fan-out', author=self.user)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and not subscriptions[0].events:
+            time.sleep(0.01)
+
+        received = [len(subscription.wait(0)) for subscription in subscriptions]
+        self.assertEqual(received, [1 if n % len(resources) == 0 else 0 for n in range(subscribers)])
+        self.assertIn(comment.id, comment_broker.delivered_ids)
+
+        for subscription in subscriptions + [warm_up]:
+            comment_broker.unsubscribe(subscription)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and comment_broker.poller is not None:
+            time.sleep(0.01)
+        self.assertIsNone(comment_broker.poller)
+
+
+class ThreadedWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class ThreadedLiveServerThread(LiveServerThread):
+    # Django 1.11's live server handles one request at a time; a stream would block it.
+    def _create_server(self):
+        return ThreadedWSGIServer((self.host, self.port), QuietWSGIRequestHandler, allow_reuse_address=False)
+
+
+@override_settings(COMMENT_STREAM_KEEPALIVE=0.05, COMMENT_STREAM_MAX_STREAMS=2)
+class CommentStreamLiveServerTestCase(LiveServerTestCase):
+    server_thread_class = ThreadedLiveServerThread
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', password='passtestword123')
+        self.token = Token.objects.create(user=self.user)
+        self.resource = Resource.objects.create(
+            title='Test resource',
+            resource_url='http://www.django-rest-framework.org/api-guide/testing/',
+            owner=self.user
+        )
+        self.path = reverse('resources:resource-comments-stream', kwargs={'resource_pk': self.resource.id})
+
+    def open_stream(self):
+        """Sends a stream request over a real socket; returns it with its status code."""
+        sock = socket.create_connection((self.server_thread.host, self.server_thread.port), timeout=5)
+        self.addCleanup(sock.close)
+        sock.sendall((
+            'GET {path} HTTP/1.1\r\nHost: localhost\r\nAuthorization: Token {token}\r\n'
+            'Accept: text/event-stream\r\n\r\n'
+        ).format(path=self.path, token=self.token.key).encode())
+
+        received = b''
+        while b'\r\n\r\n' not in received:
+            received += sock.recv(4096)
+
+        return sock, int(received.split(b' ', 2)[1])
+
+    def close_stream(self, sock):
+        """Hangs up right after a keep-alive, so nothing unread makes the close a reset."""
+        received = b''
+        while not received.endswith(b'\n\n'):
+            received += sock.recv(4096)
+        sock.close()
+
+    def wait_for_subscribers(self, count):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and comment_broker.subscriber_count() != count:
+            time.sleep(0.01)
+        self.assertEqual(comment_broker.subscriber_count(), count)
+
+    def test_streams_are_capped_and_released_on_disconnect(self):
+        streams = [self.open_stream() for _ in range(2)]
+        self.assertEqual([code for _, code in streams], [status.HTTP_200_OK] * 2)
+        self.wait_for_subscribers(2)
+
+        _, code = self.open_stream()
+        self.assertEqual(code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        # Clients going away free their subscriptions and threads at the next keep-alive.
+        for sock, _ in streams:
+            self.close_stream(sock)
+        self.wait_for_subscribers(0)
+
+        sock, code = self.open_stream()
+        self.assertEqual(code, status.HTTP_200_OK)
+        self.close_stream(sock)
+        self.wait_for_subscribers(0)
+
+
+class QueryBudgetTestCase(ResourceAbstractTestCase):
+    def setUp(self):
+        super().setUp()
+
+        ContentType.objects.clear_cache()
+        reset_violation_counts()
+        self.client.force_authenticate(self.user)
+        self.categories = [self.category] + [Category.objects.create(name=name) for name in ('Python', 'Web')]
+        self.rows = 0
+
+    def add_rows(self, count):
+        for n in range(self.rows, self.rows + count):
+            author = User.objects.create(username='author_{n}'.format(n=n))
+            resource = Resource.objects.create(
+                title='Resource {n}'.format(n=n),
+                resource_url='https://example.com/{n}'.format(n=n),
+                owner=self.user
+            )
+            resource.categories.add(*self.categories)
+            for content in ('first', 'second'):
+                Comment.objects.create(resource=resource, content=content, author=author)
+        self.rows += count
+
+    def read_urls(self):
+        resource_url = reverse('resources:resources-detail', kwargs={'pk': self.resource.id})
+        comments_url = reverse('resources:resource-comments-list', kwargs={'resource_pk': self.resource.id})
+        comment = Comment.objects.filter(resource=self.resource).first()
+
+        return [
+            reverse('resources:category-list'),
+            reverse('resources:resource-category-list', kwargs={'category_name': 'python'}),
+            reverse('resources:change-list'),
+            reverse('resources:resources-list'),
+            resource_url,
+            reverse('resources:resources-related', kwargs={'pk': self.resource.id}),
+            reverse('resources:resources-trending'),
+            comments_url,
+            comments_url + '?limit=10',
+            reverse('resources:resource-comments-detail', kwargs={'resource_pk': self.resource.id, 'pk': comment.id}),
+        ]
+
+    def assertWithinBudget(self, response):
+        self.assertNotEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE, response.data)
+        self.assertEqual(get_violation_counts(), {})
+
+    def test_read_endpoints_stay_within_budgets(self):
+        for count in (5, 50):
+            self.add_rows(count)
+            Comment.objects.create(resource=self.resource, content='comment', author=self.user)
+
+            for url in self.read_urls():
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+                self.assertWithinBudget(response)
+
+    def test_write_endpoints_stay_within_budgets(self):
+        self.add_rows(50)
+        ids = list(Resource.objects.exclude(id=self.resource.id).values_list('id', flat=True))
+        resource_url = reverse('resources:resources-detail', kwargs={'pk': self.resource.id})
+        comments_url = reverse('resources:resource-comments-list', kwargs={'resource_pk': self.resource.id})
+
+        responses = [
+            self.client.post(reverse('resources:resources-list'), {
+                'title': 'New resource', 'resource_url': 'https://example.com/new'
+            }),
+            self.client.patch(resource_url, {'title': 'Renamed'}),
+            self.client.post(comments_url, {'content': 'New comment'}),
+            self.client.post(reverse('resources:resources-bulk-categorize'), {
+                'ids': ids, 'categories': [self.categories[1].id]
+            }, format='json'),
+            self.client.post(reverse('resources:batch'), {
+                'requests': [{'method': 'GET', 'path': resource_url}] * settings.BATCH_MAX_REQUESTS
+            }, format='json'),
+            self.client.post(reverse('resources:resources-bulk-delete'), {'ids': ids}, format='json'),
+            self.client.delete(resource_url),
+        ]
+
+        for response in responses:
+            self.assertLess(response.status_code, 300, response.data)
+            self.assertWithinBudget(response)
+
+    def test_exceeded_budget_aborts_request(self):
+        budgets = {'list': QueryBudget(queries=1)}
+
+        with override_settings(QUERY_BUDGET_MODE='enforce'), \
+                mock.patch.object(ResourceViewSet, 'query_budget_by_action', budgets), \
+                self.assertLogs('freesource.budgets', 'WARNING'):
+            response = self.client.get(reverse('resources:resources-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(
+            response.data['detail'],
+            'ResourceViewSet.list exceeded its queries budget: 2 (allowed 1).'
+        )
+        self.assertEqual(get_violation_counts(), {('ResourceViewSet.list', 'queries'): 1})
+
+    def test_report_mode_only_logs(self):
+        budgets = {'list': QueryBudget(queries=1)}
+
+        with override_settings(QUERY_BUDGET_MODE='report'), \
+                mock.patch.object(ResourceViewSet, 'query_budget_by_action', budgets), \
+                self.assertLogs('freesource.budgets', 'WARNING'):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            response = client.get(reverse('resources:resources-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(get_violation_counts(), {('ResourceViewSet.list', 'queries'): 1})
+
+    def test_long_statement_is_interrupted(self):
+        install()
+        start = time.perf_counter()
+
+        with self.assertRaises(QueryBudgetExceeded), self.assertLogs('freesource.budgets', 'WARNING'):
+            with track('test', QueryBudget(sql_time=0.05), mode='enforce'), connection.cursor() as cursor:
+                cursor.execute(
+                    'WITH RECURSIVE numbers(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM numbers LIMIT 1000000000) '
+                    'SELECT COUNT(*) FROM numbers'
+                )
+
+        self.assertLess(time.perf_counter() - start, 2)
+        self.assertEqual(get_violation_counts(), {('test', 'sql_time'): 1})
@@ -0,0 +1,84 @@
+"""
+Trending resources ranked by exponentially decayed comment activity.
+
+A comment posted at `t` weighs exp(-rate * (now - t)). Factoring out the
+common exp(-rate * (now - EPOCH)) term, every resource is stored as
+log(sum(exp(rate * (t - EPOCH)))), which never has to be decayed again:
+ordering by it is ordering by the current score, and a refresh only touches
+resources with comments newer than the previous run.
+"""
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Comment, TrendingScore, TrendingState
+from .utils import BATCH_SIZE, chunks
+
+EPOCH = datetime(2017, 1, 1, tzinfo=timezone.utc)
+
+
+def decay_rate():
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def log_add(a, b):
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+def current_score(log_score, now=None):
+    now = now or timezone.now()
+    return math.exp(log_score - decay_rate() * (now - EPOCH).total_seconds())
+
+
+def refresh_trending(rebuild=False):
+    """Folds comments posted since the last run into the scores; returns how many."""
+    rate = decay_rate()
+
+    with transaction.atomic():
+        state, _ = TrendingState.objects.select_for_update().get_or_create(id=1)
+
+        if rebuild:
+            TrendingScore.objects.all().delete()
+            state.last_comment_id = 0
+
+        comments = (
+            Comment.objects
+            .filter(id__gt=state.last_comment_id)
+            .order_by('id')
+            .values_list('id', 'resource_id', 'posted_on')
+        )
+
+        increments, processed = {}, 0
+        for comment_id, resource_id, posted_on in comments.iterator():
+            weight = rate * (posted_on - EPOCH).total_seconds()
+            increments[resource_id] = log_add(increments[resource_id], weight) if resource_id in increments else weight
+            state.last_comment_id = comment_id
+            processed += 1
+
+        existing = {}
+        for chunk in chunks(increments):
+            existing.update(
+                TrendingScore.objects.filter(resource_id__in=chunk).values_list('resource_id', 'log_score')
+            )
+
+        for resource_id, increment in increments.items():
+            if resource_id in existing:
+                TrendingScore.objects.filter(resource_id=resource_id).update(
+                    log_score=log_add(existing[resource_id], increment)
+                )
+
+        TrendingScore.objects.bulk_create([
+            TrendingScore(resource_id=resource_id, log_score=increment)
+            for resource_id, increment in increments.items()
+            if resource_id not in existing
+        ], batch_size=BATCH_SIZE)
+
+        state.refreshed_on = timezone.now()
+        state.save()
+
+    return processed
@@ -2,20 +2,13 @@ from django.conf.urls import url
 from rest_framework import routers
 from rest_framework_nested import routers as nested_routers
 
-from .views import CategoryListView, ResourceCategoryList, ResourceViewSet, CommentViewSet
+from .views import (
+    CategoryListView, ResourceCategoryList, ResourceViewSet, CommentViewSet, ChangeListView, BatchView
+)
 
 
 app_name = 'resources'
 
-urlpatterns = [
-    url(r'^categories/$', CategoryListView.as_view(), name='category-list'),
-    url(
-        r'^resources/(?P<category_name>[a-z]+)/$',
-        ResourceCategoryList.as_view(),
-        name='resource-category-list'
-    )
-]
-
 resource_router = routers.DefaultRouter()
 resource_router.register(r'resources', ResourceViewSet, base_name='resources')
 
@@ -26,5 +19,21 @@ resource_comments_router.register(
     r'comments', CommentViewSet, base_name='resource-comments'
 )
 
+urlpatterns = [
+    url(r'^categories/$', CategoryListView.as_view(), name='category-list'),
+    url(r'^changes/$', ChangeListView.as_view(), name='change-list'),
+    url(r'^batch/$', BatchView.as_view(), name='batch'),
+]
+
+# Router routes go first so list actions such as `resources/trending/` win
+# over the category listing below.
 urlpatterns += resource_router.urls
 urlpatterns += resource_comments_router.urls
+
+urlpatterns += [
+    url(
+        r'^resources/(?P<category_name>[a-z]+)/$',
+        ResourceCategoryList.as_view(),
+        name='resource-category-list'
+    )
+]
@@ -0,0 +1,20 @@
+from django.conf.urls import url
+
+from .replica import (
+    SnapshotCategoryListView, SnapshotResourceCategoryList, SnapshotResourceList, SnapshotResourceDetail
+)
+
+
+app_name = 'resources'
+
+# Same paths and names as the read routes in `urls`.
+urlpatterns = [
+    url(r'^categories/$', SnapshotCategoryListView.as_view(), name='category-list'),
+    url(r'^resources/$', SnapshotResourceList.as_view(), name='resources-list'),
+    url(r'^resources/(?P<pk>[0-9]+)/$', SnapshotResourceDetail.as_view(), name='resources-detail'),
+    url(
+        r'^resources/(?P<category_name>[a-z]+)/$',
+        SnapshotResourceCategoryList.as_view(),
+        name='resource-category-list'
+    ),
+]
@@ -0,0 +1,13 @@
+from itertools import islice
+
+# Keeps `IN (...)` lists below SQLite's limit of 999 bound parameters.
+BATCH_SIZE = 500
+
+
+def chunks(iterable, size=BATCH_SIZE):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -1,22 +1,61 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Prefetch
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import generics, viewsets
+from rest_framework.decorators import list_route, detail_route
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.authentication import TokenAuthentication
 
-from .models import Category, Resource
-from .serializers import CategorySerializer, ResourceSerializer, CommentSerializer
+from audit.buffer import record_many
+from audit.mixins import AuditMixin
+from audit.models import Event
+from freesource.budgets import QueryBudget
+
+from .models import Category, Resource, Comment, ArchivedComment, Change, RelatedResource, TrendingScore
+from .serializers import (
+    CategorySerializer, ResourceSerializer, CommentSerializer,
+    ResourceBulkSerializer, ResourceBulkCategorizeSerializer,
+    ResourceChangeSerializer, CommentChangeSerializer, ChangeQuerySerializer, CommentPageQuerySerializer,
+    RelatedResourceSerializer, TrendingResourceSerializer, TrendingQuerySerializer,
+    BatchSerializer
+)
 from .permissions import IsResourceOwner, IsCommentAuthor
+from .mixins import VersionedUpdateMixin, SoftDeleteMixin
+from .recommendations import refresh_related
+from .archive import thread_page
+from .batch import dispatch_all
+from .streams import EventStream, EventStreamRenderer, comment_broker, format_event
+from . import activity
+
 
+def with_serialized_relations(resources):
+    """Loads everything `ResourceSerializer` renders in a fixed number of queries."""
+    return resources.select_related('owner').prefetch_related(
+        'categories',
+        Prefetch('comment_set', queryset=Comment.objects.select_related('author'))
+    )
 
-class CategoryListView(generics.ListCreateAPIView):
+
+class CategoryListView(AuditMixin, generics.ListCreateAPIView):
     serializer_class = CategorySerializer
     authentication_classes = (TokenAuthentication,)
     permission_classes_by_action = {
         'get': (IsAuthenticated,),
         'post': (IsAuthenticated, IsAdminUser)
     }
+    query_budget_by_action = {
+        'get': QueryBudget(queries=2),
+        'post': QueryBudget(queries=10)
+    }
     queryset = Category.objects.all()
 
     def get_permissions(self):
@@ -26,20 +65,127 @@ class CategoryListView(generics.ListCreateAPIView):
             in self.permission_classes_by_action[self.request.method.lower()]
         ]
 
+    def list(self, request, *args, **kwargs):
+        data = cache.get_or_set(
+            Category.LIST_CACHE_KEY,
+            lambda: self.get_serializer(self.get_queryset(), many=True).data
+        )
+
+        return Response(data, status=status.HTTP_200_OK)
+
 
 class ResourceCategoryList(generics.ListAPIView):
     serializer_class = ResourceSerializer
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    query_budget = QueryBudget(queries=5)
 
     def get_queryset(self):
         category_name = self.kwargs.get('category_name').title()
         category = get_object_or_404(Category, name=category_name)
 
-        return Resource.objects.filter(categories__in=[category])
+        return with_serialized_relations(Resource.objects.filter(categories__in=[category]))
+
+
+class ChangeListView(generics.GenericAPIView):
+    """
+    Pages through the change feed after the `since` sequence number. Several
+    changes to one object within a page collapse into its latest state, and
+    upserts of objects deleted meanwhile are reported as deletions.
+    """
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    query_budget = QueryBudget(queries=6)
+
+    def get_sources(self):
+        return {
+            'category': (Category.objects.all(), CategorySerializer),
+            'resource': (Resource.all_objects.select_related('owner'), ResourceChangeSerializer),
+            'comment': (Comment.all_objects.select_related('author'), CommentChangeSerializer),
+        }
+
+    def get(self, request):
+        query = ChangeQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        since, limit = query.validated_data['since'], query.validated_data['limit']
+
+        changes = list(Change.objects.filter(id__gt=since).order_by('id')[:limit + 1])
+        more = len(changes) > limit
+        changes = changes[:limit]
+
+        latest = OrderedDict()
+        for change in changes:
+            key = (change.model, change.object_id, change.related_id)
+            latest.pop(key, None)
+            latest[key] = change
+
+        sources = self.get_sources()
+        current = {}
+        for model, (queryset, _) in sources.items():
+            ids = [
+                change.object_id
+                for change
+                in latest.values()
+                if change.model == model and change.operation == Change.UPSERT
+            ]
+            if ids:
+                current[model] = queryset.in_bulk(ids)
+
+                # Archived comments are still live, they just moved out of the hot table.
+                if model == 'comment' and len(current[model]) < len(ids):
+                    archived = set(ids) - set(current[model])
+                    current[model].update(ArchivedComment.objects.select_related('author').in_bulk(archived))
+
+        entries = []
+        for change in latest.values():
+            entry = {'seq': change.id, 'model': change.model, 'op': change.operation, 'id': change.object_id}
+
+            if change.related_id is not None:
+                entry['related_id'] = change.related_id
+
+            if change.operation == Change.UPSERT and change.model in sources:
+                obj = current[change.model].get(change.object_id)
+
+                if obj is None or getattr(obj, 'is_deleted', False):
+                    entry['op'] = Change.DELETE
+                else:
+                    entry['data'] = sources[change.model][1](obj).data
 
+            entries.append(entry)
 
-class ResourceViewSet(viewsets.ModelViewSet):
+        resp_data = {
+            'changes': entries,
+            'next': changes[-1].id if changes else since,
+            'more': more,
+        }
+
+        return Response(resp_data, status=status.HTTP_200_OK)
+
+
+class BatchView(generics.GenericAPIView):
+    """
+    Runs a list of catalogue API calls in one round trip and answers with
+    their statuses, headers and bodies in the same order.
+    """
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    # Sub-requests count against the batch, including those on the parallel pool.
+    query_budget = QueryBudget(queries=300, sql_time=3.0, wall_time=10.0)
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        responses = dispatch_all(
+            request,
+            serializer.validated_data['requests'],
+            parallel=serializer.validated_data['parallel']
+        )
+
+        return Response({'responses': responses}, status=status.HTTP_200_OK)
+
+
+class ResourceViewSet(AuditMixin, SoftDeleteMixin, VersionedUpdateMixin, viewsets.ModelViewSet):
     serializer_class = ResourceSerializer
     authentication_classes = (TokenAuthentication,)
     permission_classes_by_action = {
@@ -47,9 +193,27 @@ class ResourceViewSet(viewsets.ModelViewSet):
         'list': (IsAuthenticated,),
         'retrieve': (IsAuthenticated,),
         'update': (IsAuthenticated, IsResourceOwner),
-        'destroy': (IsAuthenticated, IsResourceOwner)
+        'partial_update': (IsAuthenticated, IsResourceOwner),
+        'destroy': (IsAuthenticated, IsResourceOwner),
+        'bulk_delete': (IsAuthenticated,),
+        'bulk_categorize': (IsAuthenticated,),
+        'related': (IsAuthenticated,),
+        'trending': (IsAuthenticated,)
+    }
+    query_budget_by_action = {
+        'create': QueryBudget(queries=15),
+        'list': QueryBudget(queries=4),
+        'retrieve': QueryBudget(queries=4),
+        'update': QueryBudget(queries=12),
+        'partial_update': QueryBudget(queries=12),
+        'destroy': QueryBudget(queries=15),
+        'bulk_delete': QueryBudget(queries=60),
+        'bulk_categorize': QueryBudget(queries=60),
+        'related': QueryBudget(queries=2),
+        'trending': QueryBudget(queries=2)
     }
     queryset = Resource.objects.all()
+    lookup_value_regex = '[0-9]+'
 
     def get_permissions(self):
         return [
@@ -58,6 +222,12 @@ class ResourceViewSet(viewsets.ModelViewSet):
             in self.permission_classes_by_action[self.action]
         ]
 
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return with_serialized_relations(self.queryset)
+
+        return super().get_queryset()
+
     def create(self, request):
         context = {'request': request}
 
@@ -69,7 +239,7 @@ class ResourceViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.validated_data, status=status.HTTP_201_CREATED, headers=headers)
 
-    def update(self, request, pk=None):
+    def update(self, request, pk=None, **kwargs):
         resource = get_object_or_404(Resource, id=pk)
         self.check_object_permissions(request, resource)
 
@@ -78,11 +248,121 @@ class ResourceViewSet(viewsets.ModelViewSet):
         self.perform_update(serializer)
 
         headers = self.get_success_headers(serializer)
+        headers.update(self.get_version_headers(resource))
 
         return Response(serializer.validated_data, status=status.HTTP_200_OK, headers=headers)
 
+    def get_owned_resource_ids(self, ids):
+        """
+        `IsResourceOwner` for many resources at once: one filtered query,
+        denied unless the user owns every requested resource.
+        """
+        ids = set(ids)
+        owned_ids = set(
+            Resource.objects.filter(id__in=ids, owner=self.request.user).values_list('id', flat=True)
+        )
+
+        if owned_ids != ids:
+            self.permission_denied(self.request, message=IsResourceOwner.message)
+
+        return owned_ids
+
+    @list_route(methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request):
+        serializer = ResourceBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            ids = self.get_owned_resource_ids(serializer.validated_data['ids'])
+            deleted = Resource.objects.filter(id__in=ids).soft_delete()
 
-class CommentViewSet(viewsets.ModelViewSet):
+        record_many(Event.DELETE, Resource, ids, request.user)
+
+        resp_data = {'resources': deleted}
+
+        return Response(resp_data, status=status.HTTP_200_OK)
+
+    @list_route(methods=['post'], url_path='bulk-categorize')
+    def bulk_categorize(self, request):
+        serializer = ResourceBulkCategorizeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        category_ids = serializer.validated_data['categories']
+        links = Resource.categories.through.objects
+
+        with transaction.atomic():
+            ids = self.get_owned_resource_ids(serializer.validated_data['ids'])
+
+            if serializer.validated_data['mode'] == 'replace':
+                stale_links = links.filter(resource_id__in=ids).exclude(category_id__in=category_ids)
+                removed_pairs = list(stale_links.values_list('resource_id', 'category_id'))
+                stale_links.delete()
+            else:
+                removed_pairs = []
+
+            existing = set(
+                links.filter(resource_id__in=ids, category_id__in=category_ids)
+                .values_list('resource_id', 'category_id')
+            )
+            added = links.bulk_create([
+                links.model(resource_id=resource_id, category_id=category_id)
+                for resource_id in ids
+                for category_id in category_ids
+                if (resource_id, category_id) not in existing
+            ])
+
+            Change.objects.record_links(removed_pairs, Change.DELETE)
+            Change.objects.record_links(
+                [(link.resource_id, link.category_id) for link in added],
+                Change.UPSERT
+            )
+            activity.links_changed(removed_pairs, -1)
+            activity.links_changed([(link.resource_id, link.category_id) for link in added], 1)
+            refresh_related(ids)
+
+        record_many(Event.UPDATE, Resource, ids, request.user)
+
+        resp_data = {
+            'resources': len(ids),
+            'links_added': len(added),
+            'links_removed': len(removed_pairs),
+        }
+
+        return Response(resp_data, status=status.HTTP_200_OK)
+
+    @detail_route()
+    def related(self, request, pk=None):
+        # Served from the precomputed index in a single query; unknown
+        # resources simply have no neighbours.
+        related = (
+            RelatedResource.objects
+            .filter(resource_id=pk, related__is_deleted=False)
+            .select_related('related')
+            .order_by('-score', 'related_id')
+        )
+        serializer = RelatedResourceSerializer(related, many=True)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @list_route()
+    def trending(self, request):
+        # Top-K straight off the score index; `manage.py refresh_trending`
+        # keeps the scores current.
+        query = TrendingQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        scores = (
+            TrendingScore.objects
+            .filter(resource__is_deleted=False)
+            .select_related('resource')
+            .order_by('-log_score')[:query.validated_data['limit']]
+        )
+        serializer = TrendingResourceSerializer(scores, many=True, context={'now': timezone.now()})
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class CommentViewSet(AuditMixin, SoftDeleteMixin, VersionedUpdateMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     authentication_classes = (TokenAuthentication,)
     permission_classes_by_action = {
@@ -90,7 +370,18 @@ class CommentViewSet(viewsets.ModelViewSet):
         'list': (IsAuthenticated,),
         'retrieve': (IsAuthenticated,),
         'update': (IsAuthenticated, IsCommentAuthor),
-        'destroy': (IsAuthenticated, IsCommentAuthor)
+        'partial_update': (IsAuthenticated, IsCommentAuthor),
+        'destroy': (IsAuthenticated, IsCommentAuthor),
+        'stream': (IsAuthenticated,)
+    }
+    query_budget_by_action = {
+        'create': QueryBudget(queries=12),
+        'list': QueryBudget(queries=4),
+        'retrieve': QueryBudget(queries=3),
+        'update': QueryBudget(queries=10),
+        'partial_update': QueryBudget(queries=10),
+        'destroy': QueryBudget(queries=15),
+        'stream': QueryBudget(queries=4)
     }
 
     def get_permissions(self):
@@ -104,7 +395,81 @@ class CommentViewSet(viewsets.ModelViewSet):
         resource_pk = self.kwargs.get('resource_pk')
         resource = get_object_or_404(Resource, id=resource_pk)
 
-        return resource.comment_set
+        return resource.comment_set.select_related('author')
+
+    def list(self, request, resource_pk=None):
+        # Without paging parameters the thread's hot comments are returned as before.
+        if not {'before', 'limit'} & set(request.query_params):
+            return super().list(request, resource_pk=resource_pk)
+
+        resource = get_object_or_404(Resource, id=resource_pk)
+
+        query = CommentPageQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        comments, more = thread_page(resource, query.validated_data['limit'], query.validated_data.get('before'))
+
+        resp_data = {
+            'comments': self.get_serializer(comments, many=True).data,
+            'next': comments[-1].id if more else None,
+            'more': more,
+        }
+
+        return Response(resp_data, status=status.HTTP_200_OK)
+
+    @list_route(renderer_classes=(JSONRenderer, EventStreamRenderer))
+    def stream(self, request, resource_pk=None):
+        """
+        Pushes the resource's new comments as server-sent events. Clients
+        resuming with `Last-Event-ID` first get the comments they missed.
+        Each stream holds a worker thread, so past `COMMENT_STREAM_MAX_STREAMS`
+        open streams new ones are turned away with a 503.
+        """
+        resource = get_object_or_404(Resource, id=resource_pk)
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID', '').strip()
+
+        # Subscribed before reading the replay, so no comment slips in between.
+        subscription = comment_broker.subscribe(resource.id, limit=settings.COMMENT_STREAM_MAX_STREAMS)
+        initial = []
+        try:
+            if last_event_id.isdigit():
+                replay = list(
+                    Comment.objects
+                    .filter(resource=resource, id__gt=int(last_event_id))
+                    .select_related('author')
+                    .order_by('id')[:settings.COMMENT_STREAM_REPLAY + 1]
+                )
+                if len(replay) <= settings.COMMENT_STREAM_REPLAY:
+                    initial.extend(format_event(comment.id, self.get_serializer(comment).data) for comment in replay)
+                    subscription.after = replay[-1].id if replay else int(last_event_id)
+                else:
+                    initial.append(format_event(
+                        last_event_id, {'detail': 'Too many comments were missed, reload the thread.'}, 'reset'
+                    ))
+
+            if not initial:
+                subscription.after = resource.comment_set.aggregate(last_id=Max('id'))['last_id'] or 0
+        except Exception:
+            comment_broker.unsubscribe(subscription)
+            raise
+
+        response = StreamingHttpResponse(EventStream(subscription, initial), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Keeps proxies such as nginx from buffering the stream.
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+    def update(self, request, resource_pk=None, pk=None, partial=False):
+        comment = self.get_object()
+
+        serializer = self.get_serializer(comment, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+
+        headers = self.get_version_headers(comment)
+
+        return Response(serializer.data, status=status.HTTP_200_OK, headers=headers)
 
     def create(self, request, resource_pk=None):
         resource = get_object_or_404(Resource, id=resource_pk)
@@ -117,4 +482,4 @@ class CommentViewSet(viewsets.ModelViewSet):
 
         headers = self.get_success_headers(serializer)
 
-        return Response(serializer.validated_data, status=status.HTTP_201_CREATED, headers=headers)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
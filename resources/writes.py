@@ -0,0 +1,151 @@
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+from freesource.budgets import carry, current_tracker
+
+logger = logging.getLogger(__name__)
+
+
+def is_locked(error):
+    # "database is locked", or "database table is locked" with a shared cache.
+    return isinstance(error, OperationalError) and 'locked' in str(error)
+
+
+class PendingWrite:
+    def __init__(self, func):
+        self.func = func
+        # The submitting request's query budget covers its write.
+        self.tracker = current_tracker()
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+    def run(self):
+        # Each write gets a savepoint, so one failing write doesn't sink its batch,
+        # and isn't interrupted, which would roll back the batch's transaction.
+        try:
+            with carry(self.tracker, interrupt=False), transaction.atomic():
+                self.result = self.func()
+            self.error = None
+        except Exception as error:
+            if is_locked(error):
+                raise
+            self.error = error
+
+    def wait(self):
+        self.done.wait()
+
+        if self.error is not None:
+            raise self.error
+
+        return self.result
+
+
+class WriteCoalescer:
+    """
+    Funnels writes through one thread that commits them in grouped
+    transactions, instead of every request thread competing for SQLite's
+    write lock. A group closes after `batch_size` writes or `max_delay`
+    seconds; a group that still finds the database locked once the busy
+    timeout ran out is retried up to `retries` times with backoff.
+
+    Writes submitted inside a transaction run inline, as they must commit
+    together with it.
+    """
+
+    def __init__(self, batch_size, max_delay, retries, retry_delay):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, func):
+        """Runs `func` on the writer thread and returns its result once committed."""
+        if connection.in_atomic_block:
+            return func()
+
+        write = PendingWrite(func)
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-coalescer', daemon=True)
+                self._thread.start()
+            self._queue.put(write)
+
+        return write.wait()
+
+    def stop(self):
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            thread, self._thread = self._thread, None
+
+        thread.join()
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._collect()
+                if batch:
+                    self._commit(batch)
+        finally:
+            connection.close()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+
+        while len(batch) < self.batch_size:
+            try:
+                write = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+
+            if write is None:
+                return batch, True
+            batch.append(write)
+
+        return batch, False
+
+    def _commit(self, batch):
+        for attempt in range(self.retries + 1):
+            try:
+                with transaction.atomic():
+                    for write in batch:
+                        write.run()
+                break
+            except Exception as error:
+                if is_locked(error) and attempt < self.retries:
+                    logger.warning('Database locked, retrying %d writes.', len(batch))
+                    time.sleep(self.retry_delay * 2 ** attempt)
+                    continue
+
+                for write in batch:
+                    write.error = error
+                break
+
+        for write in batch:
+            write.done.set()
+
+
+comment_writer = WriteCoalescer(
+    batch_size=settings.COMMENT_WRITE_BATCH_SIZE,
+    max_delay=settings.COMMENT_WRITE_MAX_DELAY,
+    retries=settings.COMMENT_WRITE_RETRIES,
+    retry_delay=settings.COMMENT_WRITE_RETRY_DELAY
+)
@@ -0,0 +1,40 @@
+import csv
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from resources.utils import BATCH_SIZE
+from users.provisioning import provision_batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates users and API tokens from a CSV file with username, first_name, last_name '
+        'and password columns. Passwords may be given as Django password hashes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rows = created = 0
+
+        with open(options['path'], newline='') as source:
+            reader = csv.DictReader(source)
+
+            while True:
+                batch = list(islice(reader, options['batch_size']))
+                if not batch:
+                    break
+
+                created += provision_batch(batch)
+                rows += len(batch)
+
+        self.stdout.write('Provisioned {created} users, skipped {skipped} existing, in {seconds:.2f}s.'.format(
+            created=created,
+            skipped=rows - created,
+            seconds=time.perf_counter() - start
+        ))
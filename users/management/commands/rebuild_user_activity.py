@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from resources.activity import rebuild_user_activity
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the per-user activity summaries behind the profile endpoint.'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rows = rebuild_user_activity()
+
+        self.stdout.write('Rebuilt {rows} user activity summaries in {seconds:.2f}s.'.format(
+            rows=rows,
+            seconds=time.perf_counter() - start
+        ))
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+from collections import Counter, defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def backfill_user_activity(apps, schema_editor):
+    """
+    Counts what users created before the summaries existed, so deletes of
+    older rows don't take the counters below zero. Recent activity is left
+    empty; `manage.py rebuild_user_activity` replays it from the audit log.
+    """
+    UserActivity = apps.get_model('users', 'UserActivity')
+    Resource = apps.get_model('resources', 'Resource')
+    Comment = apps.get_model('resources', 'Comment')
+    ArchivedComment = apps.get_model('resources', 'ArchivedComment')
+    ResourceCategory = Resource.categories.through
+
+    resource_counts = dict(
+        Resource.objects.filter(is_deleted=False).order_by().values_list('owner_id').annotate(count=Count('id'))
+    )
+    comment_counts = Counter(dict(
+        Comment.objects.filter(is_deleted=False).order_by().values_list('author_id').annotate(count=Count('id'))
+    ))
+    comment_counts.update(dict(
+        ArchivedComment.objects.order_by().values_list('author_id').annotate(count=Count('id'))
+    ))
+    category_counts = defaultdict(dict)
+    links = ResourceCategory.objects.filter(resource__is_deleted=False).order_by() \
+        .values_list('resource__owner_id', 'category_id', 'category__name') \
+        .annotate(count=Count('id'))
+    for owner_id, category_id, name, count in links:
+        category_counts[owner_id][str(category_id)] = {'name': name, 'count': count}
+
+    UserActivity.objects.all().delete()
+    UserActivity.objects.bulk_create([
+        UserActivity(
+            user_id=user_id,
+            resource_count=resource_counts.get(user_id, 0),
+            comment_count=comment_counts.get(user_id, 0),
+            categories=json.dumps(category_counts[user_id])
+        )
+        for user_id in set(resource_counts) | set(comment_counts)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('resources', '0013_archivedcomment'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_activity, migrations.RunPython.noop),
+    ]
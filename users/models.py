@@ -1,3 +1,88 @@
-from django.db import models
+import json
 
-# Create your models here.
+from django.conf import settings
+from django.db import models, transaction
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class UserActivityManager(models.Manager):
+    def adjust(self, user_id, resources=0, comments=0, categories=(), recent=None, forget=()):
+        """
+        Applies one change to a user's summary row, creating it on first use.
+        `categories` holds (category id, name, delta) triples, `recent` is an
+        item to prepend to the recent activity and `forget` lists
+        (type, id) pairs to drop from it.
+        """
+        with transaction.atomic():
+            activity, _ = self.select_for_update().get_or_create(user_id=user_id)
+
+            activity.resource_count += resources
+            activity.comment_count += comments
+
+            category_counts = activity.category_counts
+            for category_id, name, delta in categories:
+                entry = category_counts.setdefault(str(category_id), {'name': name, 'count': 0})
+                entry['count'] += delta
+                if entry['count'] <= 0:
+                    del category_counts[str(category_id)]
+            activity.category_counts = category_counts
+
+            recent_items = [
+                item
+                for item
+                in activity.recent_items
+                if (item['type'], item['id']) not in set(forget)
+            ]
+            if recent is not None:
+                recent_items.insert(0, dict(recent, at=timezone.now().isoformat()))
+            activity.recent_items = recent_items[:settings.USER_ACTIVITY_RECENT_ITEMS]
+
+            activity.save()
+
+
+class UserActivity(models.Model):
+    """
+    Per-user counters kept up to date by the write paths, so a profile is a
+    single primary-key lookup. `manage.py rebuild_user_activity` recomputes
+    them from scratch.
+    """
+    user = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name='activity')
+    resource_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    categories = models.TextField(default='{}')
+    recent = models.TextField(default='[]')
+
+    objects = UserActivityManager()
+
+
+    class Meta:
+        verbose_name_plural = 'user activities'
+
+    @property
+    def category_counts(self):
+        return json.loads(self.categories)
+
+    @category_counts.setter
+    def category_counts(self, value):
+        self.categories = json.dumps(value)
+
+    @property
+    def recent_items(self):
+        return json.loads(self.recent)
+
+    @recent_items.setter
+    def recent_items(self, value):
+        self.recent = json.dumps(value)
+
+    def top_categories(self, limit=5):
+        ranked = sorted(
+            self.category_counts.items(),
+            key=lambda item: (-item[1]['count'], item[1]['name'])
+        )
+
+        return [
+            {'id': int(category_id), 'name': entry['name'], 'count': entry['count']}
+            for category_id, entry
+            in ranked[:limit]
+        ]
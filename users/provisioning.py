@@ -0,0 +1,49 @@
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+
+def hashed(password):
+    """Passes through passwords that are already Django hashes and hashes the rest."""
+    try:
+        identify_hasher(password)
+    except ValueError:
+        return make_password(password)
+
+    return password
+
+
+def provision_batch(rows):
+    """
+    Creates users and their tokens from dicts with `username`, `first_name`,
+    `last_name` and `password` keys, skipping usernames that are taken.
+    Returns the number of users created.
+    """
+    rows = {row['username']: row for row in rows}
+
+    with transaction.atomic():
+        existing = set(User.objects.filter(username__in=rows).values_list('username', flat=True))
+        new_rows = [row for username, row in rows.items() if username not in existing]
+
+        User.objects.bulk_create([
+            User(
+                username=row['username'],
+                first_name=row.get('first_name', ''),
+                last_name=row.get('last_name', ''),
+                password=hashed(row['password'])
+            )
+            for row in new_rows
+        ])
+
+        # SQLite doesn't return the ids of bulk inserted rows.
+        tokens = [
+            Token(user_id=user_id)
+            for user_id
+            in User.objects.filter(username__in=[row['username'] for row in new_rows]).values_list('id', flat=True)
+        ]
+        for token in tokens:
+            token.key = token.generate_key()
+        Token.objects.bulk_create(tokens)
+
+    return len(new_rows)
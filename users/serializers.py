@@ -1,27 +1,22 @@
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from rest_framework.validators import UniqueValidator
 from rest_framework.authtoken.models import Token
 
+from freesource.profiling import FieldProfilingMixin
 
-class UserReadSerializer(serializers.ModelSerializer):
+from .models import UserActivity
+
+
+class UserReadSerializer(FieldProfilingMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('username',)
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
-    username = serializers.CharField(
-        required=True,
-        min_length=3,
-        max_length=30,
-        validators=[
-            UniqueValidator(
-                queryset=User.objects.all(),
-                message='User with this username already exists.'
-            )
-        ]
-    )
+    # Uniqueness is left to the database constraint, see `create`.
+    username = serializers.CharField(required=True, min_length=3, max_length=30)
     first_name = serializers.CharField(required=True, max_length=50)
     last_name = serializers.CharField(required=True, max_length=50)
     password = serializers.CharField(
@@ -41,8 +36,12 @@ class UserRegisterSerializer(serializers.ModelSerializer):
         fields = ('username', 'first_name', 'last_name', 'password')
 
     def create(self, validated_data):
-        user = User.objects.create_user(**validated_data)
-        Token.objects.create(user=user)
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(**validated_data)
+                Token.objects.create(user=user)
+        except IntegrityError:
+            raise serializers.ValidationError({'username': ['User with this username already exists.']})
 
         return user
 
@@ -58,3 +57,21 @@ class UserLoginSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('username', 'password')
+
+
+class UserActivitySerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='user_id')
+    username = serializers.CharField(source='user.username')
+    top_categories = serializers.SerializerMethodField()
+    recent = serializers.SerializerMethodField()
+
+
+    class Meta:
+        model = UserActivity
+        fields = ('id', 'username', 'resource_count', 'comment_count', 'top_categories', 'recent')
+
+    def get_top_categories(self, obj):
+        return obj.top_categories()
+
+    def get_recent(self, obj):
+        return obj.recent_items
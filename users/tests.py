@@ -1,3 +1,235 @@
-from django.test import TestCase
+import os
+import tempfile
+from importlib import import_module
+from io import StringIO
 
-# Create your tests here.
+from django.apps import apps
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.shortcuts import reverse
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from audit.buffer import event_log
+from resources.models import Category, Comment, Resource
+
+from .models import UserActivity
+
+
+class UserRegisterTestCase(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('users:register')
+
+        self.post_data = {
+            'username': 'new_user',
+            'first_name': 'New',
+            'last_name': 'User',
+            'password': 'passtestword123',
+        }
+
+    def test_registration_creates_user_and_token(self):
+        response = self.client.post(self.url, data=self.post_data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = User.objects.get(username='new_user')
+        self.assertTrue(user.check_password('passtestword123'))
+        self.assertTrue(Token.objects.filter(user=user).exists())
+
+    def test_registration_with_taken_username(self):
+        User.objects.create_user(username='new_user', password='passtestword123')
+
+        response = self.client.post(self.url, data=self.post_data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['username'], ['User with this username already exists.'])
+        self.assertEqual(User.objects.filter(username='new_user').count(), 1)
+        self.assertFalse(Token.objects.exists())
+
+
+class ProvisionUsersCommandTestCase(APITestCase):
+    def provision(self, rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write('username,first_name,last_name,password\n')
+            source.writelines(','.join(row) + '\n' for row in rows)
+        self.addCleanup(os.remove, source.name)
+
+        output = StringIO()
+        call_command('provision_users', source.name, stdout=output)
+
+        return output.getvalue()
+
+    def test_provision_users(self):
+        User.objects.create_user(username='taken', password='passtestword123')
+
+        output = self.provision([
+            ('hashed', 'Pre', 'Hashed', make_password('hashedpassword123')),
+            ('plain', 'Plain', 'Text', 'plainpassword123'),
+            ('taken', 'Already', 'There', 'passtestword123'),
+        ])
+
+        self.assertIn('Provisioned 2 users, skipped 1 existing', output)
+        self.assertTrue(User.objects.get(username='hashed').check_password('hashedpassword123'))
+        self.assertTrue(User.objects.get(username='plain').check_password('plainpassword123'))
+        self.assertEqual(User.objects.get(username='plain').first_name, 'Plain')
+        self.assertEqual(
+            set(Token.objects.values_list('user__username', flat=True)),
+            {'hashed', 'plain'}
+        )
+
+
+class UserProfileTestCase(APITestCase):
+    def setUp(self):
+        event_log.clear()
+        self.client = APIClient()
+
+        self.user = User.objects.create_user(username='test_user', password='passtestword123')
+        self.music = Category.objects.create(name='Music')
+        self.books = Category.objects.create(name='Books')
+
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        event_log.clear()
+
+    def profile(self, user=None):
+        user = user or self.user
+
+        return self.client.get(reverse('users:profile', kwargs={'pk': user.id}))
+
+    def create_resource(self, title):
+        response = self.client.post(
+            reverse('resources:resources-list'),
+            data={'title': title, 'resource_url': 'https://example.com/' + title}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        return Resource.objects.get(title=title)
+
+    def comment(self, resource):
+        response = self.client.post(
+            reverse('resources:resource-comments-list', kwargs={'resource_pk': resource.id}),
+            data={'content': 'Nice one'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def categorize(self, resources, categories, mode='add'):
+        response = self.client.post(
+            reverse('resources:resources-bulk-categorize'),
+            data={
+                'ids': [resource.id for resource in resources],
+                'categories': [category.id for category in categories],
+                'mode': mode,
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_profile_with_non_authenticated_user(self):
+        self.client.force_authenticate(None)
+
+        response = self.profile()
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_of_unknown_user(self):
+        response = self.client.get(reverse('users:profile', kwargs={'pk': self.user.id + 100}))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_profile_of_inactive_user(self):
+        response = self.profile()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['username'], self.user.username)
+        self.assertEqual(response.data['resource_count'], 0)
+        self.assertEqual(response.data['top_categories'], [])
+        self.assertEqual(response.data['recent'], [])
+
+    def test_profile_tracks_creations(self):
+        first = self.create_resource('first')
+        second = self.create_resource('second')
+        self.comment(first)
+        self.categorize([first, second], [self.music])
+        self.categorize([second], [self.books])
+
+        response = self.profile()
+
+        self.assertEqual(response.data['resource_count'], 2)
+        self.assertEqual(response.data['comment_count'], 1)
+        self.assertEqual(
+            response.data['top_categories'],
+            [
+                {'id': self.music.id, 'name': 'Music', 'count': 2},
+                {'id': self.books.id, 'name': 'Books', 'count': 1},
+            ]
+        )
+        self.assertEqual(
+            [(item['type'], item['id']) for item in response.data['recent']],
+            [('comment', first.comment_set.get().id), ('resource', second.id), ('resource', first.id)]
+        )
+
+    def test_profile_forgets_deleted_resources(self):
+        first = self.create_resource('first')
+        second = self.create_resource('second')
+        self.categorize([first, second], [self.music])
+
+        self.client.delete(reverse('resources:resources-detail', kwargs={'pk': first.id}))
+        self.categorize([second], [self.books], mode='replace')
+
+        response = self.profile()
+
+        self.assertEqual(response.data['resource_count'], 1)
+        self.assertEqual(response.data['top_categories'], [{'id': self.books.id, 'name': 'Books', 'count': 1}])
+        self.assertEqual([item['id'] for item in response.data['recent']], [second.id])
+
+    def test_migration_backfills_existing_rows(self):
+        backfill = import_module('users.migrations.0002_backfill_user_activity').backfill_user_activity
+        # Written straight to the database, as they were before the summaries existed.
+        first, second = [
+            Resource.objects.create(title=title, resource_url='https://example.com/' + title, owner=self.user)
+            for title in ('first', 'second')
+        ]
+        first.categories.add(self.music)
+        Comment.objects.create(resource=second, content='Nice one', author=self.user)
+
+        backfill(apps, None)
+        self.client.delete(reverse('resources:resources-detail', kwargs={'pk': first.id}))
+
+        response = self.profile()
+        self.assertEqual(response.data['resource_count'], 1)
+        self.assertEqual(response.data['comment_count'], 1)
+        self.assertEqual(response.data['top_categories'], [])
+
+    def test_profile_is_one_query(self):
+        self.create_resource('first')
+
+        with self.assertNumQueries(1):
+            self.profile()
+
+    def test_rebuild_command_matches_incremental_summary(self):
+        first = self.create_resource('first')
+        second = self.create_resource('second')
+        self.comment(second)
+        self.categorize([first, second], [self.music, self.books])
+        first.categories.remove(self.books)
+        self.client.delete(reverse('resources:resources-detail', kwargs={'pk': second.id}))
+
+        expected = self.profile().data
+        UserActivity.objects.all().delete()
+
+        output = StringIO()
+        call_command('rebuild_user_activity', stdout=output)
+
+        self.assertIn('Rebuilt 1 user activity summaries', output.getvalue())
+        rebuilt = self.profile().data
+        self.assertEqual(rebuilt['resource_count'], expected['resource_count'])
+        self.assertEqual(rebuilt['comment_count'], expected['comment_count'])
+        self.assertEqual(rebuilt['top_categories'], expected['top_categories'])
+        self.assertEqual(
+            [(item['type'], item['id']) for item in rebuilt['recent']],
+            [(item['type'], item['id']) for item in expected['recent']]
+        )
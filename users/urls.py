@@ -1,11 +1,12 @@
 from django.conf.urls import url
 
-from .views import UserRegister, UserLogin
+from .views import UserRegister, UserLogin, UserProfile
 
 
 app_name = 'users'
 
 urlpatterns = [
     url(r'^register/', UserRegister.as_view(), name='register'),
-    url(r'^login/', UserLogin.as_view(), name='login')
+    url(r'^login/', UserLogin.as_view(), name='login'),
+    url(r'^users/(?P<pk>[0-9]+)/$', UserProfile.as_view(), name='profile'),
 ]
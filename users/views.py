@@ -1,9 +1,14 @@
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.authentication import TokenAuthentication
 
-from .serializers import UserRegisterSerializer, UserLoginSerializer
+from .models import UserActivity
+from .serializers import UserRegisterSerializer, UserLoginSerializer, UserActivitySerializer
 
 
 class UserRegister(generics.CreateAPIView):
@@ -46,3 +51,16 @@ class UserLogin(generics.CreateAPIView):
         headers = self.get_success_headers(serializer)
         
         return Response(resp_data, status=status.HTTP_200_OK, headers=headers)
+
+
+class UserProfile(generics.RetrieveAPIView):
+    serializer_class = UserActivitySerializer
+    permission_classes = (IsAuthenticated,)
+    authentication_classes = (TokenAuthentication,)
+
+    def get_object(self):
+        try:
+            return UserActivity.objects.select_related('user').get(user_id=self.kwargs['pk'])
+        except UserActivity.DoesNotExist:
+            # Users who never posted anything have no summary row yet.
+            return UserActivity(user=get_object_or_404(User, pk=self.kwargs['pk']))